@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# The documents of a season of events at once
+# The schedule (JSON5) lists the events, each with its movement, pairs, boards, date, and names:
+#   {Events: [{Movement: 'howell', Pairs: 8, Boards: 3, Date: '2026-01-06',
+#              Tournament: 'Monday Club', Players: ['A + B', ...], File: 'monday-0106'},
+#             {Movement: 'mitchell', Pairs: 10, Date: '2026-01-08', Names: 'thursday.json5'}, ...]}
+# "Names" is a names file as the generators' --names, relative to the schedule; the keys of the
+# event override it.  Boards are 3 by default, the date today, the file the movement and the date.
+#
+# Events are grouped by movement, pairs, and boards.  The arrangement is loaded, validated, and
+# laid out once per group as a template (see template.py), then every event of the group is only
+# the template with its names, title, and date.  Sectioned Mitchell fields (more than 24 pairs)
+# are not templated, each is built on its own.
+#
+# --outdir: where the documents go, next to the schedule by default
+# --cachedir: template cache directory, see template.py
+import argparse
+import datetime
+import logging
+import os
+import time
+from maininit import setlog
+from jsonIO import loadJson5
+from movements import Movements
+from template import TemplateCache
+
+# The event as the generators' names object (see PairGames.loadNames) and its group
+# Raises ValueError if the event is not valid
+def parseEvent(event, scheduleDir):
+    nameObj = {}
+    if event.get('Names'):
+        with open(os.path.join(scheduleDir, event['Names']), 'r') as f:
+            nameObj.update(loadJson5(f.read()))
+    for k in ['Tournament', 'Players', 'File']:
+        if k in event:
+            nameObj[k] = event[k]
+    movement = event.get('Movement', 'howell')
+    pairs = event.get('Pairs')
+    decks = event.get('Boards', 3)
+    if movement not in Movements:
+        raise ValueError('Unknown movement', movement)
+    if type(pairs) is not int or not 4 <= pairs <= 120:
+        raise ValueError('Pairs must be 4 to 120', pairs)
+    if type(decks) is not int or not 1 <= decks <= 6:
+        raise ValueError('Boards must be 1 to 6', decks)
+    date = datetime.date.fromisoformat(event['Date']) if event.get('Date') else datetime.date.today()
+    nameObj['Date'] = date.strftime("%b %d, %Y")
+    nameObj.setdefault('Players', [])
+    nameObj.setdefault('File', f'{movement}{pairs}x{decks}-{date.isoformat()}')
+    return (movement, pairs, decks), nameObj
+
+def loadSchedule(log, fn):
+    with open(fn, 'r') as f:
+        schedule = loadJson5(f.read())
+    events = []
+    for i, event in enumerate(schedule.get('Events', []), 1):
+        try:
+            events.append(parseEvent(event, os.path.dirname(os.path.abspath(fn))))
+        except (ValueError, TypeError, OSError) as e:
+            log.error(f'Event {i} skipped: {" ".join(str(a) for a in e.args)}')
+    # Two events of the same movement on the same date must not overwrite each other's files
+    files = {}
+    for _, nameObj in events:
+        n = files[nameObj['File']] = files.get(nameObj['File'], 0) + 1
+        if n > 1:
+            nameObj['File'] += f'-{n}'
+    return events
+
+# Events grouped by (movement, pairs, boards), in the order of the schedule
+def groupEvents(events):
+    groups = {}
+    for group, nameObj in events:
+        groups.setdefault(group, []).append(nameObj)
+    return groups
+
+# Render every event, one group after another.  Returns {group: (events, seconds)}
+def runBatch(log, events, outDir, cacheDir=None, jsonfile=None):
+    cache = TemplateCache(log, cacheDir)
+    times = {}
+    for (movement, pairs, decks), nameObjs in groupEvents(events).items():
+        start = time.perf_counter()
+        for nameObj in nameObjs:
+            if movement == 'mitchell' and pairs > 24:
+                from mitchell import SectionedMitchell
+                doc = SectionedMitchell(log, pairs, decks, False, nameObj)
+                doc.build()
+                doc.save(outDir)
+            elif cache.render(movement, pairs, decks, nameObj, outDir, jsonfile) is None:
+                log.error(f'{nameObj["File"]}: {movement} of {pairs} pairs cannot be made')
+        times[(movement, pairs, decks)] = (len(nameObjs), time.perf_counter() - start)
+    return times
+
+
+if __name__ == '__main__':
+    log = setlog('batch', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('schedule', type=str, help='Schedule of the events, JSON5')
+    parser.add_argument('-o', '--outdir', type=str, help='Output directory, the schedule\'s by default')
+    parser.add_argument('-c', '--cachedir', type=str, help='Template cache directory')
+    parser.add_argument('-j', '--jsonfile', type=str)
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    outDir = args.outdir or os.path.dirname(os.path.abspath(args.schedule))
+    os.makedirs(outDir, exist_ok=True)
+    events = loadSchedule(log, args.schedule)
+    start = time.perf_counter()
+    times = runBatch(log, events, outDir, args.cachedir, args.jsonfile)
+    for (m, p, b), (n, secs) in times.items():
+        print(f'{m:>9} {p:>3} pairs {b} boards: {n:>3} events in {secs:6.2f}s')
+    print(f'{len(events)} events in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# Benchmark of the generators, to catch slowdowns before an event day
+# Every configuration of the catalog (Howell, Mitchell, square Mitchell, generic forms) and a few
+# sectioned Mitchell fields are built and saved, one after another in this process, into a
+# scratch directory.  Outputs are reproducible (fixed seed and date), so their sizes, cells, and
+# pages only change when the code does.
+#
+# The results are compared to a baseline file.  A configuration slower, or with larger outputs,
+# than its baseline by more than the threshold is a regression, and the exit status is 1.
+#
+# --save: make this run the baseline
+# --quick: only the artifacts shipped with the repo
+# -r #: build each configuration # times, keep the fastest (3)
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from maininit import setlog
+from movements import newDocument, Movements
+from mitchell import SectionedMitchell
+from generic import GenericPDF
+from docset import DupBridge
+from catalog import allArtifacts, artifactName, Shipped
+
+here = os.path.dirname(os.path.abspath(__file__))
+Baseline = f'{here}/.bench.json'
+Date = datetime.date(2000, 1, 1)
+# Sectioned Mitchell fields, beyond the catalog
+Fields = [('mitchell', 36, 3), ('mitchell', 60, 3), ('mitchell', 120, 3)]
+# CPU time is compared, less sensitive than wall time to whatever else runs on the box.
+# Differences of less than this are noise, not regressions.
+MinSeconds = 0.05
+
+def newBenchDocument(log, movement, pairs, decks):
+    if movement == 'generic':
+        return GenericPDF()
+    if movement == 'mitchell' and pairs > 24:
+        return SectionedMitchell(log, pairs, decks, False, None)
+    return newDocument(log, movement, pairs, decks)
+
+# Build and save one configuration
+# Returns {'Seconds', 'CPU', 'Bytes', 'Cells', 'Pages'}, None if it cannot be made
+def measure(log, movement, pairs, decks, outDir, repeat=1):
+    best = None
+    for _ in range(repeat):
+        DupBridge.setReproducible(0, Date)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            cpu = time.process_time()
+            doc = newBenchDocument(log, movement, pairs, decks)
+            if doc is None:
+                return None
+            if movement == 'generic':
+                doc.printPDF(outDir)
+            else:
+                doc.build()
+                doc.save(outDir)
+            secs = (time.perf_counter() - start, time.process_time() - cpu)
+        best = secs if best is None else min(best, secs, key=lambda s: s[1])
+    wb = getattr(doc, 'wb', None)
+    return {'Seconds': best[0], 'CPU': best[1],
+            'Bytes': sum(os.path.getsize(f) for f in doc.saved),
+            'Cells': sum(len(ws._cells) for ws in wb.worksheets) if wb is not None else 0,
+            'Pages': doc.pdf.page}
+
+def runBench(log, configs, repeat=1, outDir=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        # imports and layout caches warm up in the first build, not timed
+        if configs:
+            measure(log, *configs[0], scratch)
+        for m, p, b in configs:
+            name = artifactName(m, p, b)
+            r = measure(log, m, p, b, outDir or scratch, repeat)
+            if r is None:
+                log.error(f'{name} cannot be made')
+                continue
+            results[name] = r
+            log.info(f'{name}: {r["Seconds"]:.3f}s')
+    return results
+
+# Returns the names of the regressions
+def compare(results, baseline, threshold):
+    regressed = []
+    print(f'{"":>16} {"Wall s":>8} {"CPU s":>8} {"Base":>8} {"Change":>7} {"Bytes":>9} {"Cells":>7} {"Pages":>6}')
+    for name, r in results.items():
+        base = baseline.get(name)
+        notes = []
+        if base is None:
+            change = ''
+            notes.append('new')
+        else:
+            change = f'{r["CPU"] / base["CPU"] - 1:+7.0%}'
+            if r['CPU'] > base['CPU'] * (1 + threshold) and r['CPU'] - base['CPU'] > MinSeconds:
+                notes.append('SLOWER')
+            if r['Bytes'] > base['Bytes'] * (1 + threshold):
+                notes.append('LARGER')
+            for k in ['Bytes', 'Cells', 'Pages']:
+                if r[k] != base[k]:
+                    notes.append(f'{k.lower()} {base[k]} -> {r[k]}')
+        if 'SLOWER' in notes or 'LARGER' in notes:
+            regressed.append(name)
+        baseSecs = f'{base["CPU"]:8.3f}' if base else f'{"":>8}'
+        print(f'{name:>16} {r["Seconds"]:8.3f} {r["CPU"]:8.3f} {baseSecs} {change:>7} {r["Bytes"]:>9} {r["Cells"]:>7} {r["Pages"]:>6}'
+              f'  {", ".join(notes)}')
+    total = sum(r['Seconds'] for r in results.values())
+    print(f'{len(results)} configurations in {total:.2f}s, {len(regressed)} regressed by more than {threshold:.0%}')
+    return regressed
+
+def loadBaseline(fn):
+    if not os.path.exists(fn):
+        return {}
+    with open(fn, 'r') as f:
+        return json.load(f)
+
+def saveBaseline(fn, results):
+    with open(fn, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    log = setlog('bench', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true', help='Only the artifacts shipped with the repo')
+    parser.add_argument('-m', '--movement', nargs='+', choices=Movements + ('generic',), help='Only these movements')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Build each configuration # times, keep the fastest')
+    parser.add_argument('-t', '--threshold', type=float, default=0.25, help='Regression threshold, 0.25 for 25%%')
+    parser.add_argument('-b', '--baseline', type=str, default=Baseline, help='Baseline file')
+    parser.add_argument('--save', action='store_true', help='Save this run as the baseline')
+    parser.add_argument('-o', '--outdir', type=str, help='Keep the outputs in this directory')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    configs = Shipped if args.quick else allArtifacts() + Fields
+    if args.movement:
+        configs = [c for c in configs if c[0] in args.movement]
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+    results = runBench(log, configs, args.repeat, args.outdir)
+    regressed = compare(results, loadBaseline(args.baseline), args.threshold)
+    if args.save:
+        saveBaseline(args.baseline, results)
+        print(f'Baseline saved in {args.baseline}')
+    elif regressed:
+        raise SystemExit(1)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Build the catalog of documents, all in one go
+# Every artifact is a job on a pool of worker processes.  The workers import openpyxl/fpdf/json5
+# once and then take job after job, the biggest first, so that a full rebuild takes about as long
+# as the slowest artifact.
+#
+# The outputs are reproducible, from a seed and a date (today by default).  A manifest in the
+# output directory keeps the digest of the inputs of each artifact and the hashes of its files.
+# Artifacts whose inputs and files are unchanged are skipped.  The date is an input only when
+# given: an artifact built without "--date" keeps the date it was built on until it is rebuilt.
+# A names file gives the names to every artifact, not its "File": each keeps its own file name.
+#
+# Without options, the artifacts shipped with the repo (as regen.sh used to do one by one).
+# --all: every supported combination of movement, pairs, and boards per round
+# -j #: number of worker processes, all the cores by default
+# --force: build even the unchanged ones
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from maininit import setlog
+from movements import newDocument, Movements
+from generic import GenericPDF
+from docset import DupBridge
+from template import sourceDigest
+
+here = os.path.dirname(os.path.abspath(__file__))
+Manifest = '.catalog.json'
+
+# (movement, pairs, boards per round), movement is one of Movements or 'generic'
+Shipped = [('mitchell', 8, 4), ('square', 8, 3), ('mitchell', 9, 3), ('mitchell', 10, 3),
+           ('howell', 4, 3), ('howell', 5, 3), ('howell', 6, 3), ('howell', 7, 3),
+           ('generic', 0, 0)]
+
+# Same limits as the command lines of the generators
+def allArtifacts():
+    jobs = []
+    for b in range(1, 7):
+        jobs += [('howell', p, b) for p in range(4, 15)]
+        jobs += [('mitchell', p, b) for p in range(8, 25) if p not in [11, 15, 16]]
+        jobs.append(('square', 8, b))
+    jobs.append(('generic', 0, 0))
+    return jobs
+
+def artifactName(movement, pairs, decks):
+    return 'generic' if movement == 'generic' else f'{movement}{pairs}x{decks}'
+
+# Everything the bytes of an artifact depend on
+def inputDigest(movement, pairs, decks, fake, seed, date, names=None):
+    digest = hashlib.sha256(sourceDigest(movement).encode())
+    digest.update(json.dumps([movement, pairs, decks, fake, seed, date and date.isoformat()]).encode())
+    if names and os.path.exists(names):
+        digest.update(fileHash(names).encode())
+    return digest.hexdigest()
+
+def fileHash(fn):
+    with open(fn, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def loadManifest(outDir):
+    fn = f'{outDir}/{Manifest}'
+    if not os.path.exists(fn):
+        return {}
+    with open(fn, 'r') as f:
+        return json.load(f)
+
+def saveManifest(outDir, manifest):
+    with open(f'{outDir}/{Manifest}', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+# Same inputs, and the files are still what was built from them
+def upToDate(outDir, entry, digest):
+    if entry is None or entry['Inputs'] != digest:
+        return False
+    for fn, h in entry['Outputs'].items():
+        if not os.path.exists(f'{outDir}/{fn}') or fileHash(f'{outDir}/{fn}') != h:
+            return False
+    return True
+
+# The names of a names file but its "File", None without one
+def catalogNames(fn):
+    if not fn or not os.path.exists(fn):
+        return None
+    import json5
+    try:
+        with open(fn, 'r') as f:
+            names = json5.load(f)
+    except:
+        return None     # as docset.loadNames does
+    names.pop('File', None)
+    return names
+
+# Worker side, one artifact
+# Returns (name, seconds, error, files written)
+def buildArtifact(log, movement, pairs, decks, outDir, fake, seed, date, names):
+    start = time.perf_counter()
+    name = artifactName(movement, pairs, decks)
+    DupBridge.setReproducible(seed, date)
+    try:
+        names = catalogNames(names)
+        if movement == 'generic':
+            doc = GenericPDF()
+            doc.printPDF(outDir)
+        else:
+            doc = newDocument(log, movement, pairs, decks, names, fake)
+            if doc is None:
+                return name, time.perf_counter() - start, 'cannot be made', []
+            doc.build()
+            doc.save(outDir)
+    except Exception as e:
+        return name, time.perf_counter() - start, repr(e), []
+    return name, time.perf_counter() - start, None, doc.saved
+
+# Build them all, biggest first
+# Returns {name: (seconds, error)}, None seconds if skipped, and the wall time
+def buildCatalog(log, artifacts, outDir=None, jobs=None, fake=False, seed=0, date=None, names=None, force=False):
+    outDir = outDir or f'{here}/..'
+    os.makedirs(outDir, exist_ok=True)
+    manifest = loadManifest(outDir)
+    results = {}
+    todo = []
+    for m, p, b in sorted(artifacts, key=lambda a: a[1] * a[2], reverse=True):
+        name = artifactName(m, p, b)
+        digest = inputDigest(m, p, b, fake, seed, date, names)
+        if not force and upToDate(outDir, manifest.get(name), digest):
+            results[name] = (None, None)
+        else:
+            todo.append((m, p, b, digest))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = {pool.submit(buildArtifact, log, m, p, b, outDir, fake, seed, date or datetime.date.today(), names): digest
+                    for m, p, b, digest in todo}
+        for f in as_completed(pending):
+            name, secs, err, files = f.result()
+            results[name] = (secs, err)
+            if err:
+                log.error(f'{name}: {err}')
+                manifest.pop(name, None)
+                continue
+            manifest[name] = {'Inputs': pending[f],
+                              'Outputs': {os.path.basename(fn): fileHash(fn) for fn in files}}
+    saveManifest(outDir, manifest)
+    return results, time.perf_counter() - start
+
+def showTimes(results, wall):
+    built = {n: v for n, v in results.items() if v[0] is not None}
+    for name in sorted(built.keys(), key=lambda n: built[n][0], reverse=True):
+        secs, err = built[name]
+        print(f'{name:>16} {secs:6.2f}s{"  FAILED " + err if err else ""}')
+    if built:
+        total = sum(v[0] for v in built.values())
+        slowest = max(v[0] for v in built.values())
+        print(f'{len(built)} artifacts in {wall:.2f}s, {total:.2f}s of work, the slowest {slowest:.2f}s')
+    print(f'{len(results) - len(built)} artifacts unchanged')
+
+
+if __name__ == '__main__':
+    log = setlog('catalog', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--all', action='store_true', help='Every supported movement, pairs, and boards')
+    parser.add_argument('-m', '--movement', nargs='+', choices=Movements + ('generic',), help='Only these movements')
+    parser.add_argument('-j', '--jobs', type=int, help='# of worker processes, default all cores')
+    parser.add_argument('-o', '--outdir', type=str, help='Output directory')
+    parser.add_argument('-f', '--fake', action='store_true', help='Fake scores to test the spreadsheet')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--date', type=datetime.date.fromisoformat, help='Date on the documents, YYYY-MM-DD')
+    parser.add_argument('-n', '--names', type=str, help='Names in the tournament, for all the artifacts')
+    parser.add_argument('--force', action='store_true', help='Build even the unchanged artifacts')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    artifacts = allArtifacts() if args.all else Shipped
+    if args.movement:
+        artifacts = [a for a in artifacts if a[0] in args.movement]
+    results, wall = buildCatalog(log, artifacts, args.outdir, args.jobs, args.fake, args.seed, args.date,
+                                 args.names, args.force)
+    showTimes(results, wall)
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# Double dummy: the tricks each declarer takes in each strain with all hands in view, and par
+# A hand is a 52-bit mask, card suit * 13 + rank as in deals.py (spades first, rank 12 the ace).
+# Seats are N, E, S, W (0..3), strains S, H, D, C (0..3) and NT (4).
+#
+# The search asks "can NS take at least so many more tricks?" (alpha-beta on a yes/no question)
+# and narrows the answer down from a guess.  What is learned is kept:
+#   Transposition table: at the start of each trick, the bounds on NS tricks of the position.
+#     Positions are kept by the relative ranks of the remaining cards: once the small cards are
+#     gone, the 5 and 4 left are as good as the ace and the king.  And only the cards that won
+#     tricks by their rank count, the ones below them in the suit are "small cards" of any rank,
+#     so endings of different plays share their entries.  The table lasts for a board, across
+#     its strains and declarers.
+#   Equivalent cards: of cards in sequence (no one else holds a card between them) one is tried.
+#   Move ordering: cheapest winner first, low when partner wins, second hand high with the top
+#     card, high leads first.
+#   Quick tricks: winners the side on lead cashes at once, its own and then partner's reached by
+#     a low card, settle the question early; so do the top trumps of the other side.
+#   Budget: a board searching more than Budget positions is given up, reported as unsolved.
+#
+# Par: the contract both sides end up in when each bids as far as it pays, scored as
+# DupBridge.score and DupBridge.penalty (sacrifices are doubled).
+#
+# -n #: boards (36), dealt as deals.py with --seed
+# -w #: solve the boards in # processes, all the cores by default
+# -b #: positions searched for a board at most (Budget), 0: no limit
+# The search is plain Python: a board, 20 searches, takes from a second to a few minutes.
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from maininit import setlog
+
+Seats = 'NESW'
+Strains = 'SHDCN'
+NT = 4
+Suit = 0x1FFF
+
+# Transposition table: (trump, leader, suit lengths of the hands) -> entries of the positions
+# with those lengths, [pattern, lowest, highest NS tricks from there].  The pattern is, by suit,
+# the number of top cards that decided the result and their seats; the smaller cards only count.
+# Cleared at each board, and when it holds more than TTLimit entries.
+TT = {}
+TTLimit = 500_000
+TTSize = [0]
+# Positions searched, for the statistics and the budget
+Nodes = [0]
+# Positions searched for a board at most before it is given up as unsolved
+Budget = 1_000_000
+# The memos of the suits below are cleared when they hold more than MemoLimit entries
+MemoLimit = 200_000
+
+# A board not solved within its budget
+class Unsolved(Exception):
+    pass
+
+# A suit as held by N, E, S, W: (relative ranks, cards, lengths, the cards).  The relative ranks
+# are the seat of each card remaining, high to low, as base-4 digits after a leading 1, the
+# lengths 4 bits a seat.  The same for all deals, kept across boards.
+SuitKeys = {}
+
+def suitKey(m):
+    key = SuitKeys.get(m)
+    if key is None:
+        code = 1
+        present = m[0] | m[1] | m[2] | m[3]
+        r = 12
+        while r >= 0:
+            bit = 1 << r
+            if present & bit:
+                code = code * 4 + (0 if m[0] & bit else 1 if m[1] & bit else 2 if m[2] & bit else 3)
+            r -= 1
+        key = (code, present.bit_count(), m[0].bit_count() | m[1].bit_count() << 4 |
+               m[2].bit_count() << 8 | m[3].bit_count() << 12, present)
+        if len(SuitKeys) >= MemoLimit:
+            SuitKeys.clear()
+        SuitKeys[m] = key
+    return key
+
+# The highest cards of a suit: Tops[present][n] the "n" highest of the cards "present"
+def topsOf(present):
+    out = [0]
+    while present:
+        bit = 1 << (present.bit_length() - 1)
+        out.append(out[-1] | bit)
+        present ^= bit
+    return tuple(out)
+
+Tops = [topsOf(present) for present in range(Suit + 1)]
+
+# One card of each sequence of "mine" in a suit, the others remaining being "present"
+# Returns the ranks high to low
+Sequences = {}
+
+def sequences(mine, present):
+    out = Sequences.get((mine, present))
+    if out is None:
+        out = []
+        inRun = False
+        r = 12
+        while r >= 0:
+            bit = 1 << r
+            if mine & bit:
+                if not inRun:
+                    out.append(r)
+                    inRun = True
+            elif present & bit:
+                inRun = False
+            r -= 1
+        if len(Sequences) >= MemoLimit:
+            Sequences.clear()
+        Sequences[(mine, present)] = out
+    return out
+
+# The tricks "mine" cashes on lead in a suit, partner "pd" playing low: by rank while an opponent
+# may hold a higher card, then by length once the opponents, "longest" cards at most, are out.
+# For each trick, the cards whose ranks decide it: those remaining from the top down to the one
+# cashed, or to partner's when partner still follows.
+Cashes = {}
+
+def cashes(mine, pd, present, longest):
+    key = (mine, pd, present, longest)
+    out = Cashes.get(key)
+    if out is None:
+        out = []
+        opp = present & ~(mine | pd)
+        oppTop = 1 << (opp.bit_length() - 1) if opp else 0
+        left, low = mine, pd
+        ranks = 0
+        while left:
+            card = 1 << (left.bit_length() - 1)
+            under = low & -low
+            if under > card or (card < oppTop and len(out) < longest):
+                break
+            left ^= card
+            low ^= under
+            if under or len(out) < longest:
+                ranks = present & ~(card - 1)
+            out.append(ranks)
+        if len(Cashes) >= MemoLimit:
+            Cashes.clear()
+        out = Cashes[key] = tuple(out)
+    return out
+
+class Solver:
+    # "hands" as 52-bit masks, kept as 13-bit suit masks [seat][suit]
+    # "last": Nodes count past which the search raises Unsolved, None: no limit
+    def __init__(self, hands, trump, last=None):
+        self.suits = [[(h >> (13 * s)) & Suit for s in range(4)] for h in hands]
+        self.trump = trump
+        self.last = last
+        self.played = [0, 0, 0, 0]  # cards in the trick so far, by suit, for the sequences
+
+    # Tricks the side of "leader" cashes from the top at once: the winners of the leader, then
+    # those of partner in the other suits when a low card reaches partner; or the top cards of
+    # partner reached at once.  Cards that the opponents can ruff are not counted.  Returns the
+    # tricks and the cards counted, as a 52-bit mask.
+    def quickTricks(self, leader):
+        suits = self.suits
+        trump = self.trump
+        lho, pd, rho = suits[(leader + 1) % 4], suits[(leader + 2) % 4], suits[(leader + 3) % 4]
+        me = suits[leader]
+        # the rounds of suit "s" before an opponent with trumps ruffs
+        def rounds(s, n):
+            if trump == NT or s == trump:
+                return n
+            if lho[trump] and lho[s].bit_count() < n:
+                n = lho[s].bit_count()
+            if rho[trump] and rho[s].bit_count() < n:
+                n = rho[s].bit_count()
+            return n
+        total = cards = 0
+        theirs = mask = 0       # partner's, in the suits the leader does not cash
+        entry = False
+        spare = sum(m.bit_count() for m in pd)  # partner's cards free to follow or discard
+        for s in range(4):
+            present = me[s] | lho[s] | pd[s] | rho[s]
+            longest = max(lho[s].bit_count(), rho[s].bit_count())
+            won = cashes(me[s], pd[s], present, longest) if me[s] else ()
+            n = rounds(s, len(won))
+            if n:
+                total += n
+                cards |= won[n - 1] << (13 * s)
+                spare -= n
+            elif pd[s]:
+                won = cashes(pd[s], me[s], present, longest)
+                n = rounds(s, len(won))
+                if n:
+                    theirs += n
+                    mask |= won[n - 1] << (13 * s)
+                    spare -= n
+                    entry = entry or me[s] != 0
+        best = (total + theirs, cards | mask) if entry and spare >= 0 else (total, cards)
+        for s in range(4):
+            if me[s] and pd[s] and pd[s] > (me[s] | lho[s] | rho[s]) and rounds(s, 1):
+                total = cards = 0
+                for t in range(4):
+                    if pd[t]:
+                        present = me[t] | lho[t] | pd[t] | rho[t]
+                        won = cashes(pd[t], me[t], present, max(lho[t].bit_count(), rho[t].bit_count()))
+                        n = rounds(t, len(won))
+                        if n:
+                            total += n
+                            cards |= won[n - 1] << (13 * t)
+                if total > best[0]:
+                    best = (total, cards)
+                break
+        return best
+
+    # Trump tricks the side of "seat" takes whatever is played: the trumps of one of its hands
+    # above all those of the opponents.  Returns the tricks and the cards counted, as quickTricks.
+    def sureTricks(self, seat):
+        trump = self.trump
+        if trump == NT:
+            return 0, 0
+        suits = self.suits
+        mine, pd = suits[seat][trump], suits[(seat + 2) % 4][trump]
+        opp = suits[(seat + 1) % 4][trump] | suits[(seat + 3) % 4][trump]
+        above = ~((1 << (opp.bit_length() - 1)) - 1) if opp else Suit
+        n = max((mine & above).bit_count(), (pd & above).bit_count())
+        return (n, ((mine | pd | opp) & above) << (13 * trump)) if n else (0, 0)
+
+    # Can NS take at least "target" of the "remaining" tricks, "leader" to lead?
+    # Returns the answer and the cards whose ranks decided it, as a 52-bit mask: the answer holds
+    # for every position with the same suit lengths where these cards and those above them are
+    # held alike.
+    def wins(self, leader, target, remaining):
+        if target <= 0:
+            return True, 0
+        if target > remaining:
+            return False, 0
+        suits = self.suits
+        n, e, so, w = suits
+        keys = (suitKey((n[0], e[0], so[0], w[0])), suitKey((n[1], e[1], so[1], w[1])),
+                suitKey((n[2], e[2], so[2], w[2])), suitKey((n[3], e[3], so[3], w[3])))
+        (c0, n0, l0, p0), (c1, n1, l1, p1), (c2, n2, l2, p2), (c3, n3, l3, p3) = keys
+        bucketKey = (self.trump, leader, l0, l1, l2, l3)
+        bucket = TT.get(bucketKey)
+        if bucket is None:
+            bucket = TT[bucketKey] = {}
+        for (t0, t1, t2, t3), entries in bucket.items():
+            bounds = entries.get((c0 >> 2 * (n0 - t0), c1 >> 2 * (n1 - t1), c2 >> 2 * (n2 - t2), c3 >> 2 * (n3 - t3)))
+            if bounds is not None and (bounds[0] >= target or bounds[1] < target):
+                return bounds[0] >= target, (Tops[p0][t0] | Tops[p1][t1] << 13 | Tops[p2][t2] << 26 |
+                                             Tops[p3][t3] << 39)
+        Nodes[0] += 1
+        if self.last is not None and Nodes[0] > self.last:
+            raise Unsolved()
+        qt, ranks = self.quickTricks(leader)
+        if leader % 2 == 0 and qt >= target:
+            result, lo, hi = True, qt, remaining
+        elif leader % 2 == 1 and remaining - qt < target:
+            result, lo, hi = False, 0, remaining - qt
+        else:
+            # the other side's sure tricks
+            st, sure = self.sureTricks((leader + 1) % 4)
+            if leader % 2 == 1 and st >= target:
+                result, lo, hi, ranks = True, st, remaining, sure
+            elif leader % 2 == 0 and remaining - st < target:
+                result, lo, hi, ranks = False, 0, remaining - st, sure
+            else:
+                result, ranks = self.play(0, leader, -1, -1, -1, target, remaining)
+                lo, hi = (target, remaining) if result else (0, target - 1)
+        # by suit, the number of cards from the lowest that counted up, and their relative ranks
+        tops = [0, 0, 0, 0]
+        for s in range(4):
+            m = (ranks >> (13 * s)) & Suit
+            if m:
+                tops[s] = (keys[s][3] & ~((m & -m) - 1)).bit_count()
+        tops = tuple(tops)
+        entries = bucket.get(tops)
+        if entries is None:
+            entries = bucket[tops] = {}
+        pattern = tuple(keys[s][0] >> 2 * (keys[s][1] - tops[s]) for s in range(4))
+        bounds = entries.get(pattern)
+        if bounds is not None:
+            bounds[0] = max(bounds[0], lo)
+            bounds[1] = min(bounds[1], hi)
+        else:
+            if TTSize[0] >= TTLimit:
+                TT.clear()
+                TTSize[0] = 0
+                TT[bucketKey] = {tops: entries}
+            entries[pattern] = [lo, hi]
+            TTSize[0] += 1
+        return result, ranks
+
+    # Seat "seat" plays the "k"th card of the trick led in suit "led".
+    # "win" and "winCard" are the seat and the card (suit * 13 + rank) winning the trick so far.
+    # Returns the answer and the cards that decided it, as wins.
+    def play(self, k, seat, led, win, winCard, target, remaining):
+        hand = self.suits[seat]
+        played = self.played
+        ns = seat % 2 == 0
+        trump = self.trump
+        ranks = 0
+        for card in self.moves(k, seat, led, win, winCard):
+            s, r = divmod(card, 13)
+            hand[s] ^= 1 << r
+            if k == 0:
+                nLed, nWin, nWinCard = s, seat, card
+            else:
+                nLed = led
+                ws = winCard // 13
+                if (s == ws and card > winCard) or (s == trump and ws != trump):
+                    nWin, nWinCard = seat, card
+                else:
+                    nWin, nWinCard = win, winCard
+            if k == 3:
+                ok, cards = self.wins(nWin, target - (1 if nWin % 2 == 0 else 0), remaining - 1)
+                # the winner counts by its rank when it beat a card of its own suit
+                ws = nWinCard // 13
+                if (played[ws] | (1 << r if s == ws else 0)).bit_count() > 1:
+                    cards |= 1 << nWinCard
+            else:
+                played[s] |= 1 << r
+                ok, cards = self.play(k + 1, (seat + 1) % 4, nLed, nWin, nWinCard, target, remaining)
+                played[s] ^= 1 << r
+            hand[s] ^= 1 << r
+            if ok == ns:
+                return ok, cards
+            ranks |= cards
+        return not ns, ranks
+
+    # The cards worth trying, the likeliest best first
+    def moves(self, k, seat, led, win, winCard):
+        suits = self.suits
+        hand = suits[seat]
+        trump = self.trump
+        if k == 0:
+            return self.leads(seat)
+        partnerWins = win % 2 == seat % 2
+        mine = hand[led]
+        if mine:
+            present = suits[0][led] | suits[1][led] | suits[2][led] | suits[3][led] | self.played[led]
+            cards = [13 * led + r for r in reversed(sequences(mine, present))]    # lowest first
+            if k == 1 and winCard // 13 == led and mine > present & ~mine:
+                fourth = suits[(seat + 2) % 4]
+                if trump == NT or led == trump or fourth[led] or not fourth[trump]:
+                    return cards[-1:] + cards[:-1]  # second hand wins with the top card
+            if partnerWins or winCard // 13 != led or k == 1:
+                return cards    # low, or cannot beat a ruff, or second hand low
+            return [c for c in cards if c > winCard] + [c for c in cards if c < winCard]
+        # void in the suit led: ruff, lowest winning trump first, unless partner wins, then discards
+        out = []
+        ruffs = []
+        for s in range(4):
+            if hand[s]:
+                present = suits[0][s] | suits[1][s] | suits[2][s] | suits[3][s] | self.played[s]
+                cards = [13 * s + r for r in reversed(sequences(hand[s], present))]
+                if s == trump and not partnerWins:
+                    beat = winCard // 13 != trump
+                    ruffs += [c for c in cards if beat or c > winCard]
+                    out += [c for c in cards if not (beat or c > winCard)]
+                else:
+                    out += cards
+        out.sort(key=lambda c: c % 13)
+        return ruffs + out
+
+    # Leads, the likeliest best first: cash a top card, lead to partner's top card, top of a
+    # sequence, then low from length
+    def leads(self, seat):
+        suits = self.suits
+        me = suits[seat]
+        pd = suits[(seat + 2) % 4]
+        opp = (suits[(seat + 1) % 4], suits[(seat + 3) % 4])
+        ranked = []
+        for s in range(4):
+            if not me[s]:
+                continue
+            others = pd[s] | opp[0][s] | opp[1][s]
+            present = me[s] | others
+            ranks = sequences(me[s], present)
+            top = present.bit_length() - 1
+            for i, r in enumerate(ranks):
+                if r == top:
+                    weight = 100     # cash
+                elif pd[s] >> top & 1 and i == len(ranks) - 1:
+                    weight = 90      # low to partner's winner
+                elif i == 0 and r >= 9 and me[s] >> (r - 1) & 1:
+                    weight = 60 + r  # top of a sequence
+                elif i == len(ranks) - 1:
+                    weight = 40 + me[s].bit_count()  # low from length
+                else:
+                    weight = 20 + r
+                if s == self.trump and weight < 100:
+                    weight -= 15
+                ranked.append((weight, 13 * s + r))
+        ranked.sort(reverse=True)
+        return [c for _, c in ranked]
+
+    # NS tricks, "leader" on lead
+    def tricks(self, leader, guess=None):
+        remaining = sum(m.bit_count() for m in self.suits[0])
+        lo, hi = 0, remaining
+        g = guess if guess is not None else (remaining + 1) // 2
+        while lo < hi:
+            t = min(max(g, lo + 1), hi)
+            if self.wins(leader, t, remaining)[0]:
+                lo = t
+                g = t + 1
+            else:
+                hi = t - 1
+                g = t - 1
+        return lo
+
+# Tricks of each declarer (N, E, S, W) in each strain (S, H, D, C, NT): [declarer][strain]
+# None if the board takes more than "budget" positions (None: no limit)
+def tricksTable(hands, budget=Budget):
+    TT.clear()
+    TTSize[0] = 0
+    last = Nodes[0] + budget if budget is not None else None
+    table = [[0] * 5 for _ in range(4)]
+    ns = None    # the last answer is the first guess of the next search
+    try:
+        for strain in [NT, 0, 1, 2, 3]:
+            solver = Solver(hands, strain, last)
+            for declarer in range(4):
+                ns = solver.tricks((declarer + 1) % 4, ns)
+                table[declarer][strain] = ns if declarer % 2 == 0 else hands[0].bit_count() - ns
+    except Unsolved:
+        return None
+    return table
+
+# Worker side of solveBoards
+def solveBoard(hands, budget):
+    return tricksTable(hands, budget)
+
+# Tricks tables of many deals, in order as they are solved, in "workers" processes (all the cores
+# if None, 0: in this one); None for a board not solved within "budget" positions
+def solveBoards(allHands, workers=None, budget=Budget):
+    if workers == 0:
+        for h in allHands:
+            yield tricksTable(h, budget)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(solveBoard, allHands, [budget] * len(allHands), chunksize=1)
+
+# Hands of a board of deals.Deals as masks
+def dealHands(deals, b):
+    hands = [0, 0, 0, 0]
+    for card, seat in enumerate(deals.hands[b]):
+        hands[seat] |= 1 << card
+    return hands
+
+
+# Par of a board: the best contract of the side that can outbid the other where it pays
+# "vul" as DupBridge.vulLookup.  Returns (NS score, contracts as "4S N", "5HX E", ...)
+def par(scorer, table, vul):
+    vulSide = [vul in ('NS', 'Both'), vul in ('EW', 'Both')]
+    # Bids in order, 1C to 7NT: (level, strain)
+    bids = [(lvl, s) for lvl in range(1, 8) for s in [3, 2, 1, 0, 4]]
+    trumps = ['H/S', 'H/S', 'D/C', 'D/C', 'NT']
+
+    # Score of side "side" declaring "bid", the best of its two declarers; doubled if it fails
+    def value(side, bid):
+        lvl, s = bid
+        best = None
+        for d in (side, side + 2):
+            t = table[d][s]
+            v = scorer.score(lvl, trumps[s], t - lvl - 6, vulSide[side], 0) if t >= lvl + 6 else \
+                -scorer.penalty(lvl + 6 - t, vulSide[side], 1)
+            if best is None or v > best[0]:
+                best = (v, d)
+        return best
+
+    values = [[value(side, b) for b in bids] for side in range(2)]
+    memo = {}
+    # NS score when "side" has bid "i" and the other side may pass or outbid
+    def settle(i, side):
+        if (i, side) in memo:
+            return memo[(i, side)]
+        v, d = values[side][i]
+        best = (v if side == 0 else -v, [(i, side, d)])
+        other = 1 - side
+        for j in range(i + 1, len(bids)):
+            r = settle(j, other)
+            if (other == 0 and r[0] > best[0]) or (other == 1 and r[0] < best[0]):
+                best = r
+            elif r[0] == best[0] and r[1][0][1] == other:
+                best = (best[0], best[1] + [c for c in r[1] if c not in best[1]])
+        memo[(i, side)] = best
+        return best
+
+    # passed out, or either side opening
+    result = (0, [])
+    for side in range(2):
+        for i in range(len(bids)):
+            r = settle(i, side)
+            if (side == 0 and r[0] > result[0]) or (side == 1 and r[0] < result[0]):
+                result = r
+    names = []
+    for i, side, d in result[1]:
+        lvl, s = bids[i]
+        doubled = 'X' if table[d][s] < lvl + 6 else ''
+        names.append(f'{lvl}{Strains[s].replace("N", "NT")}{doubled} {Seats[d]}')
+    return result[0], names
+
+
+if __name__ == '__main__':
+    from deals import Deals
+    from docset import DupBridge
+    log = setlog('dd', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--boards', type=int, default=36, help='Boards to solve')
+    parser.add_argument('--seed', type=int, help='Deal as deals.py --seed')
+    parser.add_argument('-w', '--workers', type=int, help='Solve in # processes, all the cores by default')
+    parser.add_argument('-b', '--budget', type=int, default=Budget, help='Positions searched for a board at most, 0: no limit')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    deals = Deals(args.boards, args.seed)
+    scorer = DupBridge(log)
+    start = time.perf_counter()
+    tables = solveBoards([dealHands(deals, b) for b in range(args.boards)], args.workers, args.budget or None)
+    print(f'{"Board":>5}  {"":>2} ' + ' '.join(f'{s:>2}' for s in Strains) + '  Par')
+    unsolved = 0
+    for b, table in enumerate(tables):
+        if table is None:
+            unsolved += 1
+            print(f'{b+1:>5}  not solved in {args.budget:,} positions')
+            continue
+        score, contracts = par(scorer, table, scorer.vulLookup(b))
+        for d in range(4):
+            lead = f'{b+1:>5}' if d == 0 else ' ' * 5
+            tail = f'  {score:+5} {", ".join(contracts)}' if d == 0 else ''
+            print(f'{lead}  {Seats[d]:>2} ' + ' '.join(f'{t:>2}' for t in table[d]) + tail)
+    print(f'{args.boards} boards in {time.perf_counter() - start:.1f}s' + (f', {unsolved} not solved' if unsolved else ''))
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# Random deals for the boards, and their hand records
+# All the boards are dealt at once with numpy: every board is a row of 52 cards, each holding the
+# hand it is dealt to, shuffled from a seeded generator.  Points and suit lengths of every hand are
+# counted for all the boards in the same pass.
+#
+# Dealer rotates N, E, S, W with the board number; vulnerability is DupBridge.vulLookup.
+# The hand records PDF has six boards a page, the four hands around the points of each, and a
+# last page of statistics: points of each seat and the most common shapes.  With "--par", each
+# board also has its double-dummy tricks and par (see dd.py), the boards solved on all the cores;
+# a board over the budget of dd.py says "Not solved" instead.
+#
+# -n #: boards in a session (36)
+# --sessions #: sessions dealt at once, board numbers start over in each (1)
+# --seed #: same seed, same deals
+# --par: double-dummy tricks and par on the hand records, "-w #" solves in # processes
+import argparse
+import logging
+import time
+import numpy as np
+import dd
+import pdf
+from maininit import setlog
+from docset import PairGames
+
+Seats = 'NESW'
+Suits = 'SHDC'
+Ranks = '23456789TJQKA'
+# Cards are suit * 13 + rank, rank 0 is the deuce and 12 the ace
+CardPoints = np.tile(np.array([0] * 9 + [1, 2, 3, 4], dtype=np.int8), 4)
+
+class Deals:
+    def __init__(self, boards, seed=None):
+        rng = np.random.default_rng(seed)
+        # hand (0..3, as Seats) of every card of every board
+        self.hands = rng.permuted(np.tile(np.repeat(np.arange(4, dtype=np.int8), 13), (boards, 1)), axis=1)
+        held = self.hands[:, :, None] == np.arange(4, dtype=np.int8)    # board x card x seat
+        self.points = np.einsum('bcs,c->bs', held, CardPoints, dtype=np.int32)
+        # board x seat x suit
+        self.lengths = held.reshape(boards, 4, 13, 4).sum(axis=2).transpose(0, 2, 1)
+        self.boards = boards
+
+    # Cards of a hand as text by suit, spades first, highest first
+    def hand(self, b, seat):
+        cards = np.flatnonzero(self.hands[b] == seat)
+        return [''.join(Ranks[c % 13] for c in reversed(cards[cards // 13 == s])) or '-' for s in range(4)]
+
+    # Shape of a hand, the longest suit first, "5-3-3-2"
+    def shape(self, b, seat):
+        return '-'.join(str(n) for n in sorted(self.lengths[b, seat], reverse=True))
+
+    # {shape: hands} over every hand of every board, the most common first
+    def shapes(self):
+        s = -np.sort(-self.lengths.reshape(-1, 4), axis=1)
+        shapes, counts = np.unique(s, axis=0, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        return {'-'.join(str(n) for n in shapes[i]): int(counts[i]) for i in order}
+
+
+class HandRecords(PairGames):
+    PerPage = 6
+
+    # "boards" per session, "sessions" dealt at once, "par" to solve them double dummy
+    def __init__(self, log, boards, sessions=1, seed=None, title=None, par=False, workers=None):
+        super().__init__(log)
+        self.decks = boards
+        self.sessions = sessions
+        self.deals = Deals(boards * sessions, seed if seed is not None else self.seed)
+        self.pdf = pdf.PDF(False)
+        self.wb = None
+        self.title = title or f'Hand Records, {boards} Boards'
+        self.par = par
+        self.workers = workers
+        self.tables = None
+        self.pdf.HeaderFooterText(f'{self.notice} {self.dateStamp()}.', self.title)
+
+    def dealer(self, b):
+        return Seats[b % 4]
+
+    # Board number within its session, zero-based
+    def boardOf(self, i):
+        return i % self.decks
+
+    def build(self):
+        if self.par:
+            self.tables = list(dd.solveBoards([dd.dealHands(self.deals, i) for i in range(self.deals.boards)],
+                                              self.workers))
+        for i in range(self.deals.boards):
+            if i % self.PerPage == 0:
+                self.pdf.add_page()
+                self.pdf.headerFooter()
+            self.diagram(i, i % self.PerPage)
+        self.statistics()
+
+    # One board in its slot of the page, 2 across, 3 down
+    def diagram(self, i, slot):
+        p = self.pdf
+        b = self.boardOf(i)
+        w = p.epw / 2
+        h = (p.eph - 2 * p.margin) / 3
+        x0 = p.margin + w * (slot % 2)
+        y0 = 2 * p.margin + h * (slot // 2)
+        p.set_font(p.serifFont, style='B', size=p.headerPt)
+        p.set_xy(x0, y0)
+        session = f'Session {i // self.decks + 1}, ' if self.sessions > 1 else ''
+        p.cell(text=f'{session}Board {b+1}')
+        p.set_font(p.sansSerifFont, size=p.notePt)
+        p.set_xy(x0, y0 + p.lineHeight(p.headerPt))
+        p.cell(text=f'Dealer {self.dealer(b)}, Vul {self.vulLookup(b)}')
+
+        lh = p.lineHeight(p.notePt)
+        handW = w / 3
+        top = y0 + p.lineHeight(p.headerPt) * 2
+        places = {0: (x0 + handW, top), 3: (x0, top + 4 * lh), 1: (x0 + 2 * handW, top + 4 * lh),
+                  2: (x0 + handW, top + 8 * lh)}
+        for seat, (x, y) in places.items():
+            p.set_font(p.sansSerifFont, style='B', size=p.notePt)
+            p.set_xy(x, y)
+            p.cell(text=f'{Seats[seat]}  {self.deals.points[i, seat]} HCP')
+            p.set_font(p.fixedWidthFont, size=p.notePt)
+            for s, cards in enumerate(self.deals.hand(i, seat)):
+                p.set_xy(x, y + (s + 1) * lh * 0.75)
+                p.cell(text=f'{Suits[s]} {cards}')
+        # the compass in the middle, below North's last suit and above South
+        boxY, boxH = top + 4.75 * lh, 2.75 * lh
+        p.set_line_width(p.thinLine)
+        p.rect(x0 + handW + 0.2, boxY, handW - 0.6, boxH)
+        p.set_font(p.sansSerifFont, size=p.smallPt)
+        for seat, (dx, dy) in enumerate([(0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5)]):
+            label = Seats[seat]
+            p.set_xy(x0 + handW + 0.2 + (handW - 0.6) * dx - p.get_string_width(label) / 2 - p.c_margin,
+                     boxY + boxH * dy - lh / 2)
+            p.cell(text=label)
+        if self.tables:
+            self.ddTable(i, b, x0 + 2 * handW, top + 8 * lh)
+
+    # Tricks of each declarer in each strain, and par, in the corner under East
+    def ddTable(self, i, b, x, y):
+        p = self.pdf
+        table = self.tables[i]
+        if table is None:
+            p.set_font(p.sansSerifFont, size=p.smallPt)
+            p.set_xy(x, y)
+            p.cell(text='Not solved')   # over dd.Budget
+            return
+        score, contracts = dd.par(self, table, self.vulLookup(b))
+        lh = p.lineHeight(p.smallPt) * 0.75
+        rows = ['   ' + ' '.join(f'{s:>2}' for s in dd.Strains)] + \
+               [f'{Seats[d]}  ' + ' '.join(f'{t:>2}' for t in table[d]) for d in range(4)]
+        p.set_font(p.fixedWidthFont, size=p.smallPt)
+        for n, row in enumerate(rows):
+            p.set_xy(x, y + n * lh)
+            p.cell(text=row)
+        p.set_font(p.sansSerifFont, size=p.smallPt)
+        p.set_xy(x, y + 5 * lh)
+        p.cell(text=f'Par {score:+} {", ".join(contracts) or "passed out"}')
+
+    # Points of each seat, and the most common shapes
+    def statistics(self):
+        p = self.pdf
+        p.add_page()
+        p.headerFooter()
+        pts = self.deals.points
+        meta = {'Title': 'Statistics', 'Info': [['Boards', self.deals.boards]]}
+        y = p.meta(meta) + p.lineHeight(p.bigPt)
+        hdrs = ['Seat', 'Average HCP', 'Fewest', 'Most', 'Hands of 15+']
+        self.table(y, hdrs, [[Seats[s], f'{pts[:, s].mean():.2f}', f'{pts[:, s].min()}', f'{pts[:, s].max()}',
+                              f'{(pts[:, s] >= 15).mean():.1%}'] for s in range(4)])
+        y = p.get_y() + p.lineHeight(p.bigPt) * 2
+        hands = 4 * self.deals.boards
+        shapes = list(self.deals.shapes().items())[:10]
+        self.table(y, ['Shape', 'Hands', 'Share'], [[s, f'{n}', f'{n / hands:.1%}'] for s, n in shapes])
+
+    def table(self, y, hdrs, rows):
+        p = self.pdf
+        cols = []
+        p.set_font(p.sansSerifFont, style='B', size=p.linePt)
+        p.setHeaders(0, hdrs, cols)
+        x = (p.w - sum(cols)) / 2
+        p.headerRow(x, y - p.lineHeight(p.linePt), cols, hdrs)
+        p.set_font(p.sansSerifFont, size=p.linePt)
+        h = p.lineHeight(p.font_size_pt)
+        y = p.get_y() + h
+        p.grid(x, y, cols, h, len(rows))
+        for r in rows:
+            p.gridTexts(x, y, cols, h, r)
+            y += h
+        p.set_y(y)
+
+    def outputName(self):
+        return f'deals{self.decks}' + (f'x{self.sessions}' if self.sessions > 1 else '')
+
+    def save(self, outDir=None):
+        print(f'Saved {self.savePDF(self.outputPath(outDir))}')
+
+
+if __name__ == '__main__':
+    log = setlog('deals', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--boards', type=int, default=36, help='Boards in a session')
+    parser.add_argument('--sessions', type=int, default=1, help='Sessions dealt at once')
+    parser.add_argument('--seed', type=int, help='Random seed, for the same deals again')
+    parser.add_argument('-t', '--title', type=str, help='Title on the hand records')
+    parser.add_argument('--par', action='store_true', help='Double-dummy tricks and par of each board')
+    parser.add_argument('-w', '--workers', type=int, help='Solve the boards in # processes, all the cores by default')
+    parser.add_argument('-o', '--outdir', type=str, help='Output directory')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    start = time.perf_counter()
+    doc = HandRecords(log, args.boards, args.sessions, args.seed, args.title, args.par, args.workers)
+    dealt = time.perf_counter()
+    doc.build()
+    doc.save(args.outdir)
+    print(f'{doc.deals.boards} boards dealt in {(dealt - start) * 1000:.1f} ms, '
+          f'hand records in {time.perf_counter() - dealt:.2f}s')
@@ -5,12 +5,71 @@
 from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.worksheet.errors import IgnoredError
 import random
+import datetime
+import os
+import io
+import json5
+import pickle
+import zipfile
+import copy
+import contextlib
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from stages import StageProfiler
+from scoring import IMPRanges
+
+# Stages of a build when not profiling, see PairGames.stage
+Unprofiled = contextlib.nullcontext()
+
+# Worker side of PairGames.startSections: one section into a PDF of its own
+# The first section also gets the page the PDF starts with.
+def drawSection(state, section, first):
+    doc = pickle.loads(state)
+    doc.pdf = doc.pdf.sibling(first)
+    getattr(doc, section)()
+    return doc.pdf
+
+# Move the sheets of workbook "other" to the end of "wb", as a section of a field built apart.
+# Cell styles are indices into the workbook's fonts, fills, ...  They are re-indexed as "wb"'s.
+# Named styles are not used, all stay "Normal".
+def adoptSheets(wb, other):
+    styles = {}
+    kinds = (('_fonts', 'fontId'), ('_fills', 'fillId'), ('_borders', 'borderId'),
+             ('_alignments', 'alignmentId'), ('_protections', 'protectionId'))
+    def restyle(style):
+        if style is None:
+            return None
+        key = tuple(style)
+        if key not in styles:
+            new = copy.copy(style)
+            for table, field in kinds:
+                setattr(new, field, getattr(wb, table).add(getattr(other, table)[getattr(style, field)]))
+            if style.numFmtId >= BUILTIN_FORMATS_MAX_SIZE:
+                fmt = other._number_formats[style.numFmtId - BUILTIN_FORMATS_MAX_SIZE]
+                new.numFmtId = wb._number_formats.add(fmt) + BUILTIN_FORMATS_MAX_SIZE
+            styles[key] = new
+        return copy.copy(styles[key])
+
+    for ws in other.worksheets:
+        for c in ws._cells.values():
+            c._style = restyle(c._style)
+        for d in list(ws.row_dimensions.values()) + list(ws.column_dimensions.values()):
+            d._style = restyle(d._style)
+        ws._parent = wb
+        wb._add_sheet(ws)
+    other._sheets = []
 
 # Duplicate Bridge
 class DupBridge:
+    # Reproducible outputs, see setReproducible
+    seed = None
+    fixedDate = None
+
     def __init__(self, log):
         self.log = log
+        self.rng = random.Random(self.seed)
         self.HeaderFont = Font(bold=True, size=14)
         self.centerAlign = Alignment(horizontal='center')
         self.trumps = ('D/C', 'H/S', 'NT')  
@@ -25,8 +84,6 @@ class DupBridge:
 
     # IMP conversion table
     def IMPTable(self):
-        IMPRanges = [0, 20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600, \
-                    750, 900, 1100, 1300, 1500, 1750, 2000, 2250, 2500, 3000, 3500, 4000, 10010]
         sh = self.wb.create_sheet('IMP Table')
         row = self.headerRow(sh, ['From', 'To', 'IMP'])
         for i in range(0, len(IMPRanges)-1):
@@ -123,9 +180,19 @@ class DupBridge:
         score += overTricks
         return score
 
+    # Undertricks: not vulnerable, vulnerable, then doubled not vulnerable and vulnerable.
+    # The last of a row goes for every further trick.
+    PenaltyTable = [[50], [100], [100, 200, 200, 300], [200, 300]]
+
+    # Points the defenders get for "down" undertricks
+    def penalty(self, down, vul, dbl):
+        steps = self.PenaltyTable[(2 if dbl > 0 else 0) + (1 if vul else 0)]
+        total = sum(steps[min(i, len(steps) - 1)] for i in range(down))
+        return total * dbl if dbl > 0 else total
+
     # The table for failing the contract
     def scorePenalty(self, sh, row, col, headers):
-        penaltyTbl = [[50], [100], [100, 200, 200, 300], [200, 300]]         
+        penaltyTbl = self.PenaltyTable         
         headers.insert(0, 'Down by')
         for i in range(len(headers)):
             sh.cell(row-1, col+i).value = headers[i]
@@ -150,8 +217,26 @@ class DupBridge:
             sh.cell(row, col+6).value = f'={sh.cell(row,col+2).coordinate}*2'
             row += 1
 
+    # Same inputs, same bytes.
+    # Random numbers (placeholder names, fake scores) come from "seed".  The documents print "date"
+    # (datetime.date) and carry it as their creation time, so do the files in the workbook zip.
+    @classmethod
+    def setReproducible(cls, seed, date):
+        cls.seed = seed
+        cls.fixedDate = date
+
+    # Date printed on the documents
+    def dateStamp(self):
+        return (self.fixedDate or datetime.date.today()).strftime("%b %d, %Y")
+
+    # Creation time of the files, None for now
+    def fileTime(self):
+        if self.fixedDate is None:
+            return None
+        return datetime.datetime.combine(self.fixedDate, datetime.time(), datetime.timezone.utc)
+
     def placeHolderName(self):
-        return f'Name {random.randint(11,90)}'
+        return f'Name {self.rng.randint(11,90)}'
 
     # Row/Colomn to "A1" style
     # If "sheet" is avaiable, could have use the "cooridate" method.
@@ -183,6 +268,16 @@ class PairGames(DupBridge):
         self.SITOUT = "Sit-Out"
         self.roundData = {} # meant to be write-once
         self.boardData = {} # meant to be write-once
+        # PDF sections: drawn in # worker processes (0: in order, in this process)
+        # and/or saved as a file each
+        self.workers = 0
+        self.split = False
+        self.sectionPDFs = None
+        self.section = ''   # letter of the section in a field, see SectionedMitchell
+        self.volumePages = 0    # >0: PDF in volumes of at most so many pages, written as drawn
+        self.outDir = None      # where the outputs go, next to "src" by default
+        self.saved = [] # files written
+        self.profiler = None    # see profiled
 
     # Placeholder functions, expect to be over-written by child classes
     # Turn internal pair number to human readable value
@@ -203,6 +298,168 @@ class PairGames(DupBridge):
     def pairID(self, n):
         return f"{self.pairN(n)}"
     
+    # Names file is JSON5 of {'File', 'Tournament', 'Date', 'Players'}.  Missing keys keep the defaults.
+    # "nameFile" may also be the object itself, as if already loaded.
+    def loadNames(self, nameFile, defaults):
+        self.nameObj = defaults
+        self.nameObj['Date'] = self.dateStamp()
+        if type(nameFile) is dict:
+            self.nameObj.update(nameFile)
+        elif nameFile and os.path.exists(nameFile):
+            try:
+                with open(nameFile, 'r') as f:
+                    self.nameObj.update(json5.load(f))
+            except:
+                pass
+
+    # Sheets of a section carry its letter, so that the sections of a field share one workbook
+    def sheetName(self, name):
+        return f'{self.section} {name}' if self.section else name
+
+    # A stage of the build, timed when profiling
+    def stage(self, name):
+        return Unprofiled if self.profiler is None else self.profiler.stage(name)
+
+    # Run "run" (build and save), then report where the time and the memory went, see stages.py
+    # The report is also saved as JSON if "jsonFile".
+    def profiled(self, run, jsonFile=None):
+        self.profiler = StageProfiler(self)
+        self.profiler.start()
+        try:
+            run()
+        finally:
+            self.profiler.stop()
+        self.profiler.report()
+        if jsonFile:
+            self.profiler.dump(jsonFile)
+        self.profiler = None
+
+    # File name of the outputs, without extension
+    def outputName(self):
+        return self.nameObj['File']
+
+    def outputPath(self, outDir=None):
+        here = os.path.dirname(os.path.abspath(__file__))
+        return f'{outDir or self.outDir or here + "/.."}/{self.outputName()}'
+
+    # The PDF is made of sections, in this order, as (name, method)
+    # Each section starts on its own page and sets its own fonts, so they can be drawn apart.
+    Sections = ()
+    Instructions = 'instructions.txt'
+
+    def instructionsPDF(self):
+        self.pdf.instructions(self.log, self.Instructions)
+
+    # Start drawing the PDF sections.  Done in order into self.pdf unless
+    # drawn by workers or to be split, each section its own PDF then.
+    # The workbook can be built meanwhile, see finishSections.
+    def startSections(self):
+        self.sectionJobs = []
+        self.pool = None
+        if self.volumePages > 0:
+            # One section after another, each its own volume(s)
+            fn = self.outputPath()
+            for name, s in self.Sections:
+                self.pdf.startVolume(f'{fn}-{name}', self.volumePages, self.fileTime())
+                with self.stage(name):
+                    getattr(self, s)()
+            return
+        if self.workers == 0 and not self.split:
+            for name, s in self.Sections:
+                with self.stage(name):
+                    getattr(self, s)()
+            return
+        if not self.pdf.formsSupported:
+            self.log.error('This FPDF cannot assemble sections, drawing them in order')
+            self.workers = 0
+            self.split = False
+            self.startSections()
+            return
+        # The workers get a copy of the document without the workbook
+        wb, profiler, self.wb, self.profiler = self.wb, self.profiler, None, None
+        state = pickle.dumps(self)
+        self.wb, self.profiler = wb, profiler
+        jobs = [(state, s, i == 0) for i, (_, s) in enumerate(self.Sections)]
+        if self.workers > 0:
+            self.pool = ProcessPoolExecutor(min(self.workers, len(jobs)))
+            self.sectionJobs = [self.pool.submit(drawSection, *j) for j in jobs]
+        else:
+            self.sectionJobs = []
+            for (name, _), j in zip(self.Sections, jobs):
+                with self.stage(name):
+                    self.sectionJobs.append(drawSection(*j))
+
+    # Gather the sections and put them together, in order, as self.pdf
+    def finishSections(self):
+        if not self.sectionJobs:
+            return
+        if self.pool is not None:
+            parts = [j.result() for j in self.sectionJobs]
+            self.pool.shutdown()
+        else:
+            parts = self.sectionJobs
+        self.sectionPDFs = {name: p for (name, _), p in zip(self.Sections, parts)}
+        book = self.pdf.sibling(False)
+        book.anchors = self.pdf.anchors
+        with self.stage('Assemble PDF'):
+            for p in parts:
+                book.appendPages(p)
+        self.pdf = book
+        self.sectionJobs = []
+
+    # The PDF, or a PDF per section if split
+    # Volumes are already written but the last one.
+    def savePDF(self, fn):
+        with self.stage('Save PDF'):
+            if self.volumePages > 0:
+                self.pdf.endVolume()
+                self.saved += self.pdf.volumeFiles
+                return f'{fn}-*.pdf'
+            if not self.split:
+                parts = {f'{fn}.pdf': None}
+            else:
+                parts = {f'{fn}-{name}.pdf': name for name in self.sectionPDFs.keys()}
+            for f, name in parts.items():
+                with open(f, 'wb') as fd:
+                    fd.write(self.pdfBytes(name))
+                self.saved.append(f)
+            return f'{fn}.pdf' if not self.split else f'{fn}-*.pdf'
+
+    # The PDF, or the PDF of a section if split, as bytes.  Nothing is written to the disk.
+    def pdfBytes(self, section=None):
+        if self.volumePages > 0:
+            raise ValueError('PDF already written in volumes')
+        p = self.pdf if section is None else self.sectionPDFs[section]
+        if self.fileTime() is not None:
+            p.set_creation_date(self.fileTime())
+        return bytes(p.output())
+
+    def saveWorkbook(self, fn):
+        with self.stage('Save workbook'):
+            with open(f'{fn}.xlsx', 'wb') as f:
+                f.write(self.workbookBytes())
+            self.saved.append(f'{fn}.xlsx')
+            return f'{fn}.xlsx'
+
+    # The workbook as bytes.  Nothing is written to the disk.
+    # openpyxl stamps the workbook and its zip entries with the current time
+    def workbookBytes(self):
+        xlsx = io.BytesIO()
+        if self.fileTime() is None:
+            self.wb.save(xlsx)
+            return xlsx.getvalue()
+        stamp = self.fileTime().replace(tzinfo=None)
+        self.wb.properties.created = stamp
+        self.wb.properties.modified = stamp
+        ExcelWriter(self.wb, zipfile.ZipFile(xlsx, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)).save()
+        out = io.BytesIO()
+        with zipfile.ZipFile(xlsx) as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for item in zin.infolist():
+                entry = zipfile.ZipInfo(item.filename, stamp.timetuple()[:6])
+                entry.compress_type = zipfile.ZIP_DEFLATED
+                zout.writestr(entry, zin.read(item.filename))
+        return out.getvalue()
+
     # Return a list of actual board numbers (zero-based) from "board set" (zero-based)
     def boardList(self, bIdx):
         return [self.decks*bIdx+x for x in range(self.decks)]
@@ -210,9 +467,9 @@ class PairGames(DupBridge):
     # Insert a score to check calculations
     # Probably could have been more sophisticated
     def fakeScore(self, sh, row, col, avgProb=0.9):
-        if random.random() < avgProb:
-            pickSide = col if random.random() >= 0.5 else col+1
-            score = random.randint(2,80)*10
+        if self.rng.random() < avgProb:
+            pickSide = col if self.rng.random() >= 0.5 else col+1
+            score = self.rng.randint(2,80)*10
             sh.cell(row, pickSide).value = score
         else:
             sh.cell(row, col).value = 'Avg'
@@ -234,7 +491,7 @@ class PairGames(DupBridge):
         self.log.debug('Saving by Round')
         mergeHdrs = [['Result', 2], ['Score', 2]]
         headers = ['Round', 'Table', 'NS', 'EW', 'Board', 'Vul', 'Contract', 'By', 'Made', 'Down', 'NS', 'EW']
-        sh = self.wb.create_sheet('By Round', 2)
+        sh = self.wb.create_sheet(self.sheetName('By Round'), 2)
         cStart = headers.index('Made')+1
         for h in mergeHdrs:
             sh.cell(1, cStart).value = h[0]
@@ -282,6 +539,7 @@ class PairGames(DupBridge):
         tblCols = []
         xMargin = self.pdf.margin
         hdrs = ['NS Score', 'Made', 'Down', 'NS Contract', 'By', 'Board', 'EW Contract', 'By', 'Made', 'Down', 'EW Socre']
+        self.pdf.set_line_width(self.pdf.thinLine)
         self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.notePt)
         self.pdf.setHeaders(xMargin, hdrs, tblCols)
         xMargin = (self.pdf.w - sum(tblCols)) / 2
@@ -309,7 +567,7 @@ class PairGames(DupBridge):
             if bIdx % 4 == 0:
                 self.pdf.add_page()
                 y = 2 * self.pdf.margin
-            self.printPickup(emptyTitle, ['']*len(tables[0][0]), tblCols, hdrs, xMargin, y)
+            self.printPickup(emptyTitle, ['']*max(len(b) for r in tables.values() for b in r.values()), tblCols, hdrs, xMargin, y)
             bIdx += 1
             y = self.pdf.sectionDivider(4, bIdx, xMargin)
         return
@@ -321,17 +579,13 @@ class PairGames(DupBridge):
         self.pdf.set_font(size=self.pdf.notePt)
         h = self.pdf.lineHeight(self.pdf.font_size_pt)
         y += h
-        self.pdf.set_xy(xMargin, y)
         boardCol = hdrs.index('Board')
+        self.pdf.grid(xMargin, y, tblCols, h, len(boards))
         for b in boards:
-            for i in range(boardCol):
-                self.pdf.cell(tblCols[i], h, text=f'', align='C', border=1)
-            bText = f'{(b["Board"]+1) if (type(b) != str and b["Board"] != None) else b}'
-            self.pdf.cell(tblCols[5], h, text=bText, align='C', border=1)
-            for i in range(boardCol+1,len(hdrs)):
-                self.pdf.cell(tblCols[i], h, text=f'', align='C', border=1)
+            texts = [''] * len(hdrs)
+            texts[boardCol] = f'{(b["Board"]+1) if (type(b) != str and b["Board"] != None) else b}'
+            self.pdf.gridTexts(xMargin, y, tblCols, h, texts)
             y += h
-            self.pdf.set_xy(xMargin, y)
 
     # Journal is for each pair to keep their own records
     # TD may collect them at the end to corroborate traveler or pickup slips
@@ -349,6 +603,7 @@ class PairGames(DupBridge):
     def JournalWithData(self, pairData):
         tblCols = []
         hdrs = ['Board', 'vs.', 'Bid'*2, 'By', 'M', 'M', 'NS', 'EW']
+        self.pdf.set_line_width(self.pdf.thinLine)
         self.pdf.set_font(self.pdf.serifFont, style='B', size=self.pdf.linePt)
         self.pdf.setHeaders(0, hdrs, tblCols)
         xMargin = (self.pdf.w - 2*sum(tblCols)) / 4
@@ -374,15 +629,12 @@ class PairGames(DupBridge):
             y += self.pdf.lineHeight(self.pdf.font_size_pt)
             self.pdf.set_font(size=self.pdf.smallPt-1)
             h = self.pdf.lineHeight(self.pdf.font_size_pt)
-            self.pdf.set_xy(xMargin+halfW*flip, y)
+            self.pdf.grid(xMargin+halfW*flip, y, tblCols, h, len(pairData[pairNum]))
             for v in sorted(pairData[pairNum], key=lambda x: x[0]):
-                self.pdf.cell(tblCols[0], h, text=f'{v[0]+1}', align='C', border=1)
                 vIdx = 4 if pairNum == v[3] else 3
-                self.pdf.cell(tblCols[1], h, text=f"{self.pairN(v[vIdx])}", align='C', border=1)
-                for c in range(2,len(hdrs)):
-                    self.pdf.cell(tblCols[c], h, text='', align='C', border=1)
+                texts = [f'{v[0]+1}', f"{self.pairN(v[vIdx])}"] + [''] * (len(hdrs) - 2)
+                self.pdf.gridTexts(xMargin+halfW*flip, y, tblCols, h, texts)
                 y += h
-                self.pdf.set_xy(xMargin+halfW*flip, y)
             flip = 1 - flip
             if flip == 0:
                 pIdx += 1
@@ -398,6 +650,7 @@ class PairGames(DupBridge):
     def TravelersWithData(self, data):
         tblCols = []
         hdrs = ['NS','Bid'*2, 'By', 'M', 'M', 'NS', 'EW', 'vs.']
+        self.pdf.set_line_width(self.pdf.thinLine)
         self.pdf.set_font(self.pdf.serifFont, style='B', size=self.pdf.headerPt)
         self.pdf.setHeaders(0, hdrs, tblCols)
         xMargin = (self.pdf.w - 2*sum(tblCols)) / 4
@@ -431,15 +684,12 @@ class PairGames(DupBridge):
         y += self.pdf.lineHeight(self.pdf.font_size_pt)
         self.pdf.set_font(self.pdf.sansSerifFont, size=self.pdf.notePt+1)
         h = self.pdf.lineHeight(self.pdf.font_size_pt)
-        for v in sorted(round, key=lambda x: x[2]):
-            self.pdf.set_xy(leftSide, y)
-            if self.pairID(v[2]) == self.SITOUT:
-                continue
-            self.pdf.cell(tblCols[0], h, text=f'{self.pairN(v[2])}', align='C', border=1)
-            for c in range(1,len(hdrs)-1):
-                    self.pdf.cell(tblCols[c], h, text='', align='C', border=1)
+        rows = [v for v in sorted(round, key=lambda x: x[2]) if self.pairID(v[2]) != self.SITOUT]
+        self.pdf.grid(leftSide, y, tblCols, h, len(rows))
+        for v in rows:
             vs = f'{self.pairN(v[3]) if v[3] != None else ""}'
-            self.pdf.cell(tblCols[len(hdrs)-1], h, text=vs, align='C', border=1)
+            texts = [f'{self.pairN(v[2])}'] + [''] * (len(hdrs) - 2) + [vs]
+            self.pdf.gridTexts(leftSide, y, tblCols, h, texts)
             y += h
         return y
 
@@ -472,6 +722,7 @@ class PairGames(DupBridge):
             if self.ifSitout(t, tables[t][0][0]['NS'], tables[t][0][0]['EW']):
                 continue
             self.pdf.add_page()
+            self.pdf.set_line_width(self.pdf.thinLine)
             self.pdf.pageFooter(self.pairs, self.tables)
             self.pdf.movementSheet()
             if compassTop > top + tblHeight:
@@ -484,18 +735,15 @@ class PairGames(DupBridge):
             self.pdf.set_font(size=fontSize)
             y = self.pdf.get_y()
             h = self.pdf.lineHeight(self.pdf.font_size_pt);
-            self.pdf.set_xy(xMargin, y + h)
+            self.pdf.grid(xMargin, y + h, tblCols, h, len(tables[t]))
             for r in sorted(tables[t].keys()):
                 tRound = tables[t][r]
-                self.pdf.cell(tblCols[0], h, text=f'{r+1}', align='C', border=1)
-                self.pdf.cell(tblCols[1], h, text=f'{self.pairN(tRound[0]['NS'])}', align='C', border=1)
-                self.pdf.cell(tblCols[2], h, text=f'{self.pairN(tRound[0]['EW'])}', align='C', border=1)
                 bds = ""
                 for b in tRound:
                     bds += f'{b['Board']+1},'
-                self.pdf.cell(tblCols[3], h, text=bds[:-1], align='C', border=1)
+                texts = [f'{r+1}', f'{self.pairN(tRound[0]['NS'])}', f'{self.pairN(tRound[0]['EW'])}', bds[:-1]]
+                self.pdf.gridTexts(xMargin, y + h, tblCols, h, texts)
                 y += h
-                self.pdf.set_xy(xMargin, y + h)
 
     # ID tag is for each person (not pair) to hold on to.
     # It gives extra information on next table and opponents.
@@ -516,6 +764,7 @@ class PairGames(DupBridge):
         tags = 0
         colW = []
         hdrs = ['Round', 'Table', 'Seat', 'vs']
+        self.pdf.set_font(self.pdf.sansSerifFont, size=self.pdf.bigPt)
         self.pdf.setHeaders(0, hdrs, colW)
         # page can be portrait or landscape
         w = min(self.pdf.w,self.pdf.h)
@@ -542,13 +791,11 @@ class PairGames(DupBridge):
                     self.pdf.cell(colW[i], h, text=hdrs[i], align='C', border=1)
                 ty +=  h
 
+                self.pdf.grid(leftMargin+cWidth*half, ty, colW, h, len(rData))
                 for r in rData:
                     opp,seat = (self.pairN(r[3]),'NS') if id == r[2] else (self.pairN(r[2]),'EW')
-                    self.pdf.set_xy(leftMargin+cWidth*half, ty)
-                    self.pdf.cell(colW[0], h, text=f"{r[0]+1}", align='C', border=1)
-                    self.pdf.cell(colW[1], h, text=f"{r[1]+1}", align='C', border=1)
-                    self.pdf.cell(colW[2], h, text=f"{seat}", align='C', border=1)
-                    self.pdf.cell(colW[3], h, text=f"{opp}", align='C', border=1)
+                    texts = [f"{r[0]+1}", f"{r[1]+1}", f"{seat}", f"{opp}"]
+                    self.pdf.gridTexts(leftMargin+cWidth*half, ty, colW, h, texts)
                     ty += h
             tags += 1
             y = self.pdf.sectionDivider(nTagsPage, tags, self.pdf.margin) + self.pdf.margin * 2
@@ -675,7 +922,8 @@ class PairGames(DupBridge):
     # Then it compute the scores on the sheet
     def boardTab(self):
         self.log.debug('Saving by Board')
-        sh = self.wb.create_sheet('By Board', 1)
+        sh = self.wb.create_sheet(self.sheetName('By Board'), 1)
+        byRound = self.sheetName('By Round')
         row, headers = self.boardSheetHeaders(sh)
         rGap = self.tables * self.decks    # Number of rows between each round
         for b in sorted(self.boardData.keys()):
@@ -684,14 +932,14 @@ class PairGames(DupBridge):
             nPlayed = len(self.boardData[b])    # # of times this board was played
             cursorRow = 0
             for r in sorted(self.boardData[b], key=lambda x: x[2]): # (round, table, NS, EW)
-                sh.cell(row, 2).value = f"='By Round'!{self.rc2a1(r[0] * rGap + 3, 1)}"
+                sh.cell(row, 2).value = f"='{byRound}'!{self.rc2a1(r[0] * rGap + 3, 1)}"
                 tBase = r[0] * rGap + r[1] * self.decks + 3
-                sh.cell(row, 3).value = f"='By Round'!{self.rc2a1(tBase, 2)}"
-                sh.cell(row, 4).value = f"='By Round'!{self.rc2a1(tBase, 3)}"
-                sh.cell(row, 5).value = f"='By Round'!{self.rc2a1(tBase, 4)}"
+                sh.cell(row, 3).value = f"='{byRound}'!{self.rc2a1(tBase, 2)}"
+                sh.cell(row, 4).value = f"='{byRound}'!{self.rc2a1(tBase, 3)}"
+                sh.cell(row, 5).value = f"='{byRound}'!{self.rc2a1(tBase, 4)}"
                 tBase += b % self.decks
                 for i in range(6, len(headers)+1):
-                    c = f"'By Round'!{self.rc2a1(tBase, i)}"
+                    c = f"'{byRound}'!{self.rc2a1(tBase, i)}"
                     sh.cell(row, i).value = f'=IF(ISBLANK({c}),"",{c})'
                 for i in range(2,7):
                     sh.cell(row, i).alignment = self.centerAlign
@@ -699,15 +947,18 @@ class PairGames(DupBridge):
                 cIdx = headers.index('Made')+4
                 nIdx = cIdx + 7
                 self.computeNet(sh, row, cIdx-1, nIdx)
-                self.computeIMP(sh, cIdx, nPlayed, row, cursorRow, nIdx)
-                self.computeMP(sh, cIdx+2, nPlayed, row, cursorRow, nIdx)
+                with self.stage('computeIMP'):
+                    self.computeIMP(sh, cIdx, nPlayed, row, cursorRow, nIdx)
+                with self.stage('computeMP'):
+                    self.computeMP(sh, cIdx+2, nPlayed, row, cursorRow, nIdx)
                 if self.fake:
                     self.fakeScore(sh, row, cIdx-1)
                 row += 1
                 cursorRow += 1
             for c in range(len(headers)+(self.tables-1)*4-4):
                 sh.cell(row-1, c+1).border = self.bottomLine
-        self.boardVerticals(sh, headers)
+        with self.stage('boardVerticals'):
+            self.boardVerticals(sh, headers)
         return
     
     # Some simple validity checks
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Export of a finished event for other bridge programs: PBN and USEBIO (XML)
+# A session is its movement (every round, table, pairs, and board of "roundData"/"boardData"), the
+# names of its pairs, and the results entered, read from either
+#   the filled-in spreadsheets, one per session (sections of a field are sessions of their own), or
+#   a movement ("-m", "-p", "-b", "-n") with the results taken at the tables ("--results", see results.py)
+# Each board is written as soon as it is read, scored, and matchpointed (see scoring.py): the
+# files are never whole in memory, an archive of many sessions is written one board at a time.
+#
+# PBN: a game for each table a board was played at, with its round, table, players, contract,
+# declarer, tricks, and score.  With "--seed", the cards of the boards, dealt again as deals.py
+# dealt them ("--hands": boards a session on the hand records, when not the boards played).
+# USEBIO: an EVENT of each session, its PARTICIPANTS, then the TRAVELLER_LINEs of every BOARD.
+import argparse
+import datetime
+import logging
+import os
+import re
+import time
+from xml.sax.saxutils import escape
+from maininit import setlog
+from docset import DupBridge
+from scoring import matchpoints
+from ledger import NoticeDate, number, netScore, sections, sheet, readRoster, readResults
+from results import Contract
+
+Seats = 'NESW'
+PBNVul = {'None': 'None', 'NS': 'NS', 'EW': 'EW', 'Both': 'All'}
+
+# Contract as PBN writes it, "4S", "3NTX", "Pass", None if it cannot be read
+def contractOf(text):
+    text = str(text or '').upper().replace(' ', '')
+    if text in ('PASS', 'P'):
+        return 'Pass'
+    m = Contract.match(text)
+    if m is None:
+        return None
+    return f'{m.group(1)}{"NT" if m.group(2).startswith("N") else m.group(2)}{m.group(3)}'
+
+# Tricks taken by the declarer, from the tricks over book made or the undertricks
+def tricksOf(contract, made, down):
+    if contract is None or contract == 'Pass':
+        return None
+    if number(made) is not None:
+        return int(made) + 6
+    if number(down) is not None:
+        return int(contract[0]) + 6 - int(down)
+    return None
+
+# Matchpoints of the rows of a board, those with a score
+def scoreBoard(rows):
+    scored = [r for r in rows if r['Score'] is not None]
+    mps, top = matchpoints([r['Score'] for r in scored])
+    for r, mp in zip(scored, mps):
+        r['NSMP'], r['EWMP'] = mp, top - mp
+    return rows
+
+def row(rnd, tbl, ns, ew, contract=None, by=None, tricks=None, score=None):
+    return {'Round': rnd, 'Table': tbl, 'NS': ns, 'EW': ew, 'Contract': contract, 'By': by, 'Tricks': tricks,
+            'Score': score, 'NSMP': None, 'EWMP': None}
+
+# Sources
+# A session: {'Event', 'Date' (datetime.date or None), 'Session' (# of its file), 'Section', 'Mitchell',
+#             'Pairs': {pair: (side, number, [players])}, 'Boards': (board, [row]) as they are read}
+# Boards are zero-based, pairs as in the ledger: "3", or "NS 3" and "NS A3" in a Mitchell.
+
+# The sessions of filled-in spreadsheets, one file after the other
+def workbookSessions(files):
+    from openpyxl import load_workbook
+    for k, fn in enumerate(files):
+        wb = load_workbook(fn, read_only=True)
+        for section in sections(wb):
+            pairs, mitchell, notice = readRoster(sheet(wb, section, 'Roster'), section)
+            m = NoticeDate.search(notice)
+            yield {'Event': os.path.splitext(os.path.basename(fn))[0], 'Session': k, 'Section': section,
+                   'Mitchell': mitchell,
+                   'Date': datetime.datetime.strptime(m.group(1), '%b %d, %Y').date() if m else None,
+                   'Pairs': {p: (p.split(' ')[0] if mitchell else '', int(re.sub(r'\D', '', p)), names)
+                             for p, names in pairs.items()},
+                   'Boards': workbookBoards(wb, mitchell, section)}
+        wb.close()
+
+def workbookBoards(wb, mitchell, section):
+    boards = {}
+    for b, rnd, tbl, ns, ew, contract, by, made, down, nsScore, ewScore in readResults(wb, mitchell, section):
+        score = netScore(nsScore, ewScore)
+        c = contractOf(contract)
+        boards.setdefault(b, []).append(row(rnd, tbl, ns, ew, c, str(by or '').upper()[:1] or None,
+                                            tricksOf(c, made, down), score if score is not False else None))
+    for b in sorted(boards):
+        yield b - 1, scoreBoard(boards[b])
+
+# The session of a movement, "journal" the results taken by results.py
+def movementSession(log, doc, journal=None):
+    from results import ResultsService
+    service = ResultsService(log, doc)
+    if journal:
+        service.replay(journal)
+    players = doc.nameObj.get('Players', [])
+    pairs = {}
+    for b in sorted(doc.boardData):
+        for r, t, ns, ew in doc.boardData[b]:
+            if doc.ifSitout(t, ns, ew):
+                continue
+            for n in (ns, ew):
+                names = [x.strip() for x in players[n-1].split('+')] if len(players) == doc.pairs else []
+                pairs.setdefault(service.pairName(n), (doc.pairSide(n), doc.pairN(n), names))
+    pairs = dict(sorted(pairs.items(), key=lambda p: p[1][:2]))
+    date = doc.nameObj.get('Date')
+    return {'Event': doc.nameObj.get('Tournament', doc.outputName()), 'Session': 0, 'Section': doc.section,
+            'Mitchell': bool(doc.pairSide(1)), 'Pairs': pairs,
+            'Date': datetime.datetime.strptime(date, '%b %d, %Y').date() if date else None,
+            'Boards': movementBoards(doc, service)}
+
+def movementBoards(doc, service):
+    for b in sorted(doc.boardData):
+        rows = []
+        for r, t, ns, ew in sorted(doc.boardData[b]):
+            if doc.ifSitout(t, ns, ew):
+                continue
+            res = service.results.get((r, t, b))
+            rw = row(r + 1, t + 1, service.pairName(ns), service.pairName(ew))
+            if res is not None:
+                c = contractOf(res.get('contract')) if 'score' not in res else None
+                rw.update({'Contract': c, 'By': str(res.get('by', '')).upper() or None, 'Score': res['nsScore'],
+                           'Tricks': tricksOf(c, res.get('made'), res.get('down'))})
+            rows.append(rw)
+        yield b, scoreBoard(rows)
+
+# Writers: generators of text, a board at a time
+
+def pbnValue(v):
+    return '?' if v is None else str(v).replace('\\', '\\\\').replace('"', '\\"')
+
+def pbnHand(hand):
+    return '.'.join('' if s == '-' else s for s in hand)
+
+# "deals" a deals.Deals and "hands" the boards of a session on the hand records, to add the cards
+def pbn(sessions, deals=None, hands=None):
+    bridge = DupBridge(None)
+    yield '% PBN 2.1\n% EXPORT\n%Content-type: text/x-pbn; charset=UTF-8\n\n'
+    for s in sessions:
+        date = s['Date'].strftime('%Y.%m.%d') if s['Date'] else None
+        for b, rows in s['Boards']:
+            dealer = Seats[b % 4]
+            deal = None
+            i = s['Session'] * hands + b if hands else None
+            if deals is not None and i < deals.boards:
+                deal = f'{dealer}:' + ' '.join(pbnHand(deals.hand(i, (Seats.index(dealer) + j) % 4)) for j in range(4))
+            for r in rows:
+                ns, ew = s['Pairs'].get(r['NS'], ('', 0, [])), s['Pairs'].get(r['EW'], ('', 0, []))
+                seats = {'North': ns[2][0] if ns[2] else r['NS'], 'South': ns[2][1] if len(ns[2]) > 1 else r['NS'],
+                         'East': ew[2][0] if ew[2] else r['EW'], 'West': ew[2][1] if len(ew[2]) > 1 else r['EW']}
+                tags = [('Event', s['Event']), ('Site', ''), ('Date', date)]
+                if s['Section']:
+                    tags.append(('Section', s['Section']))
+                tags += [('Round', r['Round']), ('Table', r['Table']), ('Board', b + 1),
+                         ('West', seats['West']), ('North', seats['North']), ('East', seats['East']),
+                         ('South', seats['South']), ('Dealer', dealer), ('Vulnerable', PBNVul[bridge.vulLookup(b)])]
+                if deal:
+                    tags.append(('Deal', deal))
+                tags += [('Scoring', 'MP'), ('Declarer', '' if r['Contract'] == 'Pass' else r['By']),
+                         ('Contract', r['Contract']), ('Result', '' if r['Contract'] == 'Pass' else r['Tricks'])]
+                if r['Score'] is not None:
+                    tags += [('Score', f'NS {r["Score"]}'), ('ScoreMP', f'NS {r["NSMP"]:g}')]
+                yield ''.join(f'[{t} "{pbnValue(v)}"]\n' for t, v in tags) + '\n'
+
+def xml(tag, v, indent):
+    return f'{indent}<{tag}>{escape(str(v))}</{tag}>\n'
+
+def usebio(sessions):
+    bridge = DupBridge(None)
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<USEBIO Version="1.1">\n'
+    for s in sessions:
+        yield (' <EVENT EVENT_TYPE="MP_PAIRS">\n' + xml('EVENT_DESCRIPTION', s['Event'], '  ') +
+               (xml('DATE', s['Date'].strftime('%d/%m/%Y'), '  ') if s['Date'] else '') +
+               (xml('SECTION', s['Section'], '  ') if s['Section'] else '') +
+               xml('BOARD_SCORING_METHOD', 'MATCH_POINTS', '  ') + '  <PARTICIPANTS>\n')
+        for pair, (side, n, names) in s['Pairs'].items():
+            yield ('   <PAIR>\n' + xml('PAIR_NUMBER', n, '    ') + (xml('DIRECTION', side, '    ') if side else '') +
+                   ''.join(f'    <PLAYER>\n{xml("PLAYER_NAME", name, "     ")}    </PLAYER>\n' for name in names) +
+                   '   </PAIR>\n')
+        yield '  </PARTICIPANTS>\n'
+        for b, rows in s['Boards']:
+            out = ['  <BOARD>\n', xml('BOARD_NUMBER', b + 1, '   '), xml('DEALER', Seats[b % 4], '   '),
+                   xml('VULNERABILITY', PBNVul[bridge.vulLookup(b)], '   ')]
+            for r in rows:
+                out += ['   <TRAVELLER_LINE>\n', xml('ROUND_NUMBER', r['Round'], '    '),
+                        xml('TABLE_NUMBER', r['Table'], '    '),
+                        xml('NS_PAIR_NUMBER', s['Pairs'][r['NS']][1] if r['NS'] in s['Pairs'] else r['NS'], '    '),
+                        xml('EW_PAIR_NUMBER', s['Pairs'][r['EW']][1] if r['EW'] in s['Pairs'] else r['EW'], '    ')]
+                if r['Contract']:
+                    out.append(xml('CONTRACT', r['Contract'], '    '))
+                    if r['Contract'] != 'Pass':
+                        out += [xml('PLAYED_BY', r['By'] or '', '    ')] + \
+                               ([xml('TRICKS', r['Tricks'], '    ')] if r['Tricks'] is not None else [])
+                if r['Score'] is not None:
+                    out += [xml('SCORE', r['Score'], '    '), xml('NS_MATCH_POINTS', f'{r["NSMP"]:g}', '    '),
+                            xml('EW_MATCH_POINTS', f'{r["EWMP"]:g}', '    ')]
+                out.append('   </TRAVELLER_LINE>\n')
+            out.append('  </BOARD>\n')
+            yield ''.join(out)
+        yield ' </EVENT>\n'
+    yield '</USEBIO>\n'
+
+Formats = {'pbn': '.pbn', 'usebio': '.xml'}
+
+if __name__ == '__main__':
+    from movements import newDocument, Movements
+    log = setlog('export', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('workbooks', nargs='*', help='Filled-in spreadsheets, a session each')
+    parser.add_argument('-m', '--movement', choices=Movements, help='Export this movement, not spreadsheets')
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
+    parser.add_argument('-r', '--results', type=str, help='Results taken at the tables, the journal of results.py')
+    parser.add_argument('-f', '--format', choices=list(Formats) + ['both'], default='both')
+    parser.add_argument('--seed', type=int, help='Seed of the hand records (deals.py), for the cards of the boards')
+    parser.add_argument('--hands', type=int, help='Boards a session on the hand records, the boards played by default')
+    parser.add_argument('-o', '--output', type=str, help='Output file name, without extension')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+    if bool(args.workbooks) == bool(args.movement):
+        parser.error('Spreadsheets or a movement')
+
+    doc = None
+    if args.movement:
+        doc = newDocument(log, args.movement, args.pair, args.boards, args.names or None)
+        if doc is None:
+            raise SystemExit(1)
+    # Sessions are read again for each format
+    def sessions():
+        return [movementSession(log, doc, args.results)] if doc else workbookSessions(args.workbooks)
+    deals = hands = None
+    if args.seed is not None:
+        from deals import Deals
+        hands = args.hands or (len(doc.boardData) if doc else None)
+        if hands is None:
+            parser.error('--hands: boards a session on the hand records')
+        deals = Deals(hands * max(len(args.workbooks), 1), args.seed)
+    base = args.output or (doc.outputName() if doc else os.path.splitext(args.workbooks[0])[0])
+
+    for fmt in Formats if args.format == 'both' else [args.format]:
+        start = time.perf_counter()
+        fn = base + Formats[fmt]
+        with open(fn, 'w', encoding='utf-8') as f:
+            f.writelines(pbn(sessions(), deals, hands) if fmt == 'pbn' else usebio(sessions()))
+        print(f'Saved {fn} in {time.perf_counter() - start:.2f}s')
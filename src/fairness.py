@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Fairness of a movement: who is compared with whom, and on how many boards
+# A movement can be valid (no pair plays a board twice, every pair plays as many boards) and
+# still favour some pairs: a matchpoint score is a comparison with the pairs that sat the same
+# direction on the same board, and a pair compared with a strong pair on many more boards than
+# the others is at a disadvantage.  A Mitchell with a relay table (Mitchell.loadEven) or a Howell
+# arrangement of setup.json is measured from its "boardData" as incidence matrices:
+#   NS, EW: pair x board, 1 if the pair played the board in that direction
+#   comparisons = NS NS' + EW EW': boards each two pairs are matchpointed against each other
+#   head to head: boards each two pairs played at the same table
+#   opposed = NS EW' + EW NS' - head to head: boards played in the other direction, at other tables
+#   balance = NS boards - EW boards of each pair
+# The spread of the comparisons among the pairs ranked together (all the pairs of a Howell, the NS
+# and the EW pairs of a Mitchell) is the score: 0 when every two pairs are compared as often.
+# A few matrix products, quick enough to score every candidate of a movement search (see roomsq.py).
+#
+# -m, -p, -b: the movement, as the generators
+# --all: one line for every Howell of setup.json and every Mitchell
+# --heatmap file: the matrices as JSON, pairs in rows and columns
+import argparse
+import json
+import logging
+import numpy as np
+from maininit import setlog
+
+class Fairness:
+    # "rows" (board, NS, EW) of every table a board is played at, pair 0 is the sit-out
+    # "groups" {pair: group} of the pairs ranked together, one group by default (a Howell)
+    # "labels" {pair: name} of the pairs in the report, their numbers by default
+    def __init__(self, rows, groups=None, labels=None):
+        rows = np.array([r for r in rows if r[1] and r[2]], dtype=np.int32).reshape(-1, 3)
+        self.pairs = np.unique(rows[:, 1:])
+        self.boards = np.unique(rows[:, 0])
+        p = np.searchsorted(self.pairs, rows[:, 1:])
+        b = np.searchsorted(self.boards, rows[:, 0])
+        n, k = len(self.pairs), len(rows)
+        self.ns = np.zeros((n, len(self.boards)), dtype=np.int32)
+        self.ew = np.zeros_like(self.ns)
+        np.add.at(self.ns, (p[:, 0], b), 1)
+        np.add.at(self.ew, (p[:, 1], b), 1)
+        seatNS = np.zeros((k, n), dtype=np.int32)   # table x pair
+        seatEW = np.zeros_like(seatNS)
+        seatNS[np.arange(k), p[:, 0]] = 1
+        seatEW[np.arange(k), p[:, 1]] = 1
+        met = seatNS.T @ seatEW
+        self.headToHead = met + met.T
+        self.comparisons = self.ns @ self.ns.T + self.ew @ self.ew.T
+        self.opposed = self.ns @ self.ew.T + self.ew @ self.ns.T - self.headToHead
+        self.played = self.ns.sum(axis=1) + self.ew.sum(axis=1)
+        self.balance = self.ns.sum(axis=1) - self.ew.sum(axis=1)
+        groups = groups or {}
+        self.group = np.array([groups.get(int(x), '') for x in self.pairs])
+        self.labels = [str((labels or {}).get(int(x), int(x))) for x in self.pairs]
+        # every two different pairs ranked together
+        self.together = (self.group[:, None] == self.group[None, :]) & ~np.eye(n, dtype=bool)
+
+    # The pairs and the boards of a document (Howell, Mitchell), ranked as its Roster ranks them
+    @classmethod
+    def fromDocument(cls, doc):
+        rows = [(b, ns, ew) for b, played in doc.boardData.items() for r, t, ns, ew in played
+                if not doc.ifSitout(t, ns, ew)]
+        pairs = {n for _, ns, ew in rows for n in (ns, ew)}
+        return cls(rows, {n: doc.pairSide(n) for n in pairs},
+                   {n: f'{doc.pairSide(n)} {doc.pairN(n)}'.strip() for n in pairs})
+
+    # An "Arrangement" of setup.json (see jsonIO.JsonIO), boards as board sets
+    @classmethod
+    def fromArrangement(cls, arrangement):
+        return cls((t['Board'], t['NS'], t['EW']) for r in arrangement for t in r)
+
+    # Spread of the comparisons among the pairs ranked together: standard deviation over mean
+    def score(self):
+        c = self.comparisons[self.together]
+        return float(c.std() / c.mean()) if c.size and c.mean() else 0.0
+
+    def report(self):
+        c = self.comparisons[self.together]
+        h = self.headToHead[~np.eye(len(self.pairs), dtype=bool)]
+        return {'Pairs': len(self.pairs), 'Boards': len(self.boards),
+                'Played': [int(self.played.min()), int(self.played.max())],
+                'Comparisons': [int(c.min()), int(c.max()), round(float(c.mean()), 2)] if c.size else [],
+                'Never compared': int((c == 0).sum()) // 2,
+                'Head to head': [int(h.min()), int(h.max())] if h.size else [],
+                'Balance': int(np.abs(self.balance).max()),
+                'Score': round(self.score(), 4)}
+
+    # Pairs compared with each other least and most often
+    def extremes(self):
+        c = np.where(self.together, self.comparisons, -1)
+        lo = np.where(self.together, self.comparisons, np.iinfo(np.int32).max)
+        i, j = np.unravel_index(np.argmax(c), c.shape)
+        k, l = np.unravel_index(np.argmin(lo), lo.shape)
+        return (self.labels[k], self.labels[l], int(lo[k, l])), (self.labels[i], self.labels[j], int(c[i, j]))
+
+    def heatmap(self):
+        return {'Pairs': self.labels, 'Comparisons': self.comparisons.tolist(), 'Head to head': self.headToHead.tolist(),
+                'Opposed': self.opposed.tolist(), 'Balance': self.balance.tolist()}
+
+    def show(self):
+        rep = self.report()
+        print(f"{rep['Pairs']} pairs, {rep['Boards']} boards, {rep['Played'][0]} to {rep['Played'][1]} played each")
+        if rep['Comparisons']:
+            least, most = self.extremes()
+            print(f"Compared on {rep['Comparisons'][0]} to {rep['Comparisons'][1]} boards, "
+                  f"{rep['Comparisons'][2]} on average, score {rep['Score']}")
+            print(f'  least: {least[0]} and {least[1]} on {least[2]}, most: {most[0]} and {most[1]} on {most[2]}')
+        if rep['Never compared']:
+            print(f"{rep['Never compared']} pairs of pairs never compared")
+        print(f"Head to head on {rep['Head to head'][0]} to {rep['Head to head'][1]} boards, "
+              f"most NS/EW imbalance {rep['Balance']} boards")
+        w = max(len(x) for x in self.labels)
+        print(f'{"":>{w}} ' + ' '.join(f'{x:>{w}}' for x in self.labels))
+        for x, r in zip(self.labels, self.comparisons):
+            print(f'{x:>{w}} ' + ' '.join(f'{v:>{w}}' for v in r))
+
+
+if __name__ == '__main__':
+    from movements import newDocument, Movements
+    log = setlog('fairness', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--movement', choices=Movements, default='howell')
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('--all', action='store_true', help='Every Howell and Mitchell, one line each')
+    parser.add_argument('--heatmap', type=str, help='Save the matrices as JSON')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    if args.all:
+        configs = [('howell', p) for p in range(4, 15)] + [('mitchell', p) for p in range(8, 25)]
+        print(f'{"Movement":>14} {"Compared":>9} {"Never":>6} {"Balance":>8} {"Score":>7}')
+        for m, p in configs:
+            doc = newDocument(log, m, p, args.boards)
+            if doc is None:
+                continue
+            rep = Fairness.fromDocument(doc).report()
+            c = rep['Comparisons']
+            print(f'{m:>9} {p:>4} {f"{c[0]}-{c[1]}" if c else "":>9} {rep["Never compared"]:>6} '
+                  f'{rep["Balance"]:>8} {rep["Score"]:>7}')
+    else:
+        doc = newDocument(log, args.movement, args.pair, args.boards)
+        if doc is None:
+            raise SystemExit(1)
+        fair = Fairness.fromDocument(doc)
+        fair.show()
+        if args.heatmap:
+            with open(args.heatmap, 'w') as f:
+                json.dump(fair.heatmap(), f)
+            print(f'Saved {args.heatmap}')
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# What the formulas of a workbook cost to recalculate
+# The spreadsheet is opened on the director's laptop during the event, and every result entered
+# recalculates what depends on it.  For a workbook (a file, or the Workbook of a document just
+# built) this counts the formulas by function, the references from a sheet to another ('By Round'!
+# of By Board, 'By Board'! of the Roster), the longest chain of formulas depending on each other,
+# and the cells read in a full recalculation: each reference reads its whole range, a SUMIF over
+# 'By Board'!D3:D86 reads 84 cells every time.
+#
+# The references are read from the formula text: strings are left out, and a whole column (D:D)
+# is as long as its sheet.  A formula depends on the formulas in the cells it reads; a chain is
+# as long as the formulas on its way, 1 for a formula of constants only.
+#
+# Files are analyzed as given; "-m", "-p", "-b" builds the movement in memory.  "--all" does every
+# configuration of the catalog and compares them with budgets (see bench.py): a configuration with
+# more formulas, references, a longer chain, or more cells read than its budget by more than the
+# threshold is a regression, and the exit status is 1.  "--save" makes the budgets.  Unlike the
+# times of bench.py the counts do not depend on the machine, so .formulas.json is in the repo.
+import argparse
+import bisect
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict, deque
+from maininit import setlog
+
+here = os.path.dirname(os.path.abspath(__file__))
+Budgets = f'{here}/.formulas.json'
+Strings = re.compile(r'"(?:[^"]|"")*"')
+Function = re.compile(r'(?<![\w.])([A-Z][A-Z0-9.]*)\(')
+# [sheet!]A1, A1:B2, or A:B, with or without $
+Reference = re.compile(r"(?<![\w.$])(?:(?:'((?:[^']|'')+)'|([A-Za-z_][\w.]*))!)?"
+                       r"(\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?|\$?[A-Z]{1,3}:\$?[A-Z]{1,3})(?![\w(!])")
+Metrics = ['Formulas', 'Cross-sheet', 'Depth', 'Recalc cells']
+
+def isFormula(v):
+    return type(v) is str and v.startswith('=')
+
+# Column letters to number, "A" is 1
+def column(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - ord('A') + 1
+    return n
+
+# "A1", "A1:B2", or "A:B" to (row, col, row, col), "rows" the length of a whole column
+def bounds(ref, rows):
+    ref = ref.replace('$', '')
+    corners = []
+    for part in ref.split(':'):
+        m = re.match(r'([A-Z]+)(\d*)', part)
+        corners.append((int(m.group(2)) if m.group(2) else None, column(m.group(1))))
+    (r1, c1), (r2, c2) = corners[0], corners[-1]
+    return (r1 or 1, min(c1, c2), r2 or rows, max(c1, c2)) if r1 is None or r2 is None else \
+        (min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+
+class FormulaCost:
+    def __init__(self, wb):
+        self.functions = Counter()
+        self.edges = Counter()  # (sheet, sheet it refers to): references
+        self.cellsRead = 0
+        self.formulas = {}      # (sheet, row, col): [(sheet, row, col, row, col)] of its references
+        rows = {ws.title: ws.max_row for ws in wb.worksheets}
+        for ws in wb.worksheets:
+            cells = ws._cells.values() if hasattr(ws, '_cells') else (c for r in ws.iter_rows() for c in r)
+            for c in cells:
+                if not isFormula(c.value):
+                    continue
+                text = Strings.sub('""', c.value)
+                self.functions.update(Function.findall(text))
+                refs = []
+                for quoted, plain, ref in Reference.findall(text):
+                    sheet = quoted.replace("''", "'") if quoted else plain or ws.title
+                    if sheet not in rows:
+                        continue    # a name that looks like a reference
+                    r1, c1, r2, c2 = bounds(ref, rows[sheet])
+                    refs.append((sheet, r1, c1, r2, c2))
+                    self.cellsRead += (r2 - r1 + 1) * (c2 - c1 + 1)
+                    if sheet != ws.title:
+                        self.edges[(ws.title, sheet)] += 1
+                self.formulas[(ws.title, c.row, c.column)] = refs
+        self.chains()
+
+    # The formula cells in a range, through a sorted index of the rows of each column
+    def inRange(self, index, ref):
+        sheet, r1, c1, r2, c2 = ref
+        cols = index.get(sheet, {})
+        out = []
+        for col in range(c1, c2 + 1):
+            rs = cols.get(col)
+            if rs:
+                out += [(sheet, r, col) for r in rs[bisect.bisect_left(rs, r1):bisect.bisect_right(rs, r2)]]
+        return out
+
+    # Longest chain of formulas, in topological order: a formula after those it reads
+    def chains(self):
+        index = defaultdict(lambda: defaultdict(list))
+        for sheet, r, col in sorted(self.formulas):
+            index[sheet][col].append(r)
+        cache = {}
+        users = defaultdict(list)
+        waiting = {}
+        for cell, refs in self.formulas.items():
+            deps = set()
+            for ref in refs:
+                if ref not in cache:
+                    cache[ref] = self.inRange(index, ref)
+                deps.update(cache[ref])
+            deps.discard(cell)
+            waiting[cell] = len(deps)
+            for d in deps:
+                users[d].append(cell)
+        self.depth = {c: 1 for c, n in waiting.items() if n == 0}
+        via = {}
+        ready = deque(self.depth)
+        while ready:
+            d = ready.popleft()
+            for u in users[d]:
+                if self.depth[d] + 1 > self.depth.get(u, 0):
+                    self.depth[u] = self.depth[d] + 1
+                    via[u] = d
+                waiting[u] -= 1
+                if waiting[u] == 0:
+                    ready.append(u)
+        self.circular = sum(1 for n in waiting.values() if n > 0)
+        self.chain = []
+        if self.depth:
+            c = max(self.depth, key=self.depth.get)
+            while c is not None:
+                self.chain.append(c)
+                c = via.get(c)
+
+    def report(self):
+        return {'Formulas': len(self.formulas), 'Cross-sheet': sum(self.edges.values()),
+                'Depth': max(self.depth.values(), default=0), 'Recalc cells': self.cellsRead,
+                'Circular': self.circular, 'Functions': dict(self.functions.most_common()),
+                'Edges': {f'{a} -> {b}': n for (a, b), n in self.edges.most_common()}}
+
+    def show(self, name):
+        from openpyxl.utils import get_column_letter
+        rep = self.report()
+        print(f"{name}: {rep['Formulas']} formulas, {rep['Cross-sheet']} cross-sheet references, "
+              f"chains of {rep['Depth']}, {rep['Recalc cells']} cells read to recalculate")
+        print('  ' + ', '.join(f'{f} {n}' for f, n in rep['Functions'].items()))
+        for e, n in rep['Edges'].items():
+            print(f'  {e}: {n}')
+        if self.chain:
+            print('  longest: ' + ' <- '.join(f"'{s}'!{get_column_letter(c)}{r}" for s, r, c in self.chain))
+        if self.circular:
+            print(f'  {self.circular} formulas in circular references')
+
+
+# Every configuration of the catalog, built in memory
+def measureAll(log, configs):
+    from bench import newBenchDocument
+    from catalog import artifactName
+    results = {}
+    for m, p, b in configs:
+        doc = newBenchDocument(log, m, p, b)
+        if doc is None:
+            log.error(f'{artifactName(m, p, b)} cannot be made')
+            continue
+        doc.build()
+        rep = FormulaCost(doc.wb).report()
+        results[artifactName(m, p, b)] = {k: rep[k] for k in Metrics}
+        log.info(f'{artifactName(m, p, b)}: {results[artifactName(m, p, b)]}')
+    return results
+
+# Returns the names of the configurations over their budgets
+def compare(results, budgets, threshold):
+    over = []
+    print(f'{"":>16} ' + ' '.join(f'{k:>12}' for k in Metrics))
+    for name, r in results.items():
+        base = budgets.get(name)
+        notes = ['new'] if base is None else \
+            [f'{k.lower()} {base[k]} -> {r[k]}' for k in Metrics if r[k] > base[k] * (1 + threshold)]
+        if base is not None and notes:
+            over.append(name)
+        print(f'{name:>16} ' + ' '.join(f'{r[k]:>12}' for k in Metrics) + f'  {", ".join(notes)}')
+    print(f'{len(results)} configurations, {len(over)} over budget by more than {threshold:.0%}')
+    return over
+
+
+if __name__ == '__main__':
+    log = setlog('formulas', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('workbooks', nargs='*', help='Workbooks to analyze')
+    parser.add_argument('-m', '--movement', choices=('howell', 'mitchell', 'square'), help='Build this movement')
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('--all', action='store_true', help='Every configuration, against the budgets')
+    parser.add_argument('-t', '--threshold', type=float, default=0.0, help='Over budget by more than, 0.1 for 10%%')
+    parser.add_argument('--budgets', type=str, default=Budgets, help='Budgets file')
+    parser.add_argument('--save', action='store_true', help='Save this run as the budgets')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    if args.all:
+        from bench import Fields
+        from catalog import allArtifacts
+        results = measureAll(log, [c for c in allArtifacts() if c[0] != 'generic'] + Fields)
+        budgets = {}
+        if os.path.exists(args.budgets):
+            with open(args.budgets, 'r') as f:
+                budgets = json.load(f)
+        over = compare(results, budgets, args.threshold)
+        if args.save:
+            with open(args.budgets, 'w') as f:
+                json.dump(results, f, indent=1, sort_keys=True)
+            print(f'Budgets saved in {args.budgets}')
+        elif over:
+            raise SystemExit(1)
+    elif args.movement:
+        from bench import newBenchDocument
+        doc = newBenchDocument(log, args.movement, args.pair, args.boards)
+        if doc is None:
+            raise SystemExit(1)
+        doc.build()
+        FormulaCost(doc.wb).show(doc.outputName())
+    else:
+        from openpyxl import load_workbook
+        for fn in args.workbooks:
+            wb = load_workbook(fn, read_only=True)
+            FormulaCost(wb).show(fn)
+            wb.close()
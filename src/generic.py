@@ -8,7 +8,6 @@
 # These numbers were reasonable for normal amateur tournaments and optimal for 8x11 paper and human friendly font size.
 #
 import pdf
-import datetime
 from docset import PairGames
 
 class GenericPDF(PairGames):
@@ -16,7 +15,7 @@ class GenericPDF(PairGames):
         super().__init__(None)
         self.pdf = pdf.PDF()
         self.notice = 'For public domain. No rights reserved. Generated on'
-        self.pdf.HeaderFooterText(f'{self.notice} {datetime.date.today().strftime("%b %d, %Y")}.',' ')
+        self.pdf.HeaderFooterText(f'{self.notice} {self.dateStamp()}.',' ')
         self.nPerPg = 4
     
     # placeholders to facilitate reusing code in PairGames
@@ -54,20 +53,19 @@ class GenericPDF(PairGames):
                 jData[pairNum].append((b, None, None, None, None))
         self.JournalWithData(jData)
 
-    def save(self):
+    def save(self, outDir=None):
         import os
         here = os.path.dirname(os.path.abspath(__file__))
-        fn = f'{here}/../generic.pdf'
-        self.pdf.output(fn)
-        print(f'Saved {fn}')
+        fn = f'{outDir or here + "/.."}/generic'
+        print(f'Saved {self.savePDF(fn)}')
 
 
-    def printPDF(self):
+    def printPDF(self, outDir=None):
         self.pdf.instructions(None, 'generic.txt')
         self.printTravler()
         self.printRecords()
         self.Pickups()
-        self.save()
+        self.save(outDir)
         return
 
 
@@ -11,18 +11,20 @@
 #        Smooother board transitions
 
 import argparse
-import pdf
-import os
 import datetime
+import pdf
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side
 import logging
 import jsonIO
-import json5
 from maininit import setlog
-from docset import PairGames
+from docset import DupBridge, PairGames
 
 class Howell(PairGames):
+    Sections = (('Instructions', 'instructionsPDF'), ('Roster', 'rosterPDF'), ('IDTags', 'idTags'),
+                ('Tables', 'movementTables'), ('Travelers', 'Travelers'), ('Journals', 'Journal'),
+                ('Pickups', 'Pickups'))
+
     def __init__(self, log, toFake, pairs, decks, tourney, nameFile):
         super().__init__(log)
         self.fake = toFake
@@ -31,24 +33,15 @@ class Howell(PairGames):
         self.pairs = pairs
         self.decks = decks
         self.tourneyData = tourney
-        self.nameObj = {'File': f'howell{self.pairs}x{self.decks}{"xF" if self.fake else ""}',
+        self.loadNames(nameFile, {'File': f'howell{self.pairs}x{self.decks}{"xF" if self.fake else ""}',
                     'Tournament': f'Howell Movement for {self.pairs} Pairs, {self.decks} boards round',
-                    'Players': []}
-        if nameFile and os.path.exists(nameFile):
-            try:
-                with open(nameFile, 'r') as f:
-                    self.nameObj = json5.load(f)
-            except:
-                pass
+                    'Players': []})
         self.init()
         return
 
-    def save(self):
-        here = os.path.dirname(os.path.abspath(__file__))
-        fn = f'{here}/../{self.nameObj['File']}'
-        self.wb.save(f'{fn}.xlsx')
-        self.pdf.output(f'{fn}.pdf')
-        print(f'Saved {fn}.{{xlsx,pdf}}')
+    def save(self, outDir=None):
+        fn = self.outputPath(outDir)
+        print(f'Saved {self.saveWorkbook(fn)} and {self.savePDF(fn)}')
 
     def pairN(self, n):
         return n if n != 0 else self.SITOUT
@@ -94,7 +87,7 @@ class Howell(PairGames):
             'Info': [['Pairs', self.pairs], ['Tables',int((self.pairs + (self.pairs % 2))/ 2)],
             ['Rounds',nRound], ['Boards per round',self.decks], ['Total Boards to play', self.decks*nRound]]}
 
-        self.pdf.HeaderFooterText(f'{self.notice} {datetime.date.today().strftime("%b %d, %Y")}.',
+        self.pdf.HeaderFooterText(f'{self.notice} {self.nameObj['Date']}.',
             self.nameObj['Tournament'])
 
     # Present the same data table-oriented
@@ -196,6 +189,7 @@ class Howell(PairGames):
 
     # Sign-up sheet
     def rosterPDF(self):
+        self.pdf.set_font(self.pdf.serifFont, size=self.pdf.linePt)
         self.pdf.add_page()
         self.pdf.headerFooter()
         self.pdf.meta(self.metaData)
@@ -223,28 +217,41 @@ class Howell(PairGames):
             self.pdf.cell(widths[2], h, text=names[1], align='C', border=1)
             y += h
 
-    def go(self):
-        self.rosterSheet()
-        self.boardTab()
-        self.roundTab()
-        self.IMPTable()
-        self.ScoreTable()
+    # Everything but saving to files
+    def build(self):
+        with self.stage('PDF sections'):
+            self.startSections()
+        with self.stage('Roster sheet'):
+            self.rosterSheet()
+        with self.stage('By Board sheet'):
+            self.boardTab()
+        with self.stage('By Round sheet'):
+            self.roundTab()
+        with self.stage('Static sheets'):
+            self.IMPTable()
+            self.ScoreTable()
+        with self.stage('PDF sections'):
+            self.finishSections()
 
-        self.pdf.instructions(self.log, "instructions.txt")
-        self.rosterPDF()
-        self.idTags()
-        self.movementTables()
-        self.Travelers()
-        self.Journal()
-        self.Pickups()
-        self.save()
+    def go(self):
+        with self.stage('Build'):
+            self.build()
+        with self.stage('Save'):
+            self.save()
 
-def howellFromJson(log, pairs, decks, fake, nameFile, jsonfile):
+# "profile": None, or report the stages of the build (see PairGames.profiled), also as JSON if a file name
+def howellFromJson(log, pairs, decks, fake, nameFile, jsonfile, workers=0, split=False, volumePages=0, profile=None):
     jIO = jsonIO.JsonIO(pairs, log)
     tourney = jIO.load(jsonfile)
     if tourney:
         doc = Howell(log, fake, pairs, decks, tourney, nameFile)
-        doc.go()
+        doc.workers = workers
+        doc.split = split
+        doc.volumePages = volumePages
+        if profile is None:
+            doc.go()
+        else:
+            doc.profiled(doc.go, profile)
 
 if __name__ == '__main__':
     log = setlog('howell', None)
@@ -255,15 +262,25 @@ if __name__ == '__main__':
     parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
     parser.add_argument('-d', '--debug', type=str, default='INFO')
     parser.add_argument('-j', '--jsonfile', type=str)
+    parser.add_argument('-w', '--workers', type=int, default=0, help='Draw the PDF sections in # processes')
+    parser.add_argument('--split', action='store_true', help='A PDF file for each section')
+    parser.add_argument('--volume', type=int, default=0, help='PDF in volumes of at most # pages, written as drawn')
+    parser.add_argument('--seed', type=int, help='Random seed, for reproducible outputs')
+    parser.add_argument('--date', type=datetime.date.fromisoformat, help='Date on the documents, YYYY-MM-DD')
+    parser.add_argument('--profile', nargs='?', const='', help='Report the stages of the build, and save it as JSON if a file is given')
     args = parser.parse_args()
     for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
         if args.debug.upper() == l[0]:
             log.setLevel(l[1])
             break
+    if args.seed is not None or args.date is not None:
+        DupBridge.setReproducible(args.seed, args.date or datetime.date.today())
 
     if args.pair: 
-        howellFromJson(log, args.pair, args.boards, args.fake, args.names, args.jsonfile)
+        howellFromJson(log, args.pair, args.boards, args.fake, args.names, args.jsonfile, args.workers, args.split, args.volume,
+                       args.profile)
     elif args.pair is None:
         for p in range(4,8):
-            howellFromJson(log, p, args.boards, args.fake, args.names, args.jsonfile)
+            howellFromJson(log, p, args.boards, args.fake, args.names, args.jsonfile, args.workers, args.split, args.volume,
+                           args.profile)
 
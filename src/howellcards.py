@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# One command line for everything, quick to start
+# openpyxl and fpdf take a few hundred milliseconds to import.  Only "generate" needs them, so
+# every subcommand imports what it uses when it runs, and queries start in tens of milliseconds.
+#
+#   generate: the PDF and the spreadsheet of a movement, as howell.py, mitchell.py, generic.py
+#   validate: check the Howell arrangements in setup.json
+#   search: look for initial Howell seatings of a number of tables, as initset.py
+#   list: the known good seatings, or the Howell arrangement of a number of pairs
+#
+# -t: report the time spent importing each module, and to get ready
+import time
+started = time.perf_counter()
+import argparse
+import datetime
+import importlib
+import logging
+import os
+import sys
+from maininit import setlog
+
+# Modules imported by the subcommands, with the seconds each took
+importTimes = {}
+
+def lazyImport(name):
+    if name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        importTimes[name] = time.perf_counter() - start
+    return sys.modules[name]
+
+def showTimes(ready, done):
+    for name, secs in importTimes.items():
+        print(f'{"import " + name:>20} {secs * 1000:8.1f} ms')
+    print(f'{"ready":>20} {(ready - started) * 1000:8.1f} ms')
+    print(f'{"done":>20} {(done - started) * 1000:8.1f} ms')
+
+def generate(log, args):
+    # the heavy ones first, so that they are timed by themselves
+    for m in ['json5', 'openpyxl', 'fpdf']:
+        lazyImport(m)
+    docset = lazyImport('docset')
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+    if args.seed is not None or args.date is not None:
+        docset.DupBridge.setReproducible(args.seed, args.date or datetime.date.today())
+    if args.movement == 'generic':
+        lazyImport('generic').GenericPDF().printPDF(args.outdir)
+        return 0
+    if args.movement == 'mitchell' and (args.pair > 24 or args.sections):
+        doc = lazyImport('mitchell').SectionedMitchell(log, args.pair, args.boards, args.fake, args.names,
+                                                       args.sections)
+    else:
+        doc = lazyImport('movements').newDocument(log, args.movement, args.pair, args.boards, args.names,
+                                                  args.fake, args.jsonfile)
+    if doc is None:
+        return 1
+    doc.workers = args.workers
+    doc.split = args.split
+    doc.volumePages = args.volume
+    def run():
+        with doc.stage('Build'):
+            doc.build()
+        with doc.stage('Save'):
+            doc.save(args.outdir)
+    if args.profile is None:
+        run()
+    else:
+        doc.profiled(run, args.profile)
+    return 0
+
+def validate(log, args):
+    jsonIO = lazyImport('jsonIO')
+    bad = 0
+    for p in [args.pair] if args.pair else range(4, 15):
+        jIO = jsonIO.JsonIO(p, log)
+        good = jIO.load(args.jsonfile) is not None    # validated as the generators do
+        print(f'{p:>2} pairs: {"valid" if good else "INVALID"}')
+        bad += 0 if good else 1
+    return 1 if bad else 0
+
+def search(log, args):
+    initset = lazyImport('initset')
+    for n in [args.table] if args.table else range(3, 8):
+        print(f'{n}: {initset.genSeats(n)}')
+    return 0
+
+def listing(log, args):
+    if args.what == 'seatings':
+        lazyImport('tables').listAllSeatings()
+        return 0
+    jsonIO = lazyImport('jsonIO')
+    for p in [args.pair] if args.pair else range(4, 15):
+        jIO = jsonIO.JsonIO(p, log)
+        if jIO.load(args.jsonfile) is None:
+            return 1
+        jIO.showArrangement()
+    return 0
+
+
+if __name__ == '__main__':
+    log = setlog('howellcards', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-t', '--timings', action='store_true', help='Report the import timings')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='PDF and spreadsheet of a movement')
+    gen.set_defaults(run=generate)
+    gen.add_argument('-m', '--movement', choices=('howell', 'mitchell', 'square', 'generic'), default='howell')
+    gen.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    gen.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    gen.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
+    gen.add_argument('-f', '--fake', action='store_true', help='Fake scores to test the spreadsheet')
+    gen.add_argument('-o', '--outdir', type=str, help='Output directory')
+    gen.add_argument('-j', '--jsonfile', type=str)
+    gen.add_argument('--sections', type=int, help='Split a Mitchell field in # sections')
+    gen.add_argument('-w', '--workers', type=int, default=0, help='Draw the PDF sections in # processes')
+    gen.add_argument('--split', action='store_true', help='A PDF file for each section')
+    gen.add_argument('--volume', type=int, default=0, help='PDF in volumes of at most # pages, written as drawn')
+    gen.add_argument('--seed', type=int, help='Random seed, for reproducible outputs')
+    gen.add_argument('--date', type=datetime.date.fromisoformat, help='Date on the documents, YYYY-MM-DD')
+    gen.add_argument('--profile', nargs='?', const='', help='Report the stages of the build, and save it as JSON if a file is given')
+
+    val = sub.add_parser('validate', help='Check the Howell arrangements')
+    val.set_defaults(run=validate)
+    val.add_argument('-p', '--pair', type=int, choices=range(4,15), help='Only this # of pairs')
+    val.add_argument('-j', '--jsonfile', type=str)
+
+    srch = sub.add_parser('search', help='Search initial Howell seatings')
+    srch.set_defaults(run=search)
+    srch.add_argument('--table', type=int, choices=range(3,8), help='# of tables, 3 to 7 by default')
+
+    lst = sub.add_parser('list', help='Known good seatings, or Howell arrangements')
+    lst.set_defaults(run=listing)
+    lst.add_argument('what', choices=('seatings', 'howell'), nargs='?', default='seatings')
+    lst.add_argument('-p', '--pair', type=int, choices=range(4,15), help='Only this # of pairs')
+    lst.add_argument('-j', '--jsonfile', type=str)
+
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    ready = time.perf_counter()
+    ret = args.run(log, args)
+    if args.timings:
+        showTimes(ready, time.perf_counter())
+    sys.exit(ret)
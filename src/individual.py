@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# Individual movements: partners change every round
+# Every player partners every other player once and has every other player as an opponent twice
+# (a "whist tournament").  As in a Howell (see HowellSeats), one seating is found for the first
+# round and everybody moves by the same rule after each round: player p takes the seat player
+# p - 1 had.  With 4k players, player 4k is stationary at table 1 North and 4k - 1 rounds are
+# played; with 4k + 1 players nobody is stationary, 4k + 1 rounds are played, and each player sits
+# out once.  (9 players have no such seating: they are numbered as pairs of digits modulo 3 and
+# move by adding the round, digit by digit.)  Other numbers of players cannot partner everybody
+# once without phantoms.
+#
+# The seating of the first round decides everything: two moving players d apart in the numbering
+# are partners, or opponents, in as many rounds as the partnerships, or oppositions, d apart in
+# the first round.  The search seats the first round one player at a time and prunes as soon as a
+# difference is used once too often by partners, or twice too often by opponents.  Board sets
+# are given to the tables as they are opened and move by the rule too (set b, then b + 1), pruned
+# as soon as a player would see a set twice.  When no such board sets are found in BoardTries,
+# every table plays the same set in a round, passed from table to table or in copies (see deals.py).
+#
+# The PDF has the sign-up sheet, a movement card of each table (who sits where in every round), a
+# card of each player (table, seat, partner, and boards of every round), and the pickup slips.
+#
+# -p #: players, 8 to 20 (4k or 4k + 1)
+# -b #: boards per round
+# -n file: names of the players, "Players" the list in player order
+import argparse
+import logging
+import time
+import pdf
+from maininit import setlog
+from docset import PairGames
+
+SeatNames = ('North', 'South', 'East', 'West')
+# Partnerships and oppositions of a table, by seat (N, S, E, W)
+Partners = ((0, 1), (2, 3))
+Opponents = ((0, 2), (0, 3), (1, 2), (1, 3))
+# Moving players numbered in another group than the integers modulo the rounds
+Groups = {9: (3, 3)}
+# Give up looking for board sets that move with the players after so many seats tried
+BoardTries = 40_000
+
+class IndividualSchedule:
+    def __init__(self, players, log=None):
+        self.log = setlog('individual', log)
+        if players % 4 not in (0, 1) or players < 8:
+            raise ValueError(f'No individual movement for {players} players: 4k or 4k + 1, at least 8')
+        self.players = players
+        self.stationary = players % 4 == 0
+        self.rounds = players - 1 if self.stationary else players   # also the moving players, and board sets
+        self.tables = players // 4
+        # moving players are the elements of a group, 0 is its zero, by their tables of + and -
+        moduli = Groups.get(self.rounds, (self.rounds,))
+        digits = []
+        for q in range(self.rounds):
+            d = []
+            for n in reversed(moduli):
+                q, r = divmod(q, n)
+                d.insert(0, r)
+            digits.append(tuple(d))
+        index = {d: i for i, d in enumerate(digits)}
+        self.add = [[index[tuple((x + y) % n for x, y, n in zip(a, b, moduli))] for b in digits] for a in digits]
+        self.sub = [[index[tuple((x - y) % n for x, y, n in zip(a, b, moduli))] for b in digits] for a in digits]
+        self.tries = 0
+        self.first = None   # [[N, S, E, W] of each table] in the first round, None the stationary player
+        self.sets = None    # board set of each table in the first round, None if all tables share the sets
+
+    # The first round, seat by seat.  Returns True when seated.  "boards": board sets moving with the
+    # players, given to each table as it is opened.  Player 0 sits out when nobody is stationary.
+    # North takes the lowest player left, South and East come after North, West after East.
+    def seat(self, boards, limit=None):
+        m, sub = self.rounds, self.sub
+        neg = [sub[0][d] for d in range(m)]
+        seats = [None] * (4 * self.tables)
+        sets = [None] * self.tables
+        used = [False] * m
+        used[0] = not self.stationary
+        seen = [False] * m  # set - player, the same for a player at every table it plays
+        partner, opposed = [0] * m, [0] * m
+        self.tries = 0
+
+        # Differences of "p" in seat "i" with those already seated at its table, None if too many
+        def fits(i, p):
+            t, s = divmod(i, 4)
+            added = []
+            for a, b in Partners + Opponents:
+                q = seats[4 * t + a]
+                if b != s or q is None:
+                    continue
+                c, most = (partner, 1) if (a, b) in Partners else (opposed, 2)
+                d = sub[p][q]
+                if c[d] >= most or c[neg[d]] >= most:
+                    for x, y in added:
+                        x[y] -= 1
+                    return None
+                c[d] += 1
+                c[neg[d]] += 1
+                added += [(c, d), (c, neg[d])]
+            return added
+
+        def place(i):
+            if i == len(seats):
+                return True
+            if limit is not None and self.tries > limit:
+                return False
+            t, s = divmod(i, 4)
+            if s == 0 and boards and sets[t] is None:
+                for b in [0] if t == 0 else range(m):
+                    if b in sets[:t]:
+                        continue
+                    sets[t] = b
+                    if place(i):
+                        return True
+                sets[t] = None
+                return False
+            if i == 0 and self.stationary:
+                seats[0] = None
+                return place(1)
+            if s == 0:
+                choices = [used.index(False)]
+            else:
+                lo = seats[4 * t + (2 if s == 3 else 0)]
+                lo = -1 if lo is None or s == 2 and seats[4 * t] is None else lo
+                choices = [p for p in range(lo + 1, m) if not used[p]]
+            for p in choices:
+                key = sub[sets[t]][p] if boards else 0
+                if boards and seen[key]:
+                    continue
+                self.tries += 1
+                added = fits(i, p)
+                if added is None:
+                    continue
+                seats[i], used[p] = p, True
+                seen[key] = boards
+                if place(i + 1):
+                    return True
+                seats[i], used[p] = None, False
+                seen[key] = False
+                for x, y in added:
+                    x[y] -= 1
+            return False
+
+        if not place(0):
+            return False
+        self.first = [seats[4 * t:4 * t + 4] for t in range(self.tables)]
+        self.sets = sets if boards else None
+        return True
+
+    def search(self):
+        if self.seat(True, BoardTries):
+            return True
+        self.log.info(f'No board sets moving with the players in {self.tries} tries, the tables share them')
+        return self.seat(False)
+
+    # Player numbers: moving player q is q + 1 in the first round, the stationary player is the last
+    def player(self, q, r):
+        return self.players if q is None else self.add[q][r] + 1
+
+    # [[(N, S, E, W), board set] of each table] of round "r", players from 1, sets zero-based
+    def round(self, r):
+        return [[tuple(self.player(q, r) for q in seats), r if self.sets is None else self.add[b][r]]
+                for seats, b in zip(self.first, self.sets or [None] * self.tables)]
+
+    def sitout(self, r):
+        return None if self.stationary else self.player(0, r)
+
+    # Partners once, opponents twice, no board set twice, no player twice in a round
+    def validate(self):
+        partners, opponents, sets = {}, {}, {}
+        for r in range(self.rounds):
+            seated = [p for seats, b in self.round(r) for p in seats]
+            if len(set(seated)) != len(seated):
+                self.log.error(f'Round {r+1} seats a player twice')
+                return False
+            for seats, b in self.round(r):
+                for pairs, met in [(Partners, partners), (Opponents, opponents)]:
+                    for a, c in pairs:
+                        key = frozenset((seats[a], seats[c]))
+                        met[key] = met.get(key, 0) + 1
+                for p in seats:
+                    sets.setdefault(p, []).append(b)
+        n = self.players * (self.players - 1) // 2
+        good = len(partners) == n and set(partners.values()) == {1} and \
+            len(opponents) == n and set(opponents.values()) == {2} and \
+            all(len(set(s)) == len(s) for s in sets.values())
+        if not good:
+            self.log.error(f'Individual movement of {self.players} players is not valid')
+        return good
+
+
+# The document set of an individual
+# The partnerships of each round are the "pairs" of roundData and boardData, numbered from 1 in
+# round order, so that the pickup slips are made as for pair games.
+class Individual(PairGames):
+    Sections = (('Roster', 'rosterPDF'), ('Tables', 'movementCards'), ('Players', 'playerCards'),
+                ('Pickups', 'Pickups'))
+
+    def __init__(self, log, players, decks, nameFile=None, schedule=None):
+        super().__init__(log)
+        self.pdf = pdf.PDF(False)
+        self.wb = None
+        self.pairs = players
+        self.decks = decks
+        self.schedule = schedule or IndividualSchedule(players, log)
+        if self.schedule.first is None and not self.schedule.search():
+            raise ValueError(f'No individual movement found for {players} players')
+        self.loadNames(nameFile, {'File': f'individual{players}x{decks}',
+                    'Tournament': f'Individual Movement for {players} Players, {decks} boards round',
+                    'Players': []})
+        self.partnerships = [None]  # (player, player) of each "pair"
+        for r in range(self.schedule.rounds):
+            self.roundData[r] = {}
+            for t, (seats, b) in enumerate(self.schedule.round(r)):
+                self.partnerships += [seats[0:2], seats[2:4]]
+                self.roundData[r][t] = {'NS': len(self.partnerships) - 2, 'EW': len(self.partnerships) - 1,
+                                        'Board': self.boardList(b)}
+        for r, tbl in self.roundData.items():
+            for t, d in tbl.items():
+                for b in d['Board']:
+                    self.boardData.setdefault(b, []).append([r, t, d['NS'], d['EW']])
+        self.tables = self.schedule.tables
+        self.metaData = {'Title': 'Individual Tournament',
+            'Info': [['Players', players], ['Tables', self.tables], ['Rounds', self.schedule.rounds],
+                     ['Boards per round', decks],
+                     ['Boards', 'shared by the tables of a round' if self.schedule.sets is None else 'moved after each round']]}
+        self.pdf.HeaderFooterText(f"{self.notice} {self.nameObj['Date']}.", self.nameObj['Tournament'])
+
+    def pairN(self, n):
+        return '-'.join(str(p) for p in self.partnerships[n]) if n else self.SITOUT
+
+    def pairID(self, n):
+        return self.pairN(n)
+
+    def playerName(self, p):
+        return self.nameObj['Players'][p-1] if len(self.nameObj['Players']) == self.pairs else ''
+
+    def boardText(self, b):
+        bds = self.boardList(b)
+        return f'{bds[0]+1}-{bds[-1]+1}' if len(bds) > 1 else f'{bds[0]+1}'
+
+    # Sign-up sheet
+    def rosterPDF(self):
+        self.pdf.set_font(self.pdf.serifFont, size=self.pdf.linePt)
+        self.pdf.add_page()
+        self.pdf.headerFooter()
+        self.pdf.meta(self.metaData)
+        self.pdf.set_font(self.pdf.serifFont, style='B', size=self.pdf.rosterPt)
+        h = self.pdf.lineHeight(self.pdf.font_size_pt)
+        title = 'Players'
+        self.pdf.set_xy(self.pdf.setHCenter(self.pdf.get_string_width(title)), self.pdf.get_y() + 2 * h)
+        self.pdf.cell(text=title)
+        widths = [1, 4]
+        y = self.pdf.get_y() + h
+        leftM = (self.pdf.w - sum(widths)) / 2
+        self.pdf.set_font(self.pdf.sansSerifFont, size=(self.pdf.bigPt if self.pairs < 17 else self.pdf.linePt))
+        h = self.pdf.lineHeight(self.pdf.font_size_pt)
+        for p in range(1, self.pairs + 1):
+            self.pdf.set_xy(leftM, y)
+            self.pdf.cell(widths[0], h, text=f'{p}', align='C', border=1)
+            self.pdf.cell(widths[1], h, text=self.playerName(p), align='C', border=1)
+            y += h
+
+    # A card for each table: the players of every round by seat, and the boards
+    def movementCards(self):
+        hdrs = ['Round', 'North', 'South', 'East', 'West', 'Boards']
+        tblCols = []
+        self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.rosterPt)
+        self.pdf.setHeaders(0, hdrs, tblCols)
+        xMargin = (self.pdf.w - sum(tblCols)) / 2
+        top = self.pdf.pt2in(self.pdf.bigPt) * 2.5 + 1
+        fontSize = self.pdf.rosterPt if self.schedule.rounds < 10 else self.pdf.bigPt
+        rounds = [self.schedule.round(r) for r in range(self.schedule.rounds)]
+        for t in range(self.tables):
+            self.pdf.add_page()
+            self.pdf.set_line_width(self.pdf.thinLine)
+            self.pdf.pageFooter(self.pairs, self.tables)
+            self.pdf.movementSheet()
+            self.pdf.tableAnchors(f'{t+1}')
+            self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=fontSize)
+            self.pdf.headerRow(xMargin, top, tblCols, hdrs)
+            self.pdf.set_font(size=fontSize)
+            y = self.pdf.get_y()
+            h = self.pdf.lineHeight(self.pdf.font_size_pt)
+            self.pdf.grid(xMargin, y + h, tblCols, h, len(rounds))
+            for r, tables in enumerate(rounds):
+                seats, b = tables[t]
+                self.pdf.gridTexts(xMargin, y + h, tblCols, h, [f'{r+1}'] + [f'{p}' for p in seats] + [self.boardText(b)])
+                y += h
+
+    # A card for each player: where to sit, with whom, and what to play in every round
+    def playerCards(self):
+        hdrs = ['Round', 'Table', 'Seat', 'Partner', 'Boards']
+        colW = []
+        self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.smallPt)
+        self.pdf.setHeaders(0, hdrs, colW)
+        w = min(self.pdf.w, self.pdf.h)
+        leftMargin = (w - 2 * sum(colW)) / 4
+        cWidth = w / 2
+        rounds = [self.schedule.round(r) for r in range(self.schedule.rounds)]
+        # as many cards down a page as fit: title, header, a row per round, and the divider, the last
+        # card above the page footer (the sections start where pdf.sectionDivider puts them)
+        card = self.pdf.lineHeight(self.pdf.headerPt) + (len(rounds) + 3) * self.pdf.lineHeight(self.pdf.smallPt)
+        bottom = self.pdf.eph - self.pdf.lineHeight(self.pdf.tinyPt)
+        perPage = max(1, int(bottom // card))
+        while perPage > 1 and (self.pdf.h - 0.5) * (perPage - 1) / perPage + 0.5 + self.pdf.margin * 2 + card > bottom:
+            perPage -= 1
+        for p in range(1, self.pairs + 1):
+            half = (p - 1) % 2
+            if (p - 1) % (2 * perPage) == 0:
+                self.pdf.add_page(orientation='P')
+                y = self.pdf.margin * 2
+            x = leftMargin + cWidth * half
+            self.pdf.set_font(self.pdf.serifFont, style='B', size=self.pdf.headerPt)
+            self.pdf.set_xy(x, y)
+            name = self.playerName(p)
+            self.pdf.cell(text=f'Player: {p}' + (f' ({name})' if name else ''))
+            ty = y + self.pdf.lineHeight(self.pdf.font_size_pt)
+            self.pdf.set_xy(x, ty)
+            self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.smallPt)
+            h = self.pdf.lineHeight(self.pdf.font_size_pt)
+            for i in range(len(hdrs)):
+                self.pdf.cell(colW[i], h, text=hdrs[i], align='C', border=1)
+            ty += h
+            self.pdf.grid(x, ty, colW, h, len(rounds))
+            for r, tables in enumerate(rounds):
+                texts = [f'{r+1}', '', 'Sit out', '', '']
+                for t, (seats, b) in enumerate(tables):
+                    if p in seats:
+                        s = seats.index(p)
+                        texts = [f'{r+1}', f'{t+1}', SeatNames[s], f'{seats[s ^ 1]}', self.boardText(b)]
+                self.pdf.gridTexts(x, ty, colW, h, texts)
+                ty += h
+            if half == 1 or p == self.pairs:
+                y = self.pdf.sectionDivider(perPage, (p + 1) // 2, self.pdf.margin) + self.pdf.margin * 2
+
+    def build(self):
+        with self.stage('PDF sections'):
+            self.startSections()
+            self.finishSections()
+
+    def save(self, outDir=None):
+        print(f'Saved {self.savePDF(self.outputPath(outDir))}')
+
+
+if __name__ == '__main__':
+    log = setlog('individual', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--players', type=int, choices=[n for n in range(8, 21) if n % 4 in (0, 1)], default=8)
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=2, help='Boards per round')
+    parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
+    parser.add_argument('-o', '--outdir', type=str, help='Output directory')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    start = time.perf_counter()
+    schedule = IndividualSchedule(args.players, log)
+    if not schedule.search() or not schedule.validate():
+        raise SystemExit(1)
+    found = time.perf_counter()
+    print(f'{args.players} players: found in {schedule.tries} tries, {found - start:.2f}s, '
+          f'{"board sets moving with the players" if schedule.sets else "tables sharing the board sets"}')
+    doc = Individual(log, args.players, args.boards, args.names or None, schedule)
+    doc.build()
+    doc.save(args.outdir)
@@ -2,13 +2,38 @@
 # Load setup data, verify they are valid
 # File "setup.json" was separately generated. We load from it and validate the data
 # are indeed good for tournament.
+import copy
+import json
 import logging
 import os
-import json5    # JSON5 supposedly can handle comments
+import re
 from maininit import setlog
 from tables import HowellSeats
 
+# setup.json is JSON5 only for its comments and unquoted keys.  json5 takes a second to parse it,
+# so it is rewritten into JSON for the standard parser.  json5 (supposedly can handle comments)
+# is imported only for what the rewrite cannot handle.  Strings are matched first and kept as
+# they are, so the rewrite never touches their contents.
+String = r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+Comment = re.compile(f'({String})|//[^\\n]*')
+BareKeyOrComma = re.compile(f'({String})|([{{,]\\s*)([A-Za-z_]\\w*)\\s*:|,(\\s*[}}\\]])')
+
+def unquoted(m):
+    if m.group(1):
+        return m.group(1)
+    return f'{m.group(2)}"{m.group(3)}":' if m.group(3) else m.group(4)
+
+def loadJson5(text):
+    try:
+        return json.loads(BareKeyOrComma.sub(unquoted, Comment.sub(lambda m: m.group(1) or '', text)))
+    except ValueError:
+        import json5
+        return json5.loads(text)
+
 class JsonIO:
+    # JSON5 parsing is slow, keep what was loaded by (file, modification time)
+    loaded = {}
+
     def __init__(self, pairs, log=None):
         self.fname = 'setup.json'
         self.log = log
@@ -52,11 +77,11 @@ class JsonIO:
         self.tournament['BoardMovement'] = seq
 
     def dump2File(self, f):
+        import json5
         objStr = json5.dumps(self.tournament)
-        for k in self.tournament.keys():
-            objStr = objStr.replace('Arrangement: ', 'Arrangement:\n\t\t')
-            objStr = objStr.replace('], ', '],\n\t\t')
-            objStr = objStr.replace(']]}, ',']]},\n')
+        objStr = objStr.replace('Arrangement: ', 'Arrangement:\n\t\t')
+        objStr = objStr.replace('], ', '],\n\t\t')
+        objStr = objStr.replace(']]}, ',']]},\n')
         objStr = f'"{self.pairs}": \t // {self.pairs} pairs\n\t' + objStr
         print(objStr,end=',\n',file=f)
         return
@@ -69,8 +94,11 @@ class JsonIO:
         try:
             fn = self.getFileName()
             if os.path.exists(fn):
-                with open(self.getFileName(), 'r') as f:
-                    loadObj = json5.load(f)
+                key = (fn, os.path.getmtime(fn))
+                if key not in JsonIO.loaded:
+                    with open(self.getFileName(), 'r') as f:
+                        JsonIO.loaded[key] = loadJson5(f.read())
+                loadObj = JsonIO.loaded[key]
         except:
             self.log.error('JSON load failed')
             return None
@@ -80,7 +108,7 @@ class JsonIO:
             self.log.error(f'{self.pairs} not in data')
             return None
 
-        self.tournament = loadObj[str(self.pairs)]
+        self.tournament = copy.deepcopy(loadObj[str(self.pairs)])   # ours to change
         isValid = self.validateData()
         #self.showArrangement()
         if not isValid:
@@ -134,7 +162,13 @@ class JsonIO:
     # Number of boards is one less than number of pairs
     # Each board played once for each pair
     # All boards played number of times as number of tables
-    def validateBoards(self):
+    # "report": log and print why the boards are not valid
+    def validateBoards(self, report=True):
+        def invalid(msg):
+            if report:
+                self.log.error(msg)
+                print(msg)
+            return False
         boardSets = {}
         addOdd = self.pairs + self.pairs % 2
         playCount = [0] * (addOdd - 1)
@@ -144,41 +178,31 @@ class JsonIO:
                     playCount[t['Board']] += 1
                 except IndexError:
                     msg = f'Board {t['Board']} IndexError in play count'
-                    self.log.error(msg)
-                    print(msg)
-                    return False
+                    return invalid(msg)
                 if t['Board'] not in boardSets:
                     boardSets[t['Board']] = set()
                 for side in ['NS', 'EW']:
                     if t[side] in boardSets[t['Board']]:
                         msg = f'{t[side]} already played board {self.boardToSet(t['Board'])}'
-                        self.log.error(msg)
-                        print(msg)
-                        return False
+                        return invalid(msg)
                     boardSets[t['Board']].add(t[side])
 
         # Number of boards is one less than number of pairs
         if len(boardSets) != addOdd - 1:
             msg = f'# of Board {len(boardSets)} not {addOdd - 1}'
-            self.log.error(msg)
-            print(msg)
-            return False
+            return invalid(msg)
 
         # Each board played exactly the number of times as number of tables
         for p in playCount:
             if p != self.tournament['Tables']:
                 msg = f'{playCount} not matched number of tables {self.tournament['Tables']}'
-                self.log.error(msg)
-                print(msg)
-                return False
+                return invalid(msg)
 
         # Each board play by all pairs
         for b in boardSets.values():
             if len(b) != addOdd:
                 msg = f'Board not played # of times'
-                self.log.error(msg)
-                print(msg)
-                return False
+                return invalid(msg)
         self.log.info(f'All boards played {playCount[0]} times by all pairs')
         return True
 
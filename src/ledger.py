@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# Results ledger: the filled-in spreadsheets of the events in one SQLite database
+# Every result of every board is kept as the spreadsheet has it (event, board, round, table,
+# NS, EW, contract, result, score) with its matchpoints and IMPs (see scoring.py), so that a
+# pair's or a player's history, or the standings of a season, are a query away.
+#
+#   import: workbooks, as made by the generators and filled in, in one transaction
+#   standings: players of a season by their matchpoint percentage
+#   history: the events of a player
+#   remove: an event, by its workbook
+#
+# The totals of each pair in each event, and of each player in each season, are kept as tables
+# updated by import and remove, so the standings are read, not computed.
+# Pairs are "3" in a Howell, "NS 3" / "EW 3" in a Mitchell, "NS A3" in section A of a field.
+import argparse
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import time
+from maininit import setlog
+from scoring import matchpoints, crossImps
+
+here = os.path.dirname(os.path.abspath(__file__))
+Ledger = f'{here}/../ledger.db'
+
+Schema = '''
+CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, source TEXT UNIQUE, name TEXT, date TEXT,
+    season TEXT, movement TEXT, pairs INTEGER, boards INTEGER);
+CREATE TABLE IF NOT EXISTS players (event INTEGER, pair TEXT, player TEXT, PRIMARY KEY (event, pair, player));
+CREATE TABLE IF NOT EXISTS results (event INTEGER, board INTEGER, round INTEGER, tbl INTEGER, ns TEXT, ew TEXT,
+    contract TEXT, declarer TEXT, result INTEGER, score INTEGER, top REAL, ns_mp REAL, ew_mp REAL,
+    ns_imp REAL, ew_imp REAL);
+CREATE TABLE IF NOT EXISTS pair_totals (event INTEGER, pair TEXT, boards INTEGER, mp REAL, top REAL, imp REAL,
+    PRIMARY KEY (event, pair));
+CREATE TABLE IF NOT EXISTS season_totals (season TEXT, player TEXT, events INTEGER, boards INTEGER, mp REAL,
+    top REAL, imp REAL, PRIMARY KEY (season, player));
+CREATE INDEX IF NOT EXISTS eventDate ON events (date);
+CREATE INDEX IF NOT EXISTS eventSeason ON events (season);
+CREATE INDEX IF NOT EXISTS playerName ON players (player);
+CREATE INDEX IF NOT EXISTS resultEvent ON results (event, board);
+CREATE INDEX IF NOT EXISTS resultNS ON results (ns, event);
+CREATE INDEX IF NOT EXISTS resultEW ON results (ew, event);
+CREATE INDEX IF NOT EXISTS pairTotal ON pair_totals (pair);
+'''
+
+# The date the documents were made for, in the notice on top of the Roster
+NoticeDate = re.compile(r'Generated on (\w{3} \d{1,2}, \d{4})')
+# The By Round row a By Board row refers to, in its "Vul" formula
+RoundRow = re.compile(r"!\$?F\$?(\d+)")
+
+def isFormula(v):
+    return type(v) is str and v.startswith('=')
+
+def number(v):
+    return v if type(v) in (int, float) else None
+
+# Reading a workbook
+
+# Section letters of a workbook: '' for a single movement, 'A', 'B', ... for the sections of a field
+def sections(wb):
+    if 'Roster' in wb.sheetnames:
+        return ['']
+    return [n[:-len(' Roster')] for n in wb.sheetnames if n.endswith(' Roster')]
+
+def sheet(wb, section, name):
+    return wb[f'{section} {name}' if section else name]
+
+# {pair: [player, player]} of a Roster sheet, whether it is a Mitchell's, and the notice on top
+def readRoster(ws, section):
+    rows = list(ws.iter_rows(values_only=True))
+    mitchell = len(rows) > 1 and 'Mitchell' in str(rows[1][0])
+    pairs = {}
+    side = ''
+    for r in rows[1:]:
+        if not r or r[0] is None:
+            continue
+        if type(r[0]) is str and r[0].endswith('Pairs'):
+            side = r[0][:-len('Pairs')].strip()
+        elif type(r[0]) is int:
+            key = f'{side} {section}{r[0]}' if mitchell else str(r[0])
+            pairs[key] = [str(n).strip() for n in r[1:3] if n]
+    return pairs, mitchell, str(rows[0][0]) if rows else ''
+
+# The results entered in a section: By Round, overridden by what was entered on By Board
+# [(board, round, table, NS, EW, contract, declarer, made, down, NS score, EW score)]
+def readResults(wb, mitchell, section):
+    entered = {}
+    rnd = tbl = ns = ew = None
+    for row, r in enumerate(sheet(wb, section, 'By Round').iter_rows(min_row=3, max_col=12, values_only=True), 3):
+        if r[4] is None:
+            continue
+        rnd, tbl, ns, ew = [r[i] if r[i] is not None else v for i, v in enumerate([rnd, tbl, ns, ew])]
+        entered[row] = [r[4], rnd, tbl, ns, ew] + list(r[6:12])
+    for r in sheet(wb, section, 'By Board').iter_rows(min_row=3, max_col=12, values_only=True):
+        m = RoundRow.search(r[5]) if type(r[5]) is str else None
+        if m is None or int(m.group(1)) not in entered:
+            continue
+        e = entered[int(m.group(1))]
+        for i in range(6, 12):
+            if r[i] is not None and not isFormula(r[i]):
+                e[i - 1] = r[i]
+    out = []
+    for b, rnd, tbl, ns, ew, contract, by, made, down, nsScore, ewScore in entered.values():
+        if type(ns) is not int or type(ew) is not int:
+            continue    # sit-out
+        if mitchell:
+            ns, ew = f'NS {section}{ns}', f'EW {section}{ew}'
+        out.append((b, rnd, tbl, str(ns), str(ew), contract, by, made, down, nsScore, ewScore))
+    return out
+
+# The NS net score of a result, None for an average, False if nothing was entered
+def netScore(nsScore, ewScore):
+    if number(nsScore) is not None:
+        return nsScore
+    if number(ewScore) is not None:
+        return -ewScore
+    if 'avg' in (str(nsScore).lower(), str(ewScore).lower()):
+        return None
+    return False
+
+# Results rows of the ledger, with their matchpoints and IMPs
+# Boards are scored within their section, results not entered are left out.
+def scoreResults(results):
+    boards = {}
+    for r in results:
+        score = netScore(r[9], r[10])
+        if score is not False:
+            boards.setdefault(r[0], []).append((r, score))
+    rows = []
+    for b in sorted(boards):
+        scores = [s for _, s in boards[b]]
+        mps, top = matchpoints(scores)
+        ims = crossImps(scores)
+        for (r, score), mp, imp in zip(boards[b], mps, ims):
+            made, down = number(r[7]), number(r[8])
+            result = made if made is not None else (-down if down is not None else None)
+            rows.append((r[0], r[1], r[2], r[3], r[4], r[5], r[6], result, score, top, mp, top - mp, imp, -imp))
+    return rows
+
+def readWorkbook(fn):
+    from openpyxl import load_workbook
+    wb = load_workbook(fn, read_only=True)
+    event = {'Pairs': {}, 'Results': []}
+    for section in sections(wb):
+        pairs, mitchell, notice = readRoster(sheet(wb, section, 'Roster'), section)
+        event['Pairs'].update(pairs)
+        event['Movement'] = 'mitchell' if mitchell else 'howell'
+        event['Notice'] = notice
+        event['Results'] += scoreResults(readResults(wb, mitchell, section))
+    wb.close()
+    return event
+
+
+class ResultsLedger:
+    def __init__(self, log, fn=Ledger):
+        self.log = log
+        self.db = sqlite3.connect(fn)
+        self.db.executescript(Schema)
+
+    def close(self):
+        self.db.close()
+
+    # Add the totals of an event to those of the season, sign -1 to take them away
+    def addSeason(self, event, season, sign):
+        self.db.execute('''
+            INSERT INTO season_totals (season, player, events, boards, mp, top, imp)
+            SELECT ?, p.player, ?, ? * SUM(t.boards), ? * SUM(t.mp), ? * SUM(t.top), ? * SUM(t.imp)
+              FROM players p JOIN pair_totals t ON t.event = p.event AND t.pair = p.pair WHERE p.event = ?
+             GROUP BY p.player
+            ON CONFLICT (season, player) DO UPDATE SET events = events + excluded.events,
+              boards = boards + excluded.boards, mp = mp + excluded.mp, top = top + excluded.top,
+              imp = imp + excluded.imp''', (season, sign, sign, sign, sign, sign, event))
+        self.db.execute('DELETE FROM season_totals WHERE season = ? AND events <= 0', (season,))
+
+    def removeEvent(self, source):
+        row = self.db.execute('SELECT id, season FROM events WHERE source = ?', (source,)).fetchone()
+        if row is None:
+            return False
+        event, season = row
+        self.addSeason(event, season, -1)
+        for table in ['results', 'players', 'pair_totals']:
+            self.db.execute(f'DELETE FROM {table} WHERE event = ?', (event,))
+        self.db.execute('DELETE FROM events WHERE id = ?', (event,))
+        return True
+
+    # One workbook.  Imported again, the event replaces what it was.
+    def importEvent(self, fn, name=None, date=None, season=None):
+        source = os.path.abspath(fn)
+        data = readWorkbook(fn)
+        if date is None:
+            m = NoticeDate.search(data['Notice'] or '')
+            date = datetime.datetime.strptime(m.group(1), '%b %d, %Y').date() if m else \
+                datetime.date.fromtimestamp(os.path.getmtime(fn))
+        season = season or str(date.year)
+        self.removeEvent(source)
+        boards = len({r[0] for r in data['Results']})
+        cur = self.db.execute('INSERT INTO events (source, name, date, season, movement, pairs, boards) VALUES (?,?,?,?,?,?,?)',
+                              (source, name or os.path.splitext(os.path.basename(fn))[0], date.isoformat(), season,
+                               data['Movement'], len(data['Pairs']), boards))
+        event = cur.lastrowid
+        self.db.executemany('INSERT OR IGNORE INTO players VALUES (?,?,?)',
+                            [(event, p, n) for p, names in data['Pairs'].items() for n in names])
+        self.db.executemany('INSERT INTO results VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                            [(event,) + r for r in data['Results']])
+        self.db.execute('''
+            INSERT INTO pair_totals (event, pair, boards, mp, top, imp)
+            SELECT event, pair, COUNT(*), SUM(mp), SUM(top), SUM(imp) FROM (
+              SELECT event, ns AS pair, ns_mp AS mp, top, ns_imp AS imp FROM results WHERE event = ?
+              UNION ALL
+              SELECT event, ew, ew_mp, top, ew_imp FROM results WHERE event = ?) GROUP BY pair''', (event, event))
+        self.addSeason(event, season, 1)
+        return event, len(data['Results'])
+
+    # All in one transaction: a workbook that cannot be read leaves the ledger as it was
+    def importAll(self, files, name=None, date=None, season=None):
+        with self.db:
+            return [self.importEvent(fn, name, date, season) for fn in files]
+
+    # [(player, events, boards, MP %, IMPs)] of a season, the best first
+    def standings(self, season, minEvents=1):
+        return self.db.execute('''
+            SELECT player, events, boards, mp / top, imp FROM season_totals
+             WHERE season = ? AND events >= ? AND top > 0 ORDER BY mp / top DESC''', (season, minEvents)).fetchall()
+
+    # [(date, event, pair, partner, boards, MP %, IMPs)] of a player
+    def history(self, player):
+        return self.db.execute('''
+            SELECT e.date, e.name, p.pair, (SELECT group_concat(o.player, ' & ') FROM players o
+                     WHERE o.event = p.event AND o.pair = p.pair AND o.player != p.player),
+                   t.boards, t.mp / t.top, t.imp
+              FROM players p JOIN pair_totals t ON t.event = p.event AND t.pair = p.pair
+              JOIN events e ON e.id = p.event WHERE p.player = ? ORDER BY e.date''', (player,)).fetchall()
+
+    def seasons(self):
+        return [r[0] for r in self.db.execute('SELECT DISTINCT season FROM events ORDER BY season')]
+
+
+if __name__ == '__main__':
+    log = setlog('ledger', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-l', '--ledger', type=str, default=Ledger, help='Ledger database')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help='Add the results of filled-in workbooks')
+    imp.add_argument('workbooks', nargs='+')
+    imp.add_argument('--name', type=str, help='Event name, the file name by default')
+    imp.add_argument('--date', type=datetime.date.fromisoformat, help='Event date, the one on the Roster by default')
+    imp.add_argument('--season', type=str, help='Season, the year of the event by default')
+    std = sub.add_parser('standings', help='Players of a season by their MP %%')
+    std.add_argument('season', nargs='?', help='The latest by default')
+    std.add_argument('--min', type=int, default=1, help='Players of at least # events')
+    hst = sub.add_parser('history', help='Events of a player')
+    hst.add_argument('player')
+    rm = sub.add_parser('remove', help='Remove the event of a workbook')
+    rm.add_argument('workbooks', nargs='+')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    ledger = ResultsLedger(log, args.ledger)
+    start = time.perf_counter()
+    if args.command == 'import':
+        done = ledger.importAll(args.workbooks, args.name, args.date, args.season)
+        print(f'{len(done)} events, {sum(n for _, n in done)} results in {time.perf_counter() - start:.2f}s')
+    elif args.command == 'remove':
+        with ledger.db:
+            for fn in args.workbooks:
+                if not ledger.removeEvent(os.path.abspath(fn)):
+                    log.error(f'{fn} is not in the ledger')
+    elif args.command == 'standings':
+        season = args.season or (ledger.seasons() or [''])[-1]
+        rows = ledger.standings(season, args.min)
+        print(f'Season {season}')
+        for i, (player, events, boards, pct, imp) in enumerate(rows, 1):
+            print(f'{i:>4} {player:<30} {events:>4} {boards:>5} {pct:8.2%} {imp:8.1f}')
+        print(f'{len(rows)} players in {(time.perf_counter() - start) * 1000:.1f} ms')
+    else:
+        for date, name, pair, partner, boards, pct, imp in ledger.history(args.player):
+            print(f'{date} {name:<30} {pair:>7} {partner or "":<30} {boards:>4} {pct:8.2%} {imp:8.1f}')
+    ledger.close()
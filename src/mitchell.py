@@ -6,41 +6,46 @@
 # A 4-table Mitchell use "Square" arrangement, found at MIT web site
 #
 import argparse
+import datetime
 import logging
+from string import ascii_uppercase
+from concurrent.futures import ProcessPoolExecutor
 from maininit import setlog
 from openpyxl import Workbook
 from openpyxl.styles import Font
 import pdf
-from docset import PairGames
-import datetime
-import os
-import json5
+from docset import DupBridge, PairGames, adoptSheets
 
 # Pairs are internally numbered 1,3,5,... for EW pairs and 2,4,6,... for NS
 # Pair 0 is the sit-out phantom pair
 # Externally, they are number 1 to n for both NS and EW sides
 class Mitchell(PairGames):
-    def __init__(self, log, p, b, sq, f, nameFile):
+    # No ID tags (idTags) for Mitchell
+    Sections = (('Instructions', 'instructionsPDF'), ('Roster', 'rosterPDF'), ('Tables', 'setTableTexts'),
+                ('Travelers', 'Travelers'), ('Journals', 'Journal'), ('Pickups', 'Pickups'))
+    Instructions = 'mitchellInstructions.txt'
+
+    # "section" is the letter of this section of a larger field, see SectionedMitchell
+    def __init__(self, log, p, b, sq, f, nameFile, section=''):
         super().__init__(log)
+        self.section = section
+        if section and self.seed is not None:
+            self.rng.seed(f'{self.seed}{section}')  # sections do not repeat each other's names and scores
         self.pairs = p
         self.decks = b
         self.tables = (self.pairs + 1) // 2
         self.oddPairs = self.pairs % 2 == 1
         self.square = sq
         self.fake = f
-        self.pdf = pdf.PDF()
+        self.pdf = pdf.PDF(not section)   # the field has the instructions, see Sections
         self.wb = Workbook()
+        if section:
+            self.Sections = tuple(s for s in self.Sections if s[0] != 'Instructions')
 
-        self.nameObj = {'File': f'mitchell{self.pairs}x{self.decks}{"xF" if self.fake else ""}',
+        self.loadNames(nameFile, {'File': f'mitchell{self.pairs}x{self.decks}{"xF" if self.fake else ""}',
                     'Tournament': f'Mitchell Movement for {self.pairs} Pairs, {self.decks} boards round',
-                    'Players': []}
-        if nameFile and os.path.exists(nameFile):
-            try:
-                with open(nameFile, 'r') as f:
-                    self.nameObj = json5.load(f)
-            except:
-                pass
-        self.pdf.HeaderFooterText(f'{self.notice} {datetime.date.today().strftime("%b %d, %Y")}.',
+                    'Players': []})
+        self.pdf.HeaderFooterText(f'{self.notice} {self.nameObj['Date']}.',
             self.nameObj['Tournament'])
         # initData must be the first one
         self.initData()
@@ -60,7 +65,7 @@ class Mitchell(PairGames):
     def pairID(self, n):
         if len(self.nameObj['Players']) == self.pairs:
             return self.nameObj['Players'][n-1]
-        return f"{self.pairSide(n)} {self.pairN(n)}" if n != 0 else self.SITOUT
+        return f"{self.pairSide(n)} {self.section}{self.pairN(n)}" if n != 0 else self.SITOUT
 
     # assign NS pair number
     def NSPair(self, r, t):
@@ -80,22 +85,32 @@ class Mitchell(PairGames):
         return ns == 0
 
     def main(self):
-        self.log.debug('Main goes')
-        self.pdf.instructions(self.log, 'mitchellInstructions.txt')
-        self.roster()
-        self.results()
-        self.roundTab()
-        self.boardTab()
-        self.IMPTable() # static sheet
-        self.ScoreTable()   # static sheet, produced to aid human TD, not used elsewhere.
-        #self.idTags()  # PDF only
-        self.setTableTexts()  # PDF only
-        self.Travelers()  # PDF only
-        self.Journal()  # PDF only
-        self.Pickups()  # PDF only
-        self.save()
+        with self.stage('Build'):
+            self.build()
+        with self.stage('Save'):
+            self.save()
         return
 
+    # Everything but saving to files
+    def build(self):
+        self.log.debug('Main goes')
+        with self.stage('PDF sections'):
+            self.startSections()    # PDF only, see Sections
+        self.log.debug('Roster sheet')
+        with self.stage('Roster sheet'):
+            self.rosterSheet()
+            self.results()
+        with self.stage('By Round sheet'):
+            self.roundTab()
+        with self.stage('By Board sheet'):
+            self.boardTab()
+        if not self.section:    # a section shares those of the field
+            with self.stage('Static sheets'):
+                self.IMPTable() # static sheet
+                self.ScoreTable()   # static sheet, produced to aid human TD, not used elsewhere.
+        with self.stage('PDF sections'):
+            self.finishSections()
+
 
     # Generate "boardData" and "roundData"
     def initData(self):
@@ -116,17 +131,13 @@ class Mitchell(PairGames):
             self.initRounds()
         self.checkBoardData()
 
-    def roster(self):
-        self.log.debug('Roster sheet and PDF')
-        self.rosterSheet()
-        self.rosterPDF()
-    
     # a notice on public domain
     # Then the meta info about this tournament
     # Last a list of names for pairs
     def rosterSheet(self):
         ws = self.wb.active # the first tab
-        ws.title = 'Roster'
+        ws.title = self.sheetName('Roster')
+        self.rosterRows = {'NS': [], 'EW': []}  # (row, pair #), for the field totals
 
         row = self.sheetMeta(ws, self.metaData) + 2
         toN = self.pairs + (1 if self.oddPairs else 0)
@@ -156,6 +167,7 @@ class Mitchell(PairGames):
                 ws.cell(row, 1).value = pName
                 ws.cell(row, 2).value = useNames[0]
                 ws.cell(row, 3).value = useNames[1]
+                self.rosterRows[['NS', 'EW'][s]].append((row, pName))
                 row += 1
 
             # draw a line
@@ -176,6 +188,7 @@ class Mitchell(PairGames):
         ws.column_dimensions['C'].width = 30
         
     def rosterPDF(self):
+        self.pdf.set_font(self.pdf.serifFont, size=self.pdf.linePt)
         self.pdf.add_page()
         self.pdf.headerFooter()
         self.pdf.meta(self.metaData)
@@ -217,6 +230,8 @@ class Mitchell(PairGames):
     def meta(self):
         self.log.debug('Meta')
         self.metaData = {'Title': 'Mitchell Tournament', 'Info': []}
+        if self.section:
+            self.metaData['Info'].append(('Section', self.section))
         self.metaData['Info'].append(('Pairs', self.pairs))
         self.metaData['Info'].append(('Tables', self.tables))
         self.metaData['Info'].append(('Rounds', self.pairs // 2 - 1))
@@ -308,7 +323,8 @@ class Mitchell(PairGames):
 
     def results(self):
         self.log.debug('Add results to Roster')
-        sh = self.wb['Roster']
+        sh = self.wb[self.sheetName('Roster')]
+        byBoard = self.sheetName('By Board')
         lastRows = 0
         row = len(self.metaData['Info']) + 4 + 1    # Copyright, Title, a Spacer, and score table row, plus sheet is 1-based
         divident = len(self.roundData) * len(self.roundData[0][0]['Board'])
@@ -323,9 +339,9 @@ class Mitchell(PairGames):
                 pName = self.pairN(p+1)
                 if pName == self.SITOUT:
                     continue
-                ifRange = f"'By Board'!{self.rc2a1(3, 4+s)}:{self.rc2a1(3+lastRows,4+s)}"
-                impRange = f"'By Board'!{self.rc2a1(3, 13+s)}:{self.rc2a1(3+lastRows,13+s)}"
-                sumRange = f"'By Board'!{self.rc2a1(3, 17+s)}:{self.rc2a1(3+lastRows,17+s)}"
+                ifRange = f"'{byBoard}'!{self.rc2a1(3, 4+s)}:{self.rc2a1(3+lastRows,4+s)}"
+                impRange = f"'{byBoard}'!{self.rc2a1(3, 13+s)}:{self.rc2a1(3+lastRows,13+s)}"
+                sumRange = f"'{byBoard}'!{self.rc2a1(3, 17+s)}:{self.rc2a1(3+lastRows,17+s)}"
                 sh.cell(row,4).value=f"=SUMIF({ifRange},\"=\"&{self.rc2a1(row, 1)},{sumRange})/{divident}"
                 sh.cell(row,5).value=f"=SUMIF({ifRange},\"=\"&{self.rc2a1(row, 1)},{impRange})"
                 sh.cell(row,4).number_format = "0.00%"
@@ -333,17 +349,174 @@ class Mitchell(PairGames):
                 row += 1
             row += 3
 
+    def outputName(self):
+        return self.nameObj['File'] + ('Sq' if self.pairs == 8 and self.square else '')
+
     # Output into filesystem
-    def save(self):
-        import os
-        here = os.path.dirname(os.path.abspath(__file__))
-        fn = f'{here}/../{self.nameObj['File']}'
-        if self.pairs == 8 and self.square:
-            fn += 'Sq'
+    def save(self, outDir=None):
+        fn = self.outputPath(outDir)
+        self.log.debug(f'Save files: {fn}')
+        print(f'Saved {self.saveWorkbook(fn)} and {self.savePDF(fn)}')
+
+
+# Sizes of the sections of a field of "pairs", as even as can be, in the fewest sections unless "count" is given.
+# A section is a Mitchell of 8 to 24 pairs, but not 11, 15, or 16 (see the command line).
+# Returns None if the field cannot be split so.
+def sectionSizes(pairs, count=None):
+    valid = [p for p in range(24, 7, -1) if p not in [11, 15, 16]]
+    # n sizes, largest first, from "window", none larger than "most", summing to "left"
+    def fill(left, n, window, most):
+        if n == 0:
+            return [] if left == 0 else None
+        for p in window:
+            if p > most or p + (n-1) * window[-1] > left or p * n < left:
+                continue
+            rest = fill(left - p, n - 1, window, p)
+            if rest is not None:
+                return [p] + rest
+        return None
+
+    for n in [count] if count else range(-(-pairs // valid[0]), pairs // valid[-1] + 1):
+        for spread in range(valid[0] - valid[-1] + 1):
+            for lo in reversed(valid):
+                window = [p for p in valid if lo <= p <= lo + spread]
+                sizes = fill(pairs, n, window, window[0])
+                if sizes is not None:
+                    return sizes
+    return None
+
+# Worker side of SectionedMitchell.build: the sheets and the PDF pages of one section
+def buildSection(log, pairs, decks, fake, names, section, seed, date):
+    DupBridge.setReproducible(seed, date)
+    doc = Mitchell(log, pairs, decks, False, fake, names, section)
+    doc.build()
+    return doc
+
+# A field too large for one Mitchell is played in sections A, B, C, ...
+# Each section is a Mitchell of its own, with its own tables, "boardData", and sheets ("A Roster",
+# "A By Board", "A By Round"), so it is built apart from the others, in "workers" processes.
+# The sections are then put in one workbook and one PDF.  The "Field" sheet ranks the NS and
+# the EW pairs across the field, by their percentages in their sections.
+class SectionedMitchell(PairGames):
+    def __init__(self, log, p, b, f, nameFile, count=None):
+        super().__init__(log)
+        self.pairs = p
+        self.decks = b
+        self.fake = f
+        self.sizes = sectionSizes(p, count)
+        if self.sizes is None:
+            raise ValueError('Cannot split into sections', p, count)
+        self.pdf = pdf.PDF()
+        self.wb = Workbook()
+        self.sections = []  # Mitchell of each section, once built
+
+        self.loadNames(nameFile, {'File': f'mitchell{self.pairs}x{self.decks}{"xF" if self.fake else ""}',
+                    'Tournament': f'Mitchell Movement for {self.pairs} Pairs in {len(self.sizes)} Sections, {self.decks} boards round',
+                    'Players': []})
+        self.pdf.HeaderFooterText(f'{self.notice} {self.nameObj['Date']}.',
+            self.nameObj['Tournament'])
+        self.meta()
+
+    def meta(self):
+        self.metaData = {'Title': 'Mitchell Tournament', 'Info': []}
+        self.metaData['Info'].append(('Pairs', self.pairs))
+        self.metaData['Info'].append(('Sections', ', '.join(f'{ascii_uppercase[i]} {n} pairs' for i, n in enumerate(self.sizes))))
+        self.metaData['Info'].append(('Boards per round', self.decks))
+
+    # Names file of a section: its share of the players, in order
+    def sectionNames(self, i):
+        letter = ascii_uppercase[i]
+        first = sum(self.sizes[:i])
+        players = []
+        if len(self.nameObj['Players']) == self.pairs:
+            players = self.nameObj['Players'][first:first + self.sizes[i]]
+        return {'File': f"{self.nameObj['File']}{letter}", 'Tournament': f"{self.nameObj['Tournament']}, Section {letter}",
+                'Date': self.nameObj['Date'], 'Players': players}
+
+    def main(self):
+        with self.stage('Build'):
+            self.build()
+        with self.stage('Save'):
+            self.save()
+
+    def build(self):
+        if self.volumePages > 0:
+            self.log.error('Sections are not written in volumes')
+            self.volumePages = 0
+        jobs = [(self.log, n, self.decks, self.fake, self.sectionNames(i), ascii_uppercase[i], self.seed, self.fixedDate)
+                for i, n in enumerate(self.sizes)]
+        if self.workers > 0:
+            pool = ProcessPoolExecutor(min(self.workers, len(jobs)))
+            pending = [pool.submit(buildSection, *j) for j in jobs]
+            with self.stage('Instructions'):
+                self.instructionsPDF()
+            with self.stage('Sections'):
+                self.sections = [j.result() for j in pending]
+            pool.shutdown()
+        else:
+            with self.stage('Instructions'):
+                self.instructionsPDF()
+            self.sections = []
+            for j in jobs:
+                with self.stage(f'Section {j[5]}'):
+                    self.sections.append(buildSection(*j))
+        self.log.debug('Field sheet')
+        with self.stage('Field sheet'):
+            self.fieldSheet()
+        with self.stage('Adopt sheets'):
+            for doc in self.sections:
+                adoptSheets(self.wb, doc.wb)
+        with self.stage('Static sheets'):
+            self.IMPTable() # static sheet, shared by the sections
+            self.ScoreTable()
+        self.sectionPDFs = {'Instructions': self.pdf}
+        self.sectionPDFs.update({doc.section: doc.pdf for doc in self.sections})
+        if not self.pdf.formsSupported:
+            self.log.error('This FPDF cannot assemble sections, a PDF for each')
+            self.split = True
+            return
+        book = self.pdf.sibling(False)
+        with self.stage('Assemble PDF'):
+            for p in self.sectionPDFs.values():
+                book.appendPages(p)
+        self.pdf = book
+
+    # Across the field: each pair with its results on the Roster of its section
+    def fieldSheet(self):
+        ws = self.wb.active
+        ws.title = 'Field'
+        row = self.sheetMeta(ws, self.metaData) + 2
+        for s in ['NS', 'EW']:
+            ws.cell(row, 1).value = f'{s} Pairs'
+            ws.cell(row, 1).font = self.HeaderFont
+            row = self.headerRow(ws, ['Section', 'Pair', 'Player', 'Player', 'MP', 'IMP', 'Rank'], row + 1)
+            first = row
+            last = first + sum(len(doc.rosterRows[s]) for doc in self.sections) - 1
+            for doc in self.sections:
+                roster = doc.sheetName('Roster')
+                for r, pName in doc.rosterRows[s]:
+                    ws.cell(row, 1).value = doc.section
+                    ws.cell(row, 2).value = pName
+                    for c in range(1, 3):
+                        ws.cell(row, c).font = self.HeaderFont
+                        ws.cell(row, c).alignment = self.centerAlign
+                    for c in range(3, 7):
+                        ws.cell(row, c).value = f"='{roster}'!{self.rc2a1(r, c-1)}"
+                    ws.cell(row, 7).value = f'=RANK({self.rc2a1(row, 5)},{self.rc2a1(first, 5)}:{self.rc2a1(last, 5)})'
+                    ws.cell(row, 5).number_format = "0.00%"
+                    ws.cell(row, 6).number_format = "#0.0"
+                    ws.cell(row, 7).alignment = self.centerAlign
+                    row += 1
+                for c in range(7):
+                    ws.cell(row-1, c+1).border = self.bottomLine
+            row += 2
+        ws.column_dimensions['C'].width = 30
+        ws.column_dimensions['D'].width = 30
+
+    def save(self, outDir=None):
+        fn = self.outputPath(outDir)
         self.log.debug(f'Save files: {fn}')
-        self.wb.save(f'{fn}.xlsx')
-        self.pdf.output(f'{fn}.pdf')
-        print(f'Saved {fn}.{{xlsx,pdf}}')
+        print(f'Saved {self.saveWorkbook(fn)} and {self.savePDF(fn)}')
 
 
 if __name__ == '__main__':
@@ -357,14 +530,32 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-d', '--debug', type=str, default='INFO', help='Debug level, INFO, DEBUG, ERROR')
     parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=4, help='Boards per round')
-    parser.add_argument('-p', '--pair', type=int, choices=range(8,25), default=8, help='Number of pairs')
+    parser.add_argument('-p', '--pair', type=int, choices=range(8,121), default=8, help='Number of pairs, in sections if more than 24')
     parser.add_argument('-f', '--fake', action='store_true', help='Fake scores to test the spreadsheet')
     parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
     parser.add_argument('-s', '--square', action='store_true', help='Use square movement for 4 tables')
+    parser.add_argument('--sections', type=int, help='Split the field in # sections')
+    parser.add_argument('-w', '--workers', type=int, default=0, help='Draw the PDF sections, or build the sections of a field, in # processes')
+    parser.add_argument('--split', action='store_true', help='A PDF file for each section')
+    parser.add_argument('--volume', type=int, default=0, help='PDF in volumes of at most # pages, written as drawn')
+    parser.add_argument('--seed', type=int, help='Random seed, for reproducible outputs')
+    parser.add_argument('--date', type=datetime.date.fromisoformat, help='Date on the documents, YYYY-MM-DD')
+    parser.add_argument('--profile', nargs='?', const='', help='Report the stages of the build, and save it as JSON if a file is given')
     args = parser.parse_args()
     for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
         if args.debug.upper() == l[0]:
             log.setLevel(l[1])
             break
-    mitchell = Mitchell(log, args.pair, args.boards, args.square, args.fake, args.names)
-    mitchell.main()
+    if args.seed is not None or args.date is not None:
+        DupBridge.setReproducible(args.seed, args.date or datetime.date.today())
+    if args.pair > 24 or args.sections:
+        mitchell = SectionedMitchell(log, args.pair, args.boards, args.fake, args.names, args.sections)
+    else:
+        mitchell = Mitchell(log, args.pair, args.boards, args.square, args.fake, args.names)
+    mitchell.workers = args.workers
+    mitchell.split = args.split
+    mitchell.volumePages = args.volume
+    if args.profile is None:
+        mitchell.main()
+    else:
+        mitchell.profiled(mitchell.main, args.profile)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# One place to create the document set of any supported movement
+#   howell: pre-generated arrangements in setup.json, 4 to 14 pairs
+#   mitchell: 8 to 24 pairs, relay table for even number of tables, in sections if more
+#   square: square Mitchell, 8 pairs only
+import jsonIO
+from howell import Howell
+from mitchell import Mitchell, SectionedMitchell
+
+Movements = ('howell', 'mitchell', 'square')
+
+# "names" is a names file or its loaded object, see PairGames.loadNames
+# Returns None if the movement cannot be made
+def newDocument(log, movement, pairs, decks, names=None, fake=False, jsonfile=None):
+    if movement == 'howell':
+        jIO = jsonIO.JsonIO(pairs, log)
+        tourney = jIO.load(jsonfile)
+        if not tourney:
+            return None
+        return Howell(log, fake, pairs, decks, tourney, names)
+    if movement == 'square' and pairs != 8:
+        log.error('Square Mitchell is only for 8 pairs')
+        return None
+    return Mitchell(log, pairs, decks, movement == 'square', fake, names)
+
+# The documents of a movement, in memory, to embed the generators.  Nothing is written to the disk.
+# "players": "Name + Name" of every pair, in pair order
+# "date": datetime.date printed on the documents, today by default
+# Returns (file name without extension, workbook bytes, PDF bytes), None if the movement cannot be made
+def generate(log, movement, pairs, decks, players=None, tournament=None, date=None, fake=False,
+             sections=None, workers=0, jsonfile=None):
+    names = {'Players': list(players or [])}
+    if tournament:
+        names['Tournament'] = tournament
+    if date:
+        names['Date'] = date.strftime("%b %d, %Y")
+    if movement == 'mitchell' and (pairs > 24 or sections):
+        doc = SectionedMitchell(log, pairs, decks, fake, names, sections)
+    else:
+        doc = newDocument(log, movement, pairs, decks, names, fake, jsonfile)
+    if doc is None:
+        return None
+    doc.workers = workers
+    doc.build()
+    return doc.outputName(), doc.workbookBytes(), doc.pdfBytes()
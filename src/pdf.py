@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+import copy
+import os
+import re
 from fpdf import FPDF
 # Generate PDF for a matching spreadsheet
 # PDFs are for machines, its generation is tedious...
+try:
+    # Form XObjects rely on FPDF internals.  Older FPDF just draws everything inline.
+    from fpdf.enums import PDFResourceType
+    from fpdf.syntax import PDFContentStream, PDFArray, Name
+except ImportError:
+    PDFResourceType = None
 
 class PDF(FPDF):
     margin = 0.25
@@ -18,8 +27,23 @@ class PDF(FPDF):
     smallPt = 8
     tinyPt = 6
 
-    def __init__(self):
-        # The contructor takes no arguemnts
+    # Layout caches, shared by all documents of a run
+    # String widths by (font, style, size, text), column widths by (font, style, size, margin, headers),
+    # and the merged header cells by headers.  Names are among the texts, so in a long-running process
+    # (server.py, results.py) each cache keeps CacheLimit entries at most, the oldest dropped first.
+    CacheLimit = 4096
+    widths = {}
+    columns = {}
+    mergePlans = {}
+
+    # Pages drawn by all documents of this process, for the profiler (see stages.py)
+    pagesAdded = 0
+
+    # Font selections and placed XObjects in a page content stream, renumbered by appendPages
+    PageOps = re.compile(rb'/F(\d+) ([-\d.]+) Tf|/I(\d+) Do')
+
+    def __init__(self, newPage=True):
+        # The contructor takes no arguemnts but whether to start with a page
         # Force choices to the super
         # Letter size paper is 8.5 by 11 in
         # Taking a quarter inch off each side as margin
@@ -29,10 +53,118 @@ class PDF(FPDF):
         self.sansSerifFont = 'Helvetica'
         self.serifFont = 'Times'
 
+        # Template mode, see template.py
+        # Texts carrying placeholders and their alignment
+        self.anchors = None
+
+        # Blank grids and decorations drawn once as form XObjects, then stamped
+        # key: (XObject index, x, y where it was first drawn)
+        self.forms = {}
+        self.formsSupported = PDFResourceType is not None and \
+            hasattr(getattr(self, '_resource_catalog', None), 'form_xobjects')
+
+        # Cells of the grid drawn with their borders, see grid
+        self.gridBorder = 0
+
+        # Volume mode, see startVolume
+        self.volume = None
+        self.volumeFiles = []
+
         # Always a default font
         self.set_font(self.sansSerifFont)
         # add the first page
-        self.add_page()
+        if newPage:
+            self.add_page()
+
+    # Volume mode: the pages are written out as they are done, every "pages" pages and at the start
+    # of every volume, so that only one volume is ever in memory.
+    # Files are "base".pdf, then "base"-2.pdf, ... if the volume is longer.
+    def startVolume(self, base, pages, date=None):
+        self.flushVolume()
+        self.volume = {'Base': base, 'Pages': pages, 'Date': date, 'Part': 1}
+
+    def endVolume(self):
+        self.flushVolume()
+        self.volume = None
+
+    # Write the pages so far, then start over as an empty document in the same drawing state
+    def flushVolume(self):
+        v = self.volume
+        if v is None or self.page == 0:
+            return
+        fn = f"{v['Base']}{'' if v['Part'] == 1 else '-' + str(v['Part'])}.pdf"
+        if v['Date'] is not None:
+            self.set_creation_date(v['Date'])
+        self.output(fn)
+        self.volumeFiles.append(fn)
+        v['Part'] += 1
+        family, style, size = self.font_family, self.font_style, self.font_size_pt
+        state = (self.line_width, self.draw_color, self.fill_color, self.text_color, self.dash_pattern)
+        FPDF.__init__(self, unit='in', format='letter')
+        self.set_margin(PDF.margin)
+        self.forms = {}
+        self.set_font(family, style, size)
+        self.line_width, self.draw_color, self.fill_color, self.text_color, self.dash_pattern = state
+
+    # Automatic page breaks (same=True) happen in the middle of drawing a cell, not the place to flush
+    def add_page(self, *args, **kwargs):
+        if self.volume is not None and not kwargs.get('same') and self.page >= self.volume['Pages']:
+            self.flushVolume()
+        super().add_page(*args, **kwargs)
+        PDF.pagesAdded += 1
+
+    # An empty document with the same header, footer, and template mode
+    def sibling(self, newPage=True):
+        other = PDF(newPage)
+        other.HeaderFooterText(self.headerText, self.footerText)
+        other.anchors = None if self.anchors is None else {}
+        return other
+
+    # Add the pages of a document drawn apart, in another process for example.
+    # Fonts and form XObjects are renumbered as this document's.
+    # Needs the same FPDF internals as the form XObjects.
+    def appendPages(self, other):
+        fontIdx = {}
+        for key, font in other.fonts.items():
+            if key not in self.fonts:
+                self.fonts[key] = copy.copy(font)
+                self.fonts[key].i = len(self.fonts)
+            fontIdx[font.i] = self.fonts[key].i
+        formIdx = {}
+        catalog = self._resource_catalog
+        forms = dict(other._resource_catalog.form_xobjects)
+        for key, (index, x, y) in other.forms.items():
+            if key in self.forms and self.forms[key][1:] == (x, y):
+                formIdx[index] = self.forms[key][0]
+                continue
+            formIdx[index] = catalog.next_xobject_index
+            catalog.next_xobject_index += 1
+            catalog.form_xobjects.append((formIdx[index], copy.copy(forms[index])))
+            self.forms.setdefault(key, (formIdx[index], x, y))
+
+        def renumber(m):
+            if m.group(1) is not None:
+                return b'/F%d %s Tf' % (fontIdx[int(m.group(1))], m.group(2))
+            return b'/I%d Do' % formIdx[int(m.group(3))]
+        resources = other._resource_catalog.resources_per_page
+        for n in sorted(other.pages.keys()):
+            page = copy.copy(other.pages[n])
+            page.contents = bytearray(PDF.PageOps.sub(renumber, bytes(page.contents)))
+            self.page += 1
+            page.set_index(self.page)
+            self.pages[self.page] = page
+            for (pn, kind), used in resources.items():
+                if pn != n:
+                    continue
+                for r in used:
+                    match kind:
+                        case PDFResourceType.FONT:
+                            r = fontIdx[r]
+                        case PDFResourceType.X_OBJECT:
+                            r = formIdx[r]
+                    catalog.add(kind, r, self.page)
+        if self.anchors is not None and other.anchors:
+            self.anchors.update(other.anchors)
 
     # convert "point" font size to inch
     def pt2in(self, p):
@@ -46,6 +178,16 @@ class PDF(FPDF):
         x = (self.w - linewidth) / 2
         return x
     
+    # In template mode, remember how each text with placeholders is aligned.
+    # Header and footer are centered on the page, by position not by the cell.
+    def cell(self, w=None, h=None, text='', *args, **kwargs):
+        if self.anchors is not None and '@@' in text:
+            if text in (self.headerText, self.footerText):
+                self.anchors[text] = 'C'
+            else:
+                self.anchors[text] = kwargs.get('align', 'L')
+        return super().cell(w, h, text, *args, **kwargs)
+
     def HeaderFooterText(self, h, f):
         self.headerText = h
         self.footerText = f
@@ -102,8 +244,9 @@ class PDF(FPDF):
 
     # part of the meta pagee 
     # Some text for the TD/Organizer
+    # "fname" is next to this file unless a full path, whatever the current directory
     def instructions(self, log, fname):
-        with open(fname, "r") as f:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), fname), "r") as f:
             txt = f.read().splitlines()
         self.headerFooter()
         self.set_font(self.serifFont, style='B', size=self.rosterPt) 
@@ -132,15 +275,70 @@ class PDF(FPDF):
             lineNo += 1
             y = self.get_y()
 
+    # Draw with "draw(x, y)" the first time a key is seen, and keep the drawing as a form XObject.
+    # Later, and the first time too, only the XObject is placed, moved to (x, y).
+    # Drawings must be lines and shapes only (no text) and leave the graphics state as they found it.
+    def stamp(self, key, x, y, draw):
+        if not self.formsSupported:
+            draw(x, y)
+            return
+        if key not in self.forms:
+            contents = self.pages[self.page].contents
+            start = len(contents)
+            draw(x, y)
+            ops = bytes(contents[start:])
+            del contents[start:]
+            form = PDFContentStream(contents=ops, compress=self.compress)
+            form.type = Name('XObject')
+            form.subtype = Name('Form')
+            form.b_box = PDFArray([0, 0, round(self.w_pt, 2), round(self.h_pt, 2)])
+            catalog = self._resource_catalog
+            index = catalog.next_xobject_index
+            catalog.next_xobject_index += 1
+            catalog.form_xobjects.append((index, form))
+            self.forms[key] = (index, x, y)
+        index, x0, y0 = self.forms[key]
+        self._out(f'q 1 0 0 1 {(x - x0) * self.k:.2f} {(y0 - y) * self.k:.2f} cm /I{index} Do Q')
+        self._resource_catalog.add(PDFResourceType.X_OBJECT, index, self.page)
+
+    # Rows of blank bordered cells, the top left at (x, y)
+    # A grid running over the bottom of the page is left to gridTexts, drawn cell by cell
+    # with the automatic page breaks.
+    def grid(self, x, y, cols, h, rows):
+        self.gridBorder = 1 if y + rows * h > self.page_break_trigger else 0
+        if self.gridBorder:
+            return
+        def draw(x, y):
+            for r in range(rows):
+                self.set_xy(x, y + r * h)
+                for w in cols:
+                    self.cell(w, h, border=1)
+        self.stamp(('grid', tuple(cols), h, rows), x, y, draw)
+
+    # Texts of a row in a grid, centered in their columns.  Empty ones are skipped.
+    def gridTexts(self, x, y, cols, h, texts):
+        if self.gridBorder:
+            self.set_xy(x, y)
+            for w, t in zip(cols, texts):
+                self.cell(w, h, text=t, align='C', border=1)
+            return
+        for w, t in zip(cols, texts):
+            if t != '':
+                self.set_xy(x, y)
+                self.cell(w, h, text=t, align='C')
+            x += w
+
     def compass(self):
         # fancy compass canvas
         self.set_font(self.serifFont, size=PDF.bigPt)
         h = self.lineHeight(self.font_size_pt)
         bottomEdge = h * 4
         starCenter = (self.w/2, self.h - bottomEdge - PDF.starRadius - h/2)
-        self.star(starCenter[0], starCenter[1], 0.2, PDF.starRadius, 4, 0, 'D')
-        self.line(starCenter[0]-1, starCenter[1], starCenter[0]+1, starCenter[1])
-        self.line(starCenter[0], starCenter[1]-1, starCenter[0], starCenter[1]+1)
+        def draw(x, y):
+            self.star(x, y, 0.2, PDF.starRadius, 4, 0, 'D')
+            self.line(x-1, y, x+1, y)
+            self.line(x, y-1, x, y+1)
+        self.stamp('compass', starCenter[0], starCenter[1], draw)
         self.set_xy(starCenter[0]-self.get_string_width('N')/1.5, starCenter[1]-PDF.starRadius-h)
         self.cell(h,text='N')
 
@@ -221,14 +419,50 @@ class PDF(FPDF):
         with self.rotation(angle=rot):
             self.cell(text=txt)
 
+    # Headers and fonts repeat on every slip, measure each string only once
+    def get_string_width(self, s, normalized=False, markdown=False):
+        key = (self.font_family, self.font_style, self.font_size_pt, s, markdown)
+        w = PDF.widths.get(key)
+        if w is None:
+            w = PDF.remember(PDF.widths, key, super().get_string_width(s, normalized, markdown))
+        return w
+
+    @staticmethod
+    def remember(cache, key, value):
+        if len(cache) >= PDF.CacheLimit:
+            del cache[next(iter(cache))]
+        cache[key] = value
+        return value
+
     # compute the width of each column
     # use whatever font active
     def setHeaders(self, leftMargin, hdrs, cols):
-        for h in hdrs:
-            cols.append(self.get_string_width(h) + 0.2)
-        allW = sum(cols)
-        if 'Contract' in hdrs:
-            cols[hdrs.index('Contract')] += self.epw - allW - leftMargin
+        key = (self.font_family, self.font_style, self.font_size_pt, leftMargin, self.epw, tuple(hdrs))
+        if key not in PDF.columns:
+            widths = [self.get_string_width(h) + 0.2 for h in hdrs]
+            allW = sum(widths)
+            if 'Contract' in hdrs:
+                widths[hdrs.index('Contract')] += self.epw - allW - leftMargin
+            PDF.remember(PDF.columns, key, widths)
+        cols.extend(PDF.columns[key])
+
+    # "Made" and "Down" share a "Result" header above them.
+    # Same for the NS/EW scores that follow a single "Made".
+    def mergePlan(self, hdrs):
+        key = tuple(hdrs)
+        if key not in PDF.mergePlans:
+            mergeCols = []
+            mergeTxt = []
+            madeCount = hdrs.count('Made')
+            while madeCount > 0:
+                mergeCols.append(hdrs.index('Made', mergeCols[-1]+1 if len(mergeCols) > 0 else 0))
+                mergeTxt.append('Result')
+                madeCount -= 1
+            if len(mergeCols) == 1 and 'NS' in hdrs and (hdrs.index('NS',mergeCols[0]) - mergeCols[0]) == 2:
+                mergeCols.append(mergeCols[-1]+2)
+                mergeTxt.append('Score')
+            PDF.remember(PDF.mergePlans, key, (mergeCols, mergeTxt))
+        return PDF.mergePlans[key]
 
     def headerRow(self, leftMargin, y, cols, hdrs, leftTitle=None, rightTitle=None):
         if leftTitle != None:
@@ -244,16 +478,7 @@ class PDF(FPDF):
         self.set_xy(leftMargin, y)
         self.set_font(self.sansSerifFont, style='B')
         h = self.lineHeight(self.font_size_pt)
-        mergeCols = []
-        mergeTxt = []
-        madeCount = hdrs.count('Made')
-        while madeCount > 0:
-            mergeCols.append(hdrs.index('Made', mergeCols[-1]+1 if len(mergeCols) > 0 else 0))
-            mergeTxt.append('Result')
-            madeCount -= 1
-        if len(mergeCols) == 1 and 'NS' in hdrs and (hdrs.index('NS',mergeCols[0]) - mergeCols[0]) == 2:
-            mergeCols.append(mergeCols[-1]+2)
-            mergeTxt.append('Score')
+        mergeCols, mergeTxt = self.mergePlan(hdrs)
         merged = False
         mergeIdx = 0
         for i in range(len(hdrs)):
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# Results entry from the tables, a service on the local network
+# Table devices (phones, tablets) post the result of each board as it is played, instead of pickup
+# slips retyped into "By Round".  A result goes to a slot of the movement, (round, table, board) of
+# roundData, and is checked against it: the NS and EW pairs of the table, and a board played there.
+# It is scored as the spreadsheet scores it, the matchpoints of its board computed again, and the
+# standings of the pairs updated by the difference: the work of a result is that of one board.
+#
+#   GET  /movement  the slots: round, table, NS, EW, boards and their vulnerability
+#   POST /result    JSON {"round": 1, "table": 2, "board": 5, "ns": 3, "ew": 6,
+#                         "contract": "4S" | "3NTX" | "Pass", "by": "N", "made": 4 | "down": 1}
+#                   or "score": the NS score (negative if EW scored) instead of contract to down
+#   GET  /results   every result entered
+#   GET  /standings matchpoints and percentage of every pair
+#   GET  /events    Server-Sent Events: "result" of every result entered, "standings" at most
+#                   every --interval seconds, however many results arrive in between
+#   GET /metrics, /health
+#
+# Round, table, board, and pairs are numbered as on the slips, from 1.  A result entered again
+# for the same slot replaces the earlier one, the director's correction.
+# A result is answered once it is in memory and in the journal (--journal), read back when the
+# service starts again.  Subscribers that do not keep up are dropped, they do not hold the others.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from maininit import setlog
+from scoring import matchpoints
+from server import readRequest, responseHead, latencies
+
+Seats = 'NESW'
+Contract = re.compile(r'^([1-7])(NT|N|S|H|D|C)(X{0,2})$')
+Trumps = {'S': 'H/S', 'H': 'H/S', 'D': 'D/C', 'C': 'D/C', 'N': 'NT', 'NT': 'NT'}
+QueueSize = 256     # events waiting for a subscriber before it is dropped
+
+class ResultsService:
+    # "doc" a document of the movement (see movements.newDocument), for its roundData and pairs
+    def __init__(self, log, doc, journal=None, interval=0.5):
+        self.log = log
+        self.doc = doc
+        self.interval = interval
+        self.slots = {}     # (round, table, board): (NS, EW), zero-based, internal pair numbers
+        for r, tables in doc.roundData.items():
+            for t, tbl in tables.items():
+                if doc.ifSitout(t, tbl['NS'], tbl['EW']):
+                    continue
+                for b in tbl['Board']:
+                    self.slots[(r, t, b)] = (tbl['NS'], tbl['EW'])
+        self.results = {}   # slot: result as posted, with its NS score
+        self.boards = {}    # board: {slot: NS score}
+        self.earned = {}    # board: {pair: (mp, top)}, what the board adds to the standings
+        self.totals = {}    # pair: [mp, top, boards]
+        self.subscribers = set()
+        self.changed = asyncio.Event()
+        self.started = time.monotonic()
+        self.counts = {'Requests': 0, 'Results': 0, 'Replaced': 0, 'Rejected': 0, 'Events': 0, 'Dropped': 0}
+        self.latency = {'result': deque(maxlen=1000)}
+        self.journal = None
+        if journal:
+            self.replay(journal)
+            self.journal = open(journal, 'a')
+
+    # The results of a journal, as if posted again
+    def replay(self, journal):
+        if os.path.exists(journal):
+            with open(journal) as f:
+                for line in f:
+                    if line.strip():
+                        self.enter(json.loads(line))
+            self.log.info(f'{len(self.results)} results read back from {journal}')
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    # A pair as on the slips: "3", "NS 3" for a Mitchell
+    def pairName(self, n):
+        side = self.doc.pairSide(n)
+        return f'{side} {self.doc.section}{self.doc.pairN(n)}' if side else f'{self.doc.pairN(n)}'
+
+    def movement(self):
+        return [{'Round': r + 1, 'Table': t + 1, 'Board': b + 1, 'NS': self.doc.pairN(ns), 'EW': self.doc.pairN(ew),
+                 'Vul': self.doc.vulLookup(b)} for (r, t, b), (ns, ew) in sorted(self.slots.items())]
+
+    # A posted result to (slot, NS score), or ValueError
+    def check(self, req):
+        if type(req) is not dict:
+            raise ValueError('Body is not a JSON object')
+        for k in ['round', 'table', 'board', 'ns', 'ew']:
+            if type(req.get(k)) is not int:
+                raise ValueError(f'{k} must be a number')
+        slot = (req['round'] - 1, req['table'] - 1, req['board'] - 1)
+        if slot not in self.slots:
+            raise ValueError(f'Board {req["board"]} is not played at table {req["table"]} in round {req["round"]}')
+        ns, ew = self.slots[slot]
+        if (req['ns'], req['ew']) != (self.doc.pairN(ns), self.doc.pairN(ew)):
+            raise ValueError(f'Pairs {self.doc.pairN(ns)} and {self.doc.pairN(ew)} play there, '
+                             f'not {req["ns"]} and {req["ew"]}')
+        if 'score' in req:
+            if type(req['score']) is not int or req['score'] % 10:
+                raise ValueError('score must be a number of points')
+            return slot, req['score']
+        contract = str(req.get('contract', '')).upper().replace(' ', '')
+        if contract in ('PASS', 'P'):
+            return slot, 0
+        m = Contract.match(contract)
+        if m is None:
+            raise ValueError('contract must be as "4S", "3NTX", or "Pass"')
+        level, dbl = int(m.group(1)), len(m.group(3))
+        by = str(req.get('by', '')).upper()
+        if by not in Seats or len(by) != 1:
+            raise ValueError('by must be N, E, S, or W')
+        declarerNS = by in 'NS'
+        vul = self.doc.vulLookup(slot[2]) in ('Both', 'NS' if declarerNS else 'EW')
+        made, down = req.get('made'), req.get('down')
+        if type(made) is int and level <= made <= 7:
+            score = self.doc.score(level, Trumps[m.group(2)], made - level, vul, dbl)
+        elif type(down) is int and 1 <= down <= level + 6:
+            score = -self.doc.penalty(down, vul, dbl)
+        else:
+            raise ValueError(f'made must be {level} to 7, or down 1 to {level + 6}')
+        return slot, score if declarerNS else -score
+
+    # Record a result, replacing the earlier one of its slot, and update the standings of its board
+    # Returns the result as kept, or ValueError
+    def enter(self, req):
+        slot, score = self.check(req)
+        replaced = slot in self.results
+        self.results[slot] = dict(req, nsScore=score)
+        board = slot[2]
+        scores = self.boards.setdefault(board, {})
+        scores[slot] = score
+        mps, top = matchpoints(list(scores.values()))
+        earned = {}
+        for s, mp in zip(scores, mps):
+            ns, ew = self.slots[s]
+            earned[ns] = (mp, top)
+            earned[ew] = (top - mp, top)
+        for pair, (mp, top) in self.earned.get(board, {}).items():
+            t = self.totals[pair]
+            t[0] -= mp
+            t[1] -= top
+            t[2] -= 1
+        for pair, (mp, top) in earned.items():
+            t = self.totals.setdefault(pair, [0.0, 0, 0])
+            t[0] += mp
+            t[1] += top
+            t[2] += 1
+        self.earned[board] = earned
+        self.counts['Replaced' if replaced else 'Results'] += 1
+        self.changed.set()
+        return self.results[slot]
+
+    def standings(self):
+        rows = [{'Pair': self.pairName(p), 'Name': self.doc.pairID(p), 'MP': mp, 'Top': top, 'Boards': boards,
+                 'Pct': round(100 * mp / top, 2) if top else None} for p, (mp, top, boards) in self.totals.items()]
+        rows.sort(key=lambda r: (r['Pair'].split(' ')[0] if ' ' in r['Pair'] else '', -(r['Pct'] or 0)))
+        return rows
+
+    def allResults(self):
+        return [dict(r) for _, r in sorted(self.results.items())]
+
+    # Queue an event to every subscriber, dropping those too far behind
+    def publish(self, event, data):
+        msg = f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+        for q in list(self.subscribers):
+            if q.qsize() >= QueueSize:
+                self.subscribers.discard(q)
+                q.put_nowait(None)  # room was kept for it: tells the stream to end
+                self.counts['Dropped'] += 1
+            else:
+                q.put_nowait(msg)
+                self.counts['Events'] += 1
+
+    # The standings, once per interval at most, after a change
+    async def publisher(self):
+        while True:
+            await self.changed.wait()
+            await asyncio.sleep(self.interval)
+            self.changed.clear()
+            self.publish('standings', self.standings())
+
+    def metrics(self):
+        return {'Uptime s': time.monotonic() - self.started, **self.counts, 'Slots': len(self.slots),
+                'Entered': len(self.results), 'Subscribers': len(self.subscribers),
+                'Latency': {k: latencies(v) for k, v in self.latency.items()}}
+
+    async def handle(self, reader, writer):
+        start = time.perf_counter()
+        request = None
+        try:
+            request, failed = await readRequest(reader)
+            if failed:
+                status, ctype, body = failed[0], 'application/json', json.dumps({'Error': failed[1]}).encode()
+            else:
+                self.counts['Requests'] += 1
+                method, path, body = request
+                if path == '/events' and method == 'GET':
+                    return await self.stream(writer)
+                status, ctype, body = self.respond(method, path, body)
+        except Exception as e:
+            self.log.error(f'Request failed: {e!r}')
+            status, ctype, body = 500, 'application/json', json.dumps({'Error': repr(e)}).encode()
+        try:
+            writer.write(responseHead(status, ctype, len(body), {}) + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        if request and request[1] == '/result' and status == 200:
+            self.latency['result'].append(time.perf_counter() - start)
+
+    # Returns (status, content type, body)
+    def respond(self, method, path, body):
+        def reply(status, obj):
+            return status, 'application/json', json.dumps(obj, indent=1).encode()
+
+        if path == '/health':
+            return reply(200, {'Status': 'OK'})
+        if path == '/metrics':
+            return reply(200, self.metrics())
+        if path == '/movement':
+            return reply(200, self.movement())
+        if path == '/results':
+            return reply(200, self.allResults())
+        if path == '/standings':
+            return reply(200, self.standings())
+        if path != '/result':
+            return reply(404, {'Error': f'No {path}'})
+        if method != 'POST':
+            return reply(405, {'Error': 'POST the result'})
+        try:
+            req = json.loads(body or b'{}')
+            result = self.enter(req)
+        except ValueError as e:
+            self.counts['Rejected'] += 1
+            return reply(422, {'Error': ' '.join(str(a) for a in e.args)})
+        if self.journal is not None:
+            self.journal.write(json.dumps(req) + '\n')
+            self.journal.flush()
+        self.publish('result', result)
+        return reply(200, result)
+
+    # Server-Sent Events, the standings first
+    async def stream(self, writer):
+        q = asyncio.Queue(QueueSize + 1)
+        self.subscribers.add(q)
+        try:
+            writer.write(responseHead(200, 'text/event-stream', None, {'Cache-Control': 'no-cache'}))
+            writer.write(f'event: standings\ndata: {json.dumps(self.standings())}\n\n'.encode())
+            await writer.drain()
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), 15)
+                except asyncio.TimeoutError:
+                    msg = b': keep-alive\n\n'
+                if msg is None:
+                    break
+                writer.write(msg)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(q)
+            writer.close()
+
+
+async def serve(log, doc, host, port, journal, interval):
+    service = ResultsService(log, doc, journal, interval)
+    server = await asyncio.start_server(service.handle, host, port)
+    publisher = asyncio.create_task(service.publisher())
+    print(f'Taking results of {len(service.slots)} boards on http://{host}:{port}/')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        publisher.cancel()
+        service.close()
+
+
+if __name__ == '__main__':
+    from movements import newDocument, Movements
+    log = setlog('results', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--movement', choices=Movements, default='howell')
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
+    parser.add_argument('-j', '--journal', type=str, default='results.jsonl', help='Results as entered, read back on start')
+    parser.add_argument('--interval', type=float, default=0.5, help='Seconds between standings pushed')
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='All the interfaces: the tables are on the LAN')
+    parser.add_argument('--port', type=int, default=8045)
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+    if args.movement == 'mitchell' and args.pair > 24:
+        parser.error('More than 24 pairs play in sections: one service for each section')
+
+    doc = newDocument(log, args.movement, args.pair, args.boards, args.names or None)
+    if doc is None:
+        raise SystemExit(1)
+    try:
+        asyncio.run(serve(log, doc, args.host, args.port, args.journal, args.interval))
+    except KeyboardInterrupt:
+        pass
@@ -12,15 +12,31 @@
 # For Bridge's Howell movement, we are interested in n in [5,7]
 # Edwin Howell "invented" the Howell movements for the game of Whist, a predecessor or modern bridge.
 # if n == 5 (6 pairs), we hack by designing Room Sq for n == 4 and insert a "shared board" for the last round
+#
+# How soon the boards are found depends on the initial seating (HowellSeats.GoodTables) and on the
+# order the board sequences are tried in.  "--portfolio" tries every seating in every order at
+# once, in worker processes: the first arrangement found wins and the other searches stop.
+#
+# -i #: the seating to use, index into HowellSeats.GoodTables
+# --order: ascending, descending, or shuffled board sequences
+# --portfolio: all the seatings and orders at once, "-w #" in # processes (all the cores)
 
 import argparse
 import logging
+import multiprocessing
 import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from maininit import setlog
 import tables as Moves
 import jsonIO
+from fairness import Fairness
 import itertools
 
+# Orders the board sequences of the tables after the first are tried in
+Orders = ('ascending', 'descending', 'shuffled')
+
 class RoomSq:
     def __init__(self, n, tableIdx=0, log=None):
         self.log = setlog('roomsq', log, False)
@@ -34,7 +50,7 @@ class RoomSq:
 
     # sequence is how the "relay tables" are setup
     def assignTables(self, npairs, sequence):
-        tblIter = Moves.HowellSeats(npairs, log, self.tableIdx)    # iterator for table seating
+        tblIter = Moves.HowellSeats(npairs, self.log, self.tableIdx)    # iterator for table seating
         n = len(self.boardSet)
         for round in tblIter:   # get the sitting for this round
             # seat each table
@@ -52,36 +68,55 @@ class RoomSq:
             self.jIO.addRound(tbls) # capture into JSON structure
         return
 
-    def roomsq(self, fname):
+    # permutation to pick boards for the round
+    # For each round, pick a board for each table.
+    # First table is always the same arrangment, so skip it
+    def candidates(self, order):
+        boards = self.boardSet[1:]
+        if order == 'descending':
+            boards = boards[::-1]
+        elif order == 'shuffled':
+            boards = random.Random(self.tableIdx).sample(boards, len(boards))
+        return itertools.permutations(boards, self.nTables - 1)
+
+    # permute through all relay-table scenario till finding one
+    # Returns the board sequence found (None if none) and how many were tried.  Gives up when
+    # "stop" (a multiprocessing.Event) is set, "report" prints why each sequence is not valid.
+    def search(self, order='ascending', stop=None, report=True):
+        tries = 0
+        for seq in self.candidates(order):
+            if stop is not None and tries % 64 == 0 and stop.is_set():
+                break
+            self.log.info(f'{"-"*5}: {tries} {seq}')
+            tries += 1
+            self.assignTables(self.npairs, seq)
+            if self.jIO.validateBoards(report):
+                return seq, tries
+            self.jIO.resetTournament()
+        return None, tries
+
+    def roomsq(self, fname, order='ascending'):
         # 5x5 Room Square has no known solution
         if self.npairs == 6:
             return self.roomsq5by5(fname)
+        seq, tries = self.search(order)
+        if seq is None:
+            return False
+        self.found(seq)
+        self.save2file(fname)
+        return True
 
-        # permutation to pick boards for the round
-        # For each round, pick a board for each table.
-        # First table is always the same arrangment, so skip it
-        boards = self.boardSet[1:]
-        boardForTables = itertools.permutations(boards, self.nTables - 1)
-        valid = False
-        # permute through all relay-table scenario till finding one
-        for idx, seq in enumerate(boardForTables):
-            self.log.info(f'{"-"*5}: {idx} {seq}')
-            self.assignTables(self.npairs, seq)
-            valid = self.jIO.validateBoards()
-            if valid:
-                self.log.info(f'Found Room Sq Solution')
-                self.jIO.boardMovement(sorted(seq))
-                self.jIO.sortByBoard()
-                self.jIO.showArrangement()
-                self.save2file(fname)
-                break
-            self.jIO.resetTournament()
-        return valid
+    def found(self, seq):
+        self.log.info(f'Found Room Sq Solution')
+        self.jIO.boardMovement(sorted(seq))
+        self.jIO.sortByBoard()
+        self.jIO.showArrangement()
+        self.log.info(f'Fairness: {Fairness.fromArrangement(self.jIO.tournament["Arrangement"]).report()}')
 
     def save2file(self, fname):
         mode = 'a' if os.path.exists(fname) else 'w'
         with open(fname, mode) as f:
-            rm.jIO.dump2File(f)
+            self.jIO.dump2File(f)
 
     def roomsq5by5(self, fname):
         self.jIO.tournament = {'Rounds': 5, 'Tables': 3, 'BoardMovement': None, 'Arrangement':
@@ -92,6 +127,51 @@ class RoomSq:
             [{'NS': 6, 'EW': 5, 'Board': 4}, {'NS': 2, 'EW': 3, 'Board': 4}, {'NS': 4, 'EW': 1, 'Board': 4}]]}
         self.jIO.showArrangement()
         self.save2file(fname)
+        return True
+
+# Set in each worker of the portfolio, to stop its search once another one has found the boards
+Stop = None
+
+def initWorker(stop):
+    global Stop
+    Stop = stop
+
+# One search of the portfolio: seating "idx", sequences in "order"
+# Returns (idx, order, board sequence or None, tries, seconds, arrangement)
+def portfolioSearch(npairs, idx, order):
+    log = setlog('roomsq', None, False)
+    log.setLevel(logging.ERROR)
+    rs = RoomSq(npairs, idx, log)
+    start = time.perf_counter()
+    seq, tries = rs.search(order, Stop, False)
+    return idx, order, seq, tries, time.perf_counter() - start, rs.jIO.tournament if seq else None
+
+# Every seating in every order at once, in "workers" processes (all the cores if None)
+# Returns the RoomSq of the first arrangement found, its "winner" is (seating, order, tries, seconds)
+# None if no search found one
+def portfolio(npairs, log, workers=None):
+    tables = (npairs + npairs % 2) // 2
+    if tables not in Moves.HowellSeats.GoodTables:
+        log.error(f'No Howell seating for {npairs} pairs')
+        return None
+    configs = [(i, o) for i in range(len(Moves.HowellSeats.GoodTables[tables])) for o in Orders]
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=initWorker, initargs=(stop,)) as pool:
+        pending = [pool.submit(portfolioSearch, npairs, i, o) for i, o in configs]
+        for f in as_completed(pending):
+            idx, order, seq, tries, secs, arrangement = f.result()
+            log.info(f'Seating #{idx} {order}: {"found" if seq else "none"} in {tries} tries, {secs:.2f}s')
+            if seq is None:
+                continue
+            stop.set()
+            for p in pending:
+                p.cancel()
+            rs = RoomSq(npairs, idx, log)
+            rs.jIO.tournament = arrangement
+            rs.winner = (idx, order, tries, secs)
+            rs.found(seq)
+            return rs
+    return None
 
 
 if __name__ == '__main__':
@@ -101,10 +181,24 @@ if __name__ == '__main__':
     parser.add_argument('-p', '--pair', type=int, default=8)
     parser.add_argument('-i', '--index', type=int, default=0)
     parser.add_argument('-f', '--file', type=str, default='roomsq.txt')
+    parser.add_argument('--order', choices=Orders, default='ascending', help='Order the board sequences are tried in')
+    parser.add_argument('--portfolio', action='store_true', help='Try all the seatings and orders at once')
+    parser.add_argument('-w', '--workers', type=int, help='Processes of the portfolio, all the cores by default')
     parser.add_argument('-d', '--debug', type=str, default='INFO')
     args = parser.parse_args()
     if args.debug.upper() in logLevels:
         log.setLevel(logLevels[args.debug.upper()])
 
-    rm = RoomSq(args.pair, args.index, log)
-    rm.roomsq(args.file)
\ No newline at end of file
+    start = time.perf_counter()
+    if args.portfolio and args.pair != 6:
+        rm = portfolio(args.pair, log, args.workers)
+        if rm is None:
+            print(f'No arrangement for {args.pair} pairs')
+        else:
+            rm.save2file(args.file)
+            idx, order, tries, secs = rm.winner
+            print(f'Seating #{idx}, {order} order: found in {tries} tries, {secs:.2f}s '
+                  f'({time.perf_counter() - start:.2f}s in all)')
+    else:
+        rm = RoomSq(args.pair, args.index, log)
+        rm.roomsq(args.file, args.order)
\ No newline at end of file
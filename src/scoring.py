@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Matchpoints and IMPs of the results of a board, as the spreadsheet computes them
+# A result is the NS net score (NS score, or minus the EW score), or None for an average.
+# Each result is compared with every other result of the board:
+#   MP: 1 for a better score, 0.5 for the same, 0 for worse; an average is 0.5 both ways
+#   IMP: the IMPs of the difference, averaged over the comparisons; an average is 0 both ways
+# EW gets the top minus the NS matchpoints, and minus the NS IMPs.
+# The IMPs of a match (Swiss teams and pairs, see swiss.py) make victory points.
+
+# IMP scale: a difference from IMPRanges[i] to IMPRanges[i+1] - 10 is worth i IMPs
+IMPRanges = [0, 20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600, \
+            750, 900, 1100, 1300, 1500, 1750, 2000, 2250, 2500, 3000, 3500, 4000, 10010]
+
+def imps(diff):
+    a = abs(diff)
+    for i in range(len(IMPRanges) - 1):
+        if a < IMPRanges[i+1]:
+            return i if diff >= 0 else -i
+    return len(IMPRanges) - 2 if diff >= 0 else 2 - len(IMPRanges)
+
+# NS matchpoints of each result, and the top (most matchpoints a result can get)
+def matchpoints(scores):
+    top = len(scores) - 1
+    mps = []
+    for i, s in enumerate(scores):
+        mp = 0.0
+        for j, o in enumerate(scores):
+            if i == j:
+                continue
+            if s is None or o is None or s == o:
+                mp += 0.5
+            elif s > o:
+                mp += 1.0
+        mps.append(mp)
+    return mps, top
+
+# NS IMPs of each result, averaged over the other results
+def crossImps(scores):
+    n = len(scores) - 1
+    out = []
+    for i, s in enumerate(scores):
+        total = 0
+        for j, o in enumerate(scores):
+            if i != j and s is not None and o is not None:
+                total += imps(s - o)
+        out.append(total / n if n > 0 else 0.0)
+    return out
+
+# Victory points of a match on the WBF 20-point continuous scale, of the IMP margin of the home side
+# over "boards" boards: the winner gets 10 + 10 (1 - t^(3 m / B)) / (1 - t^3), t = (sqrt(5) - 1) / 2,
+# B = 15 sqrt(boards), and 20 from a margin of B on.  Returns (home, away), 2 decimals, 20 together.
+def victoryPoints(margin, boards):
+    tau = (5 ** 0.5 - 1) / 2
+    blitz = 15 * boards ** 0.5
+    win = round(10 + 10 * (1 - tau ** (3 * min(abs(margin), blitz) / blitz)) / (1 - tau ** 3), 2)
+    return (win, round(20 - win, 2)) if margin >= 0 else (round(20 - win, 2), win)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# Document service for the club server, local only
+# Directors ask for the documents of a movement over HTTP instead of running the generators.
+# The documents are rendered by a pool of worker processes, started (and their imports done)
+# with the service, so a request only costs the generation.  Finished documents are kept in
+# an LRU cache keyed by everything they depend on; a repeated request is answered from it.
+# Identical requests arriving together share one rendering.
+#
+#   POST /generate  JSON {"movement": "howell", "pairs": 8, "boards": 3, "players": ["A + B", ...],
+#                         "tournament": "...", "date": "YYYY-MM-DD", "seed": 0, "fake": false,
+#                         "sections": null, "format": "zip" | "pdf" | "xlsx"}
+#   GET /metrics    request latencies, cache hits and misses, cache size
+#   GET /health
+#
+# Only the standard library: asyncio streams and a minimal HTTP/1.1, one request per connection.
+import argparse
+import asyncio
+import datetime
+import importlib
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from maininit import setlog
+
+# Pairs of each movement: a Mitchell of more than 24 pairs is in sections, see mitchell.SectionedMitchell
+Pairs = {'howell': range(4, 15), 'mitchell': [p for p in range(8, 121) if p not in (11, 15, 16)], 'square': [8]}
+Formats = {'zip': 'application/zip', 'pdf': 'application/pdf',
+           'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+Reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+MaxBody = 2**20
+
+# Worker side
+# The imports of openpyxl and fpdf are the slow part of a cold start, done once per worker
+def warmUp():
+    importlib.import_module('movements')
+
+def render(spec):
+    import movements
+    from docset import DupBridge
+    DupBridge.setReproducible(spec['seed'], datetime.date.fromisoformat(spec['date']))
+    return movements.generate(logging.getLogger('server'), spec['movement'], spec['pairs'], spec['boards'],
+                              spec['players'], spec['tournament'], None, spec['fake'], spec['sections'])
+
+# A request to its full set of inputs, with the defaults filled in, or ValueError
+def parseSpec(body):
+    try:
+        req = json.loads(body or b'{}')
+    except ValueError:
+        raise ValueError('Body is not JSON')
+    if type(req) is not dict:
+        raise ValueError('Body is not a JSON object')
+    spec = {'movement': req.get('movement', 'howell'), 'pairs': req.get('pairs', 8), 'boards': req.get('boards', 3),
+            'players': req.get('players') or [], 'tournament': req.get('tournament'),
+            'date': req.get('date') or datetime.date.today().isoformat(), 'seed': req.get('seed'),
+            'fake': bool(req.get('fake', False)), 'sections': req.get('sections')}
+    if spec['movement'] not in Pairs:
+        raise ValueError('Unknown movement', spec['movement'])
+    if type(spec['pairs']) is not int or spec['pairs'] not in Pairs[spec['movement']]:
+        raise ValueError(f"No {spec['movement']} of {spec['pairs']} pairs")
+    if type(spec['boards']) is not int or not 1 <= spec['boards'] <= 6:
+        raise ValueError('boards must be 1 to 6')
+    if spec['sections'] is not None and (type(spec['sections']) is not int or spec['sections'] < 1):
+        raise ValueError('sections must be a number')
+    if spec['seed'] is not None and type(spec['seed']) is not int:
+        raise ValueError('seed must be a number')
+    if type(spec['players']) is not list or not all(type(p) is str for p in spec['players']):
+        raise ValueError('players must be a list of names')
+    if spec['tournament'] is not None and type(spec['tournament']) is not str:
+        raise ValueError('tournament must be a string')
+    if type(spec['date']) is not str:
+        raise ValueError('date must be YYYY-MM-DD')
+    try:
+        datetime.date.fromisoformat(spec['date'])
+    except ValueError:
+        raise ValueError('date must be YYYY-MM-DD')
+    fmt = req.get('format', 'zip')
+    if fmt not in Formats:
+        raise ValueError('Unknown format', fmt)
+    return spec, fmt
+
+# HTTP, shared with results.py
+# The method, path, and body of a request, and None; or None and the error (status, message)
+async def readRequest(reader):
+    line = await reader.readline()
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        return None, (400, 'Bad request line')
+    method, path = parts[0], parts[1].split('?')[0]
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b'\r\n', b'\n', b''):
+            break
+        k, _, v = h.decode('latin-1').partition(':')
+        if k.strip().lower() == 'content-length':
+            try:
+                length = int(v.strip() or 0)
+            except ValueError:
+                return None, (400, 'Bad Content-Length')
+    if length < 0:
+        return None, (400, 'Bad Content-Length')
+    if length > MaxBody:
+        return None, (413, 'Request too large')
+    try:
+        body = await reader.readexactly(length) if length else b''
+    except asyncio.IncompleteReadError:
+        return None, (400, 'Body shorter than its Content-Length')
+    return (method, path, body), None
+
+# Status line and headers of a response, "length" None for a stream
+def responseHead(status, ctype, length, headers):
+    head = [f'HTTP/1.1 {status} {Reasons.get(status, "")}', f'Content-Type: {ctype}']
+    head += [f'Content-Length: {length}', 'Connection: close'] if length is not None else ['Connection: keep-alive']
+    head += [f'{k}: {v}' for k, v in headers.items()]
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+
+# Count, median, 95th percentile, and worst of latencies in seconds
+def latencies(samples):
+    s = sorted(samples)
+    if not s:
+        return {'Count': 0}
+    return {'Count': len(s), 'p50 ms': s[len(s) // 2] * 1000, 'p95 ms': s[int(len(s) * 0.95)] * 1000,
+            'Max ms': s[-1] * 1000}
+
+def bundle(name, xlsx, pdf):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_STORED) as z:   # both already compressed
+        z.writestr(f'{name}.xlsx', xlsx)
+        z.writestr(f'{name}.pdf', pdf)
+    return out.getvalue()
+
+
+class DocumentService:
+    def __init__(self, log, workers=None, cacheEntries=64, cacheMB=256):
+        self.log = log
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.cache = OrderedDict()  # key: (name, xlsx, pdf), the most recently used last
+        self.cacheEntries = cacheEntries
+        self.cacheBytes = cacheMB * 2**20
+        self.cached = 0     # bytes in the cache
+        self.rendering = {} # key: future of a rendering in progress
+        self.started = time.monotonic()
+        self.counts = {'Requests': 0, 'Hits': 0, 'Misses': 0, 'Shared': 0, 'Errors': 0, 'Evictions': 0}
+        self.latency = {'hit': deque(maxlen=1000), 'miss': deque(maxlen=1000)}
+
+    async def start(self, host, port):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=warmUp)
+        loop = asyncio.get_running_loop()
+        # every worker started and warm before the first request
+        await asyncio.gather(*[loop.run_in_executor(self.pool, time.sleep, 0.1) for _ in range(self.workers)])
+        server = await asyncio.start_server(self.handle, host, port)
+        self.log.info(f'Serving on {host}:{port} with {self.workers} workers')
+        return server
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    # The documents of "spec", from the cache or rendered.  Returns (entry, how)
+    async def documents(self, spec):
+        key = json.dumps(spec, sort_keys=True)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.counts['Hits'] += 1
+            return self.cache[key], 'hit'
+        if key in self.rendering:
+            self.counts['Shared'] += 1
+            return await asyncio.shield(self.rendering[key]), 'miss'
+        self.counts['Misses'] += 1
+        loop = asyncio.get_running_loop()
+        self.rendering[key] = loop.run_in_executor(self.pool, render, spec)
+        try:
+            entry = await asyncio.shield(self.rendering[key])
+        finally:
+            del self.rendering[key]
+        if entry is not None:
+            self.remember(key, entry)
+        return entry, 'miss'
+
+    def remember(self, key, entry):
+        size = len(entry[1]) + len(entry[2])
+        if size > self.cacheBytes:
+            return
+        self.cache[key] = entry
+        self.cached += size
+        while len(self.cache) > self.cacheEntries or self.cached > self.cacheBytes:
+            _, old = self.cache.popitem(last=False)
+            self.cached -= len(old[1]) + len(old[2])
+            self.counts['Evictions'] += 1
+
+    def metrics(self):
+        return {'Uptime s': time.monotonic() - self.started, **self.counts,
+                'Hit rate': self.counts['Hits'] / max(1, self.counts['Hits'] + self.counts['Misses'] + self.counts['Shared']),
+                'Cache entries': len(self.cache), 'Cache MB': self.cached / 2**20,
+                'Rendering': len(self.rendering),
+                'Latency': {k: latencies(v) for k, v in self.latency.items()}}
+
+    async def handle(self, reader, writer):
+        start = time.perf_counter()
+        how = None
+        try:
+            status, ctype, body, headers, how = await self.respond(reader)
+        except Exception as e:
+            self.log.error(f'Request failed: {e!r}')
+            status, ctype, body, headers = 500, 'application/json', json.dumps({'Error': repr(e)}).encode(), {}
+        if status >= 400:
+            self.counts['Errors'] += 1
+        try:
+            writer.write(responseHead(status, ctype, len(body), headers) + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        if how is not None:
+            self.latency[how].append(time.perf_counter() - start)
+
+    # Returns (status, content type, body, extra headers, 'hit'/'miss' or None)
+    async def respond(self, reader):
+        def error(status, msg):
+            return status, 'application/json', json.dumps({'Error': msg}).encode(), {}, None
+
+        request, failed = await readRequest(reader)
+        if failed:
+            return error(*failed)
+        method, path, body = request
+        self.counts['Requests'] += 1
+
+        if path == '/health':
+            return 200, 'application/json', b'{"Status": "OK"}', {}, None
+        if path == '/metrics':
+            return 200, 'application/json', json.dumps(self.metrics(), indent=1).encode(), {}, None
+        if path != '/generate':
+            return error(404, f'No {path}')
+        if method != 'POST':
+            return error(405, 'POST the request')
+        try:
+            spec, fmt = parseSpec(body)
+        except ValueError as e:
+            return error(400, ' '.join(str(a) for a in e.args))
+        entry, how = await self.documents(spec)
+        if entry is None:
+            return error(422, 'This movement cannot be made')
+        name, xlsx, pdf = entry
+        data = {'zip': lambda: bundle(name, xlsx, pdf), 'pdf': lambda: pdf, 'xlsx': lambda: xlsx}[fmt]()
+        return 200, Formats[fmt], data, {'Content-Disposition': f'attachment; filename="{name}.{fmt}"',
+                                         'X-Cache': how}, how
+
+
+async def serve(log, host, port, workers, cacheEntries, cacheMB):
+    service = DocumentService(log, workers, cacheEntries, cacheMB)
+    server = await service.start(host, port)
+    print(f'Serving on http://{host}:{port}/')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.stop()
+
+
+if __name__ == '__main__':
+    log = setlog('server', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Local only by default')
+    parser.add_argument('--port', type=int, default=8039)
+    parser.add_argument('-w', '--workers', type=int, help='# of worker processes, all the cores by default')
+    parser.add_argument('--cache', type=int, default=64, help='Most documents in the cache')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Most MB of documents in the cache')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+    try:
+        asyncio.run(serve(log, args.host, args.port, args.workers, args.cache, args.cache_mb))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Monte Carlo simulation of movement fairness
+# Any generated movement (Howell from setup.json, Mitchell with or without relay, square Mitchell)
+# is flattened into arrays.  Thousands of synthetic events are then drawn from a pair-strength
+# model and match-pointed in batch with numpy.
+#
+# The report tells how often the strongest pair of each field actually wins, and whether the
+# winner tends to come from one direction.  Use it to pick a movement for a given turnout.
+#
+# -m howell mitchell square: movements to compare, for the same number of pairs
+# -n #: number of simulated sessions
+import argparse
+import json
+import logging
+import time
+import numpy as np
+from maininit import setlog
+from movements import newDocument, Movements
+
+# A movement flattened into arrays
+# Every board is a row, every (non sit-out) play of that board a column.
+# Pairs are re-indexed 0..n-1; a padding pair "n" fills the unused columns.
+class MovementArrays:
+    def __init__(self, doc):
+        plays = {}
+        for b in sorted(doc.boardData.keys()):
+            plays[b] = [(v[2], v[3]) for v in doc.boardData[b] if not doc.ifSitout(v[1], v[2], v[3])]
+        pairNums = sorted({p for v in plays.values() for s in v for p in s})
+        self.pairs = [doc.pairN(p) for p in pairNums]
+        self.nPairs = len(pairNums)
+        idx = {p: i for i, p in enumerate(pairNums)}
+        self.nBoards = len(plays)
+        self.nPlays = max(len(v) for v in plays.values())
+        self.ns = np.full((self.nBoards, self.nPlays), self.nPairs)
+        self.ew = np.full((self.nBoards, self.nPlays), self.nPairs)
+        for i, b in enumerate(plays.keys()):
+            for k, (ns, ew) in enumerate(plays[b]):
+                self.ns[i, k] = idx[ns]
+                self.ew[i, k] = idx[ew]
+        self.valid = self.ns < self.nPairs
+        self.played = self.valid.sum(axis=1)
+
+        # Incidence of plays (board x column) to pairs, per direction
+        slots = self.nBoards * self.nPlays
+        self.nsInc = np.zeros((slots, self.nPairs + 1))
+        self.ewInc = np.zeros((slots, self.nPairs + 1))
+        self.nsInc[np.arange(slots), self.ns.ravel()] = 1
+        self.ewInc[np.arange(slots), self.ew.ravel()] = 1
+        self.nsInc = self.nsInc[:, :-1]
+        self.ewInc = self.ewInc[:, :-1]
+        # The most MPs a pair can earn: one per comparison
+        tops = np.where(self.valid, self.played[:, None] - 1, 0).ravel()
+        self.top = tops @ self.nsInc + tops @ self.ewInc
+
+        # Fields are ranked separately, Mitchell has NS and EW, Howell just one
+        fieldOf = [doc.pairSide(p) or 'All' for p in pairNums]
+        self.fields = {f: np.array([i for i, x in enumerate(fieldOf) if x == f]) for f in dict.fromkeys(fieldOf)}
+        # Pairs sitting NS for the majority of their boards
+        self.mostlyNS = self.valid.ravel() @ self.nsInc > self.valid.ravel() @ self.ewInc
+
+
+class Simulator:
+    # Pair strength is in tricks per board, relative to the field
+    Models = ('normal', 'uniform', 'star')
+
+    def __init__(self, arrays, model='normal', spread=0.5, noise=1.0, seed=None):
+        if model not in self.Models:
+            raise ValueError('Unknown strength model', model)
+        self.a = arrays
+        self.model = model
+        self.spread = spread
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+    def strengths(self, n):
+        shape = (n, self.a.nPairs)
+        match self.model:
+            case 'normal':
+                s = self.rng.normal(0, self.spread, shape)
+            case 'uniform':
+                s = self.rng.uniform(-self.spread, self.spread, shape)
+            case 'star':
+                # One clearly stronger pair in an otherwise even field
+                s = self.rng.normal(0, self.spread / 4, shape)
+                s[np.arange(n), self.rng.integers(0, self.a.nPairs, n)] += self.spread * 2
+        # padding pair for unused columns
+        return np.hstack([s, np.zeros((n, 1))])
+
+    # Match-point a batch of sessions
+    # Net NS results are whole tricks so that ties happen as they do at the table.
+    def score(self, strength):
+        n = strength.shape[0]
+        a = self.a
+        net = strength[:, a.ns] - strength[:, a.ew]
+        net += self.rng.normal(0, self.noise, net.shape)
+        net = np.rint(net)
+        diff = net[:, :, :, None] - net[:, :, None, :]
+        mp = (diff > 0) + 0.5 * (diff == 0)
+        mp = (mp * a.valid[None, :, None, :]).sum(axis=3) - 0.5
+        mp *= a.valid
+        mpNS = mp.reshape(n, -1)
+        mpEW = (np.where(a.valid, a.played[:, None] - 1, 0) - mp).reshape(n, -1)
+        return (mpNS @ a.nsInc + mpEW @ a.ewInc) / a.top
+
+    def run(self, sessions, batch=5000):
+        a = self.a
+        stats = {f: {'Wins': 0, 'Place': 0.0} for f in a.fields}
+        topNS = 0
+        done = 0
+        while done < sessions:
+            n = min(batch, sessions - done)
+            strength = self.strengths(n)
+            pct = self.score(strength)
+            # random jitter breaks ties without favouring low pair numbers
+            pct += self.rng.uniform(0, 1e-9, pct.shape)
+            for f, members in a.fields.items():
+                fPct = pct[:, members]
+                best = strength[:, members].argmax(axis=1)
+                bestPct = fPct[np.arange(n), best]
+                stats[f]['Wins'] += int((fPct.argmax(axis=1) == best).sum())
+                stats[f]['Place'] += float((fPct > bestPct[:, None]).sum(axis=1).sum() + n)
+            topNS += int(a.mostlyNS[pct.argmax(axis=1)].sum())
+            done += n
+
+        report = {'Pairs': a.nPairs, 'Boards': a.nBoards, 'Sessions': sessions, 'Fields': {}}
+        for f, s in stats.items():
+            report['Fields'][f] = {'Pairs': len(a.fields[f]),
+                'Strongest wins': s['Wins'] / sessions,
+                'Strongest place': s['Place'] / sessions}
+        # Share of sessions won outright by a (mostly) NS pair, against its share of the field
+        expected = a.mostlyNS.mean()
+        report['Direction'] = {'NS': topNS / sessions - expected,
+                               'EW': (sessions - topNS) / sessions - (1 - expected)}
+        return report
+
+
+def showReport(name, report, secs):
+    print(f'{name}: {report["Pairs"]} pairs, {report["Boards"]} boards, {report["Sessions"]} sessions in {secs:.1f}s')
+    for f, s in report['Fields'].items():
+        print(f'  {f:>3} field of {s["Pairs"]:>2}: strongest pair wins {s["Strongest wins"]:6.1%},'
+              f' average place {s["Strongest place"]:.2f}')
+    print(f'  Winner direction bias: NS {report["Direction"]["NS"]:+.1%}, EW {report["Direction"]["EW"]:+.1%}')
+
+
+if __name__ == '__main__':
+    log = setlog('simulate', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--movement', nargs='+', choices=Movements, default=['howell'])
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('-n', '--sessions', type=int, default=10000, help='Simulated sessions')
+    parser.add_argument('--model', choices=Simulator.Models, default='normal', help='Pair strength model')
+    parser.add_argument('--spread', type=float, default=0.5, help='Spread of pair strengths, in tricks')
+    parser.add_argument('--noise', type=float, default=1.0, help='Board-to-board luck, in tricks')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('-j', '--jsonfile', type=str)
+    parser.add_argument('-o', '--output', type=str, help='Save the reports as JSON')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    reports = {}
+    for m in args.movement:
+        doc = newDocument(log, m, args.pair, args.boards, jsonfile=args.jsonfile)
+        if doc is None:
+            continue
+        start = time.perf_counter()
+        sim = Simulator(MovementArrays(doc), args.model, args.spread, args.noise, args.seed)
+        reports[m] = sim.run(args.sessions)
+        showReport(m, reports[m], time.perf_counter() - start)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Where the time of a build goes
+# The generators wrap the stages of a build in "with doc.stage(name):" (see PairGames.stage).
+# With a profiler attached to the document, each stage records its wall time, the peak memory
+# traced while in it, and the cells and PDF pages it added.  Stages nest; a stage entered many
+# times (computeMP for every row) is one entry with its number of calls.
+#
+# Memory is traced by tracemalloc, which makes the build a few times slower: compare wall times
+# with wall times.  Pages are those drawn in this process, not by the workers (-w).
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pdf import PDF
+
+class StageProfiler:
+    def __init__(self, doc, memory=True):
+        self.doc = doc
+        self.memory = memory
+        self.root = self.newStage('Total')
+        self.stack = []
+
+    def newStage(self, name):
+        return {'Name': name, 'Calls': 0, 'Seconds': 0.0, 'Peak': 0, 'Cells': 0, 'Pages': 0, 'Stages': {}}
+
+    def cells(self):
+        wb = self.doc.wb
+        return sum(len(ws._cells) for ws in wb.worksheets) if wb is not None else 0
+
+    # Peak memory since the last reset, what is kept for the stage being left
+    def peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.memory else 0
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start()
+        self.root['Calls'] = 1
+        self.stack = [[self.root, time.perf_counter(), self.cells(), PDF.pagesAdded, 0]]
+
+    def stop(self):
+        s, t, cells, pages, peak = self.stack.pop()
+        s['Seconds'] = time.perf_counter() - t
+        s['Cells'] = self.cells() - cells
+        s['Pages'] = PDF.pagesAdded - pages
+        s['Peak'] = max(peak, self.peak())
+        if self.memory:
+            tracemalloc.stop()
+
+    # tracemalloc has one peak, reset for every stage.  The peak of the enclosing stage so far
+    # is kept on the stack and updated when the inner one is left.
+    @contextmanager
+    def stage(self, name):
+        parent = self.stack[-1]
+        parent[4] = max(parent[4], self.peak())
+        if self.memory:
+            tracemalloc.reset_peak()
+        s = parent[0]['Stages'].setdefault(name, self.newStage(name))
+        frame = [s, time.perf_counter(), self.cells(), PDF.pagesAdded, 0]
+        self.stack.append(frame)
+        try:
+            yield s
+        finally:
+            self.stack.pop()
+            peak = max(frame[4], self.peak())
+            s['Calls'] += 1
+            s['Seconds'] += time.perf_counter() - frame[1]
+            s['Cells'] += self.cells() - frame[2]
+            s['Pages'] += PDF.pagesAdded - frame[3]
+            s['Peak'] = max(s['Peak'], peak)
+            parent[4] = max(parent[4], peak)
+
+    def report(self):
+        print(f'{"Stage":<32} {"Calls":>6} {"Wall s":>8} {"Peak MB":>8} {"Cells":>8} {"Pages":>6}')
+        def show(s, depth):
+            name = '  ' * depth + s['Name']
+            print(f'{name:<32} {s["Calls"]:>6} {s["Seconds"]:>8.3f} {s["Peak"] / 2**20:>8.1f} {s["Cells"]:>8} {s["Pages"]:>6}')
+            for c in s['Stages'].values():
+                show(c, depth + 1)
+        show(self.root, 0)
+
+    def dump(self, fn):
+        with open(fn, 'w') as f:
+            json.dump(self.root, f, indent=1)
@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+# Swiss events: each round is paired by the scores so far, and no two entrants meet twice
+# A team or pair Swiss has no movement made ahead: after each round the entrants are ranked by
+# their victory points (see scoring.victoryPoints), and the next round is the pairing of least
+# total (VP difference)^2, ranks apart as the tie-break, that has no rematch.  That is a minimum
+# cost perfect matching of a general graph, found by Edmonds' blossoms (maxWeightMatching): the
+# entrants are the vertices, and an edge joins two entrants that have not met.  The candidates of
+# an entrant are the "Candidates" nearest below it in the ranking it has not met; when they admit
+# no complete pairing they are doubled, up to every entrant.  200 entrants pair in a tenth of a second.
+# With an odd number of entrants the "bye" (entrant 0) is paired as if ranked last; it goes to an
+# entrant without a bye yet, and is worth ByeVPs.
+#
+# The better ranked of a match is the home entrant, and the matches take the tables in rank order:
+# a pair match a table, the home pair NS; a team match two tables, the home team NS at the first
+# and EW at the second, the boards exchanged between them.  Every match of a round plays the same
+# boards, duplicated (see deals.py).  The PDF of a round has the assignments of every entrant (by
+# entrant number, to find one's table), a card for each table, and the pickup slips.
+#
+# The event is kept as JSON ("swiss.json" by default):
+#   new: entrants, boards a match, teams or pairs, names from a names file (see loadNames)
+#   pair: the next round, once every match of the last one has its result; the PDF of the round
+#   result: "table=IMPs" of the current round, IMPs won by the home entrant
+#   standings: rank, score, and matches played
+#   simulate: a field of random results, timing every pairing, no file kept
+import argparse
+import json
+import logging
+import os
+import random
+import time
+import json5
+import pdf
+from maininit import setlog
+from docset import PairGames
+from scoring import victoryPoints
+
+here = os.path.dirname(os.path.abspath(__file__))
+Event = f'{here}/../swiss.json'
+Candidates = 8
+ByeVPs = 12.0
+
+# Maximum weight matching of a general graph, of most edges first (Edmonds' blossoms, primal-dual)
+# "edges" [(i, j, weight)] of vertices 0 .. n - 1, integer weights.  Returns the mate of each vertex, -1 if none.
+# Vertices are 0 .. n - 1, blossoms n .. 2n - 1; edge k has the endpoints 2k (i) and 2k + 1 (j).
+def maxWeightMatching(n, edges):
+    if not edges:
+        return [-1] * n
+    endpoint = [v for i, j, w in edges for v in (i, j)]
+    neighbors = [[] for _ in range(n)]     # endpoints of the other ends
+    for k, (i, j, w) in enumerate(edges):
+        neighbors[i].append(2 * k + 1)
+        neighbors[j].append(2 * k)
+    top = max(0, max(w for i, j, w in edges))
+    mate = [-1] * n             # endpoint the vertex is matched through
+    label = [0] * (2 * n)       # 1: S, 2: T, of the top-level blossom
+    labelEnd = [-1] * (2 * n)   # endpoint the label came through
+    inBlossom = list(range(n))  # top-level blossom of each vertex
+    parent = [-1] * (2 * n)
+    children = [None] * (2 * n)
+    base = list(range(n)) + [-1] * n
+    endps = [None] * (2 * n)    # endpoints of the edges between the children of a blossom
+    bestEdge = [-1] * (2 * n)   # least slack edge to an S blossom
+    bestEdges = [None] * (2 * n)
+    unused = list(range(n, 2 * n))
+    dual = [top] * n + [0] * n
+    allowed = [False] * len(edges)
+    queue = []
+
+    def slack(k):
+        i, j, w = edges[k]
+        return dual[i] + dual[j] - 2 * w
+
+    def leaves(b):
+        if b < n:
+            yield b
+        else:
+            for t in children[b]:
+                if t < n:
+                    yield t
+                else:
+                    yield from leaves(t)
+
+    def assignLabel(w, t, p):
+        b = inBlossom[w]
+        label[w] = label[b] = t
+        labelEnd[w] = labelEnd[b] = p
+        bestEdge[w] = bestEdge[b] = -1
+        if t == 1:
+            queue.extend(leaves(b))
+        else:
+            m = mate[base[b]]
+            assignLabel(endpoint[m], 1, m ^ 1)
+
+    # Base of the blossom closed by an edge v-w between S vertices, -1 for an augmenting path
+    def scanBlossom(v, w):
+        path = []
+        found = -1
+        while v != -1 or w != -1:
+            b = inBlossom[v]
+            if label[b] & 4:
+                found = base[b]
+                break
+            path.append(b)
+            label[b] = 5
+            if labelEnd[b] == -1:
+                v = -1
+            else:
+                v = endpoint[labelEnd[b]]
+                b = inBlossom[v]
+                v = endpoint[labelEnd[b]]
+            if w != -1:
+                v, w = w, v
+        for b in path:
+            label[b] = 1
+        return found
+
+    def addBlossom(bs, k):
+        v, w, _ = edges[k]
+        bb, bv, bw = inBlossom[bs], inBlossom[v], inBlossom[w]
+        b = unused.pop()
+        base[b] = bs
+        parent[b] = -1
+        parent[bb] = b
+        children[b] = path = []
+        endps[b] = ends = []
+        while bv != bb:
+            parent[bv] = b
+            path.append(bv)
+            ends.append(labelEnd[bv])
+            v = endpoint[labelEnd[bv]]
+            bv = inBlossom[v]
+        path.append(bb)
+        path.reverse()
+        ends.reverse()
+        ends.append(2 * k)
+        while bw != bb:
+            parent[bw] = b
+            path.append(bw)
+            ends.append(labelEnd[bw] ^ 1)
+            w = endpoint[labelEnd[bw]]
+            bw = inBlossom[w]
+        label[b] = 1
+        labelEnd[b] = labelEnd[bb]
+        dual[b] = 0
+        for v in leaves(b):
+            if label[inBlossom[v]] == 2:
+                queue.append(v)
+            inBlossom[v] = b
+        bestTo = {}
+        for bv in path:
+            lists = [[p // 2 for p in neighbors[v]] for v in leaves(bv)] if bestEdges[bv] is None else [bestEdges[bv]]
+            for ks in lists:
+                for k in ks:
+                    i, j, _ = edges[k]
+                    if inBlossom[j] == b:
+                        i, j = j, i
+                    bj = inBlossom[j]
+                    if bj != b and label[bj] == 1 and (bj not in bestTo or slack(k) < slack(bestTo[bj])):
+                        bestTo[bj] = k
+            bestEdges[bv] = None
+            bestEdge[bv] = -1
+        bestEdges[b] = list(bestTo.values())
+        bestEdge[b] = min(bestEdges[b], key=slack, default=-1)
+
+    def expandBlossom(b, endStage):
+        for s in children[b]:
+            parent[s] = -1
+            if s < n:
+                inBlossom[s] = s
+            elif endStage and dual[s] == 0:
+                expandBlossom(s, endStage)
+            else:
+                for v in leaves(s):
+                    inBlossom[v] = s
+        if not endStage and label[b] == 2:
+            # relabel the children on the even path from the entry child to the base
+            entry = inBlossom[endpoint[labelEnd[b] ^ 1]]
+            j = children[b].index(entry)
+            if j & 1:
+                j -= len(children[b])
+                step, trick = 1, 0
+            else:
+                step, trick = -1, 1
+            p = labelEnd[b]
+            while j != 0:
+                label[endpoint[p ^ 1]] = 0
+                label[endpoint[endps[b][j - trick] ^ trick ^ 1]] = 0
+                assignLabel(endpoint[p ^ 1], 2, p)
+                allowed[endps[b][j - trick] // 2] = True
+                j += step
+                p = endps[b][j - trick] ^ trick
+                allowed[p // 2] = True
+                j += step
+            bv = children[b][j]
+            label[endpoint[p ^ 1]] = label[bv] = 2
+            labelEnd[endpoint[p ^ 1]] = labelEnd[bv] = p
+            bestEdge[bv] = -1
+            j += step
+            while children[b][j] != entry:
+                bv = children[b][j]
+                if label[bv] == 1:
+                    j += step
+                    continue
+                for v in leaves(bv):
+                    if label[v] != 0:
+                        break
+                if label[v] != 0:
+                    label[v] = 0
+                    label[endpoint[mate[base[bv]]]] = 0
+                    assignLabel(v, 2, labelEnd[v])
+                j += step
+        label[b] = labelEnd[b] = -1
+        children[b] = endps[b] = None
+        base[b] = -1
+        bestEdges[b] = None
+        bestEdge[b] = -1
+        unused.append(b)
+
+    # Swap the matched and unmatched edges of blossom "b" from vertex "v" to the base, "v" the new base
+    def augmentBlossom(b, v):
+        t = v
+        while parent[t] != b:
+            t = parent[t]
+        if t >= n:
+            augmentBlossom(t, v)
+        i = j = children[b].index(t)
+        if i & 1:
+            j -= len(children[b])
+            step, trick = 1, 0
+        else:
+            step, trick = -1, 1
+        while j != 0:
+            j += step
+            t = children[b][j]
+            p = endps[b][j - trick] ^ trick
+            if t >= n:
+                augmentBlossom(t, endpoint[p])
+            j += step
+            t = children[b][j]
+            if t >= n:
+                augmentBlossom(t, endpoint[p ^ 1])
+            mate[endpoint[p]] = p ^ 1
+            mate[endpoint[p ^ 1]] = p
+        children[b] = children[b][i:] + children[b][:i]
+        endps[b] = endps[b][i:] + endps[b][:i]
+        base[b] = base[children[b][0]]
+
+    def augmentMatching(k):
+        v, w, _ = edges[k]
+        for s, p in ((v, 2 * k + 1), (w, 2 * k)):
+            while True:
+                bs = inBlossom[s]
+                if bs >= n:
+                    augmentBlossom(bs, s)
+                mate[s] = p
+                if labelEnd[bs] == -1:
+                    break
+                t = endpoint[labelEnd[bs]]
+                bt = inBlossom[t]
+                s = endpoint[labelEnd[bt]]
+                j = endpoint[labelEnd[bt] ^ 1]
+                if bt >= n:
+                    augmentBlossom(bt, j)
+                mate[j] = labelEnd[bt]
+                p = labelEnd[bt] ^ 1
+
+    # a stage for each augmenting path
+    for _ in range(n):
+        label[:] = [0] * (2 * n)
+        bestEdge[:] = [-1] * (2 * n)
+        bestEdges[n:] = [None] * n
+        allowed[:] = [False] * len(edges)
+        queue[:] = []
+        for v in range(n):
+            if mate[v] == -1 and label[inBlossom[v]] == 0:
+                assignLabel(v, 1, -1)
+        augmented = False
+        while True:
+            while queue and not augmented:
+                v = queue.pop()
+                for p in neighbors[v]:
+                    k = p // 2
+                    w = endpoint[p]
+                    if inBlossom[v] == inBlossom[w]:
+                        continue
+                    if not allowed[k]:
+                        kSlack = slack(k)
+                        if kSlack <= 0:
+                            allowed[k] = True
+                    if allowed[k]:
+                        if label[inBlossom[w]] == 0:
+                            assignLabel(w, 2, p ^ 1)
+                        elif label[inBlossom[w]] == 1:
+                            bs = scanBlossom(v, w)
+                            if bs >= 0:
+                                addBlossom(bs, k)
+                            else:
+                                augmentMatching(k)
+                                augmented = True
+                                break
+                        elif label[w] == 0:
+                            label[w] = 2
+                            labelEnd[w] = p ^ 1
+                    elif label[inBlossom[w]] == 1:
+                        b = inBlossom[v]
+                        if bestEdge[b] == -1 or kSlack < slack(bestEdge[b]):
+                            bestEdge[b] = k
+                    elif label[w] == 0:
+                        if bestEdge[w] == -1 or kSlack < slack(bestEdge[w]):
+                            bestEdge[w] = k
+            if augmented:
+                break
+            # the least change of the duals that allows an edge or expands a blossom
+            kind, delta = -1, None
+            for v in range(n):
+                if label[inBlossom[v]] == 0 and bestEdge[v] != -1:
+                    d = slack(bestEdge[v])
+                    if kind == -1 or d < delta:
+                        kind, delta, edge = 2, d, bestEdge[v]
+            for b in range(2 * n):
+                if parent[b] == -1 and label[b] == 1 and bestEdge[b] != -1:
+                    d = slack(bestEdge[b]) // 2
+                    if kind == -1 or d < delta:
+                        kind, delta, edge = 3, d, bestEdge[b]
+            for b in range(n, 2 * n):
+                if base[b] >= 0 and parent[b] == -1 and label[b] == 2 and (kind == -1 or dual[b] < delta):
+                    kind, delta, blossom = 4, dual[b], b
+            if kind == -1:
+                kind, delta = 1, max(0, min(dual[:n]))
+            for v in range(n):
+                if label[inBlossom[v]] == 1:
+                    dual[v] -= delta
+                elif label[inBlossom[v]] == 2:
+                    dual[v] += delta
+            for b in range(n, 2 * n):
+                if base[b] >= 0 and parent[b] == -1:
+                    if label[b] == 1:
+                        dual[b] += delta
+                    elif label[b] == 2:
+                        dual[b] -= delta
+            if kind == 1:
+                break
+            elif kind == 2:
+                allowed[edge] = True
+                i, j, _ = edges[edge]
+                if label[inBlossom[i]] == 0:
+                    i = j
+                queue.append(i)
+            elif kind == 3:
+                allowed[edge] = True
+                queue.append(edges[edge][0])
+            else:
+                expandBlossom(blossom, False)
+        if not augmented:
+            break
+        for b in range(n, 2 * n):
+            if parent[b] == -1 and base[b] >= 0 and label[b] == 1 and dual[b] == 0:
+                expandBlossom(b, True)
+    return [endpoint[m] if m >= 0 else -1 for m in mate]
+
+# The matches of the next round, [(home, away)] the best ranked first, away 0 for the bye
+# "ranking" the entrants best first, "scores" {entrant: VPs}, "met" {entrant: entrants met},
+# "byes" the entrants that had a bye.  None if every pairing has a rematch.
+def swissPairs(ranking, scores, met, byes, candidates=Candidates):
+    order = list(ranking) + [0] * (len(ranking) % 2)
+    n = len(order)
+    points = [round(scores.get(e, 0) * 100) for e in ranking]
+    points += points[-1:] * (n - len(ranking))
+    while True:
+        costs = []
+        for i in range(n):
+            found = 0
+            for j in range(i + 1, n):
+                if order[j] in met.get(order[i], ()) or order[j] == 0 and order[i] in byes:
+                    continue
+                costs.append((i, j, (points[i] - points[j]) ** 2 * n ** 3 + (j - i) ** 2))
+                found += 1
+                if found == candidates:
+                    break
+        most = max((c for _, _, c in costs), default=0) + 1
+        mate = maxWeightMatching(n, [(i, j, most - c) for i, j, c in costs])
+        if all(m >= 0 for m in mate):
+            return [(order[i], order[mate[i]]) for i in range(n) if mate[i] > i]
+        if candidates >= n:
+            return None
+        candidates *= 2
+
+
+class SwissEvent:
+    def __init__(self, log, fileName=Event):
+        self.log = log
+        self.fileName = fileName
+        with open(fileName, 'r') as f:
+            state = json.load(f)
+        self.title = state['Tournament']
+        self.teams = state['Teams']
+        self.boards = state['Boards']
+        self.names = state['Entrants']   # entrant n is names[n-1]
+        self.rounds = state['Rounds']    # [[{'Table', 'Home', 'Away', 'IMPs'}]]
+
+    @staticmethod
+    def create(fileName, entrants, boards, teams, nameFile=None):
+        names = {'Tournament': f'Swiss {"Teams" if teams else "Pairs"}', 'Players': []}
+        if nameFile:
+            with open(nameFile, 'r') as f:
+                names.update(json5.load(f))
+        players = names['Players'] or [''] * entrants
+        with open(fileName, 'w') as f:
+            json.dump({'Tournament': names['Tournament'], 'Teams': teams, 'Boards': boards,
+                       'Entrants': players, 'Rounds': []}, f, indent=1)
+        return len(players)
+
+    def save(self):
+        with open(self.fileName, 'w') as f:
+            json.dump({'Tournament': self.title, 'Teams': self.teams, 'Boards': self.boards,
+                       'Entrants': self.names, 'Rounds': self.rounds}, f, indent=1)
+
+    def entrants(self):
+        return range(1, len(self.names) + 1)
+
+    def name(self, e):
+        return self.names[e-1] if e else 'Bye'
+
+    # VPs of each entrant, and the number of matches with a result, of the rounds before "upTo"
+    def scores(self, upTo=None):
+        vps = {e: 0.0 for e in self.entrants()}
+        played = {e: 0 for e in self.entrants()}
+        for matches in self.rounds[:upTo]:
+            for m in matches:
+                if m['Away'] == 0:
+                    vps[m['Home']] += ByeVPs
+                elif m['IMPs'] is not None:
+                    home, away = victoryPoints(m['IMPs'], self.boards)
+                    vps[m['Home']] += home
+                    vps[m['Away']] += away
+                else:
+                    continue
+                for e in (m['Home'], m['Away']):
+                    if e:
+                        played[e] += 1
+        return vps, played
+
+    # Best first, ties by entrant number
+    def ranking(self, vps):
+        return sorted(self.entrants(), key=lambda e: (-vps[e], e))
+
+    # First table of each match, and the (table, NS, EW) of its tables, zero-based
+    def tables(self, m):
+        t = m['Table'] - 1
+        if m['Away'] == 0:
+            return []
+        return [(t, m['Home'], m['Away']), (t + 1, m['Away'], m['Home'])] if self.teams else [(t, m['Home'], m['Away'])]
+
+    def pending(self):
+        return [m['Table'] for m in (self.rounds[-1] if self.rounds else []) if m['Away'] and m['IMPs'] is None]
+
+    def pairNext(self):
+        if self.pending():
+            raise ValueError(f'Round {len(self.rounds)} has no result at tables {self.pending()}')
+        vps, _ = self.scores()
+        met = {e: set() for e in self.entrants()}
+        byes = set()
+        for matches in self.rounds:
+            for m in matches:
+                if m['Away'] == 0:
+                    byes.add(m['Home'])
+                else:
+                    met[m['Home']].add(m['Away'])
+                    met[m['Away']].add(m['Home'])
+        pairs = swissPairs(self.ranking(vps), vps, met, byes)
+        if pairs is None:
+            raise ValueError(f'No pairing of round {len(self.rounds) + 1} without a rematch')
+        # the bye after the last table
+        pairs.sort(key=lambda p: p[1] == 0)
+        step = 2 if self.teams else 1
+        self.rounds.append([{'Table': i * step + 1, 'Home': h, 'Away': a, 'IMPs': None} for i, (h, a) in enumerate(pairs)])
+        return self.rounds[-1]
+
+    # "results" {table: IMPs of the home entrant} of the current round
+    def enter(self, results):
+        matches = {m['Table']: m for m in (self.rounds[-1] if self.rounds else []) if m['Away']}
+        for t, imps in results.items():
+            if t not in matches:
+                raise ValueError(f'No match at table {t} in round {len(self.rounds)}')
+            matches[t]['IMPs'] = imps
+
+
+# The documents of a round: assignments, table cards, and pickup slips
+# The "pairs" of roundData and boardData are the entrant numbers.
+class SwissRound(PairGames):
+    Sections = (('Assignments', 'assignmentPDF'), ('Tables', 'tableCards'), ('Pickups', 'Pickups'))
+
+    def __init__(self, log, event, r=None):
+        super().__init__(log)
+        self.pdf = pdf.PDF(False)
+        self.wb = None
+        self.event = event
+        self.decks = event.boards
+        self.round = len(event.rounds) - 1 if r is None else r
+        self.pairs = len(event.names)
+        self.matches = event.rounds[self.round]
+        self.roundData[self.round] = {}
+        for m in self.matches:
+            for t, ns, ew in event.tables(m):
+                self.roundData[self.round][t] = {'NS': ns, 'EW': ew, 'Board': self.boardList(self.round)}
+                for b in self.boardList(self.round):
+                    self.boardData.setdefault(b, []).append([self.round, t, ns, ew])
+        self.tables = len(self.roundData[self.round])
+        # the standings the round was paired by
+        self.vps, _ = event.scores(self.round)
+        self.rank = {e: i + 1 for i, e in enumerate(event.ranking(self.vps))}
+        self.loadNames(None, {'File': f'swiss-round{self.round + 1}', 'Tournament': event.title, 'Players': event.names})
+        self.pdf.HeaderFooterText(f"{self.notice} {self.nameObj['Date']}.", f"{event.title}, round {self.round + 1}")
+
+    def pairN(self, n):
+        return n
+
+    def boardText(self):
+        bds = self.boardList(self.round)
+        return f'{bds[0]+1}-{bds[-1]+1}' if len(bds) > 1 else f'{bds[0]+1}'
+
+    # Where each entrant plays, by entrant number
+    def assignmentPDF(self):
+        hdrs = ['#', 'Name', 'VPs', 'Rank', 'Table', 'Versus']
+        cols = []
+        self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.linePt)
+        self.pdf.setHeaders(0, hdrs, cols)
+        cols = list(cols)
+        widest = max([self.pdf.get_string_width(n) for n in self.event.names] + [0]) + 0.2
+        cols[1] = max(cols[1], min(widest, self.pdf.epw - sum(cols) + cols[1]))
+        cols[4] = max(cols[4], self.pdf.get_string_width('88 NS, 89 EW') + 0.2)
+        xMargin = (self.pdf.w - sum(cols)) / 2
+        seats = {}
+        for m in self.matches:
+            if m['Away'] == 0:
+                seats[m['Home']] = ('Bye', '')
+                continue
+            tables = self.event.tables(m)
+            for e, v in ((m['Home'], m['Away']), (m['Away'], m['Home'])):
+                seats[e] = (', '.join(f'{t+1} {"NS" if ns == e else "EW"}' for t, ns, ew in tables), f'{v}')
+        self.pdf.set_font(self.pdf.sansSerifFont, size=self.pdf.linePt)
+        h = self.pdf.lineHeight(self.pdf.font_size_pt)
+        perPage = int((self.pdf.eph - 6 * h) // h)
+        for e in self.event.entrants():
+            i = e - 1
+            if i % perPage == 0:
+                self.pdf.add_page()
+                self.pdf.headerFooter()
+                title = f'Round {self.round + 1}: boards {self.boardText()}'
+                self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.linePt)
+                y = self.pdf.headerRow(xMargin, self.pdf.margin + h, cols, hdrs, title) + h
+                self.pdf.set_font(size=self.pdf.linePt)
+                self.pdf.grid(xMargin, y, cols, h, min(perPage, self.pairs - i))
+            table, versus = seats.get(e, ('', ''))
+            self.pdf.gridTexts(xMargin, y, cols, h, [f'{e}', self.event.name(e), f'{self.vps[e]:.2f}', f'{self.rank[e]}', table, versus])
+            y += h
+
+    # A card on each table: who sits NS and EW, and the boards
+    def tableCards(self):
+        hdrs = ['Round', 'NS', 'EW', 'Boards']
+        cols = []
+        self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.rosterPt)
+        self.pdf.setHeaders(0, hdrs, cols)
+        cols = [w * 1.5 for w in cols]
+        xMargin = (self.pdf.w - sum(cols)) / 2
+        top = self.pdf.pt2in(self.pdf.bigPt) * 2.5 + 1
+        for t, d in sorted(self.roundData[self.round].items()):
+            self.pdf.add_page()
+            self.pdf.set_line_width(self.pdf.thinLine)
+            self.pdf.pageFooter(self.pairs, self.tables)
+            self.pdf.movementSheet()
+            self.pdf.tableAnchors(f'{t+1}')
+            self.pdf.set_font(self.pdf.sansSerifFont, style='B', size=self.pdf.rosterPt)
+            self.pdf.headerRow(xMargin, top, cols, hdrs)
+            self.pdf.set_font(size=self.pdf.rosterPt)
+            h = self.pdf.lineHeight(self.pdf.font_size_pt)
+            y = self.pdf.get_y() + h
+            self.pdf.grid(xMargin, y, cols, h, 1)
+            self.pdf.gridTexts(xMargin, y, cols, h, [f'{self.round + 1}', f"{d['NS']}", f"{d['EW']}", self.boardText()])
+            self.pdf.set_font(self.pdf.serifFont, size=self.pdf.bigPt)
+            y += 2 * h
+            for side in ('NS', 'EW'):
+                text = f'{side}: {self.event.name(d[side])}'
+                if self.event.name(d[side]):
+                    self.pdf.set_xy(self.pdf.setHCenter(self.pdf.get_string_width(text)), y)
+                    self.pdf.cell(text=text)
+                    y += h
+
+    def build(self):
+        with self.stage('PDF sections'):
+            self.startSections()
+            self.finishSections()
+
+    def save(self, outDir=None):
+        print(f'Saved {self.savePDF(self.outputPath(outDir))}')
+
+
+# A field of "entrants" playing "rounds", results at random, every pairing timed
+def simulate(entrants, rounds, boards, seed=None):
+    rng = random.Random(seed)
+    vps = {e: 0.0 for e in range(1, entrants + 1)}
+    met = {e: set() for e in vps}
+    byes = set()
+    times = []
+    for r in range(rounds):
+        ranking = sorted(vps, key=lambda e: (-vps[e], e))
+        start = time.perf_counter()
+        pairs = swissPairs(ranking, vps, met, byes)
+        times.append(time.perf_counter() - start)
+        if pairs is None:
+            print(f'Round {r+1}: no pairing without a rematch')
+            break
+        spread = max(abs(vps[h] - vps[a]) for h, a in pairs if a)
+        print(f'Round {r+1}: {len(pairs)} matches in {times[-1] * 1000:.1f} ms, most apart {spread:.2f} VPs')
+        for h, a in pairs:
+            if a == 0:
+                byes.add(h)
+                vps[h] += ByeVPs
+                continue
+            met[h].add(a)
+            met[a].add(h)
+            home, away = victoryPoints(round(rng.gauss(0, 2.5 * boards ** 0.5)), boards)
+            vps[h] += home
+            vps[a] += away
+    return times
+
+
+if __name__ == '__main__':
+    log = setlog('swiss', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--event', type=str, default=Event, help='Event file')
+    parser.add_argument('-d', '--debug', type=str, default='ERROR')
+    sub = parser.add_subparsers(dest='command', required=True)
+    new = sub.add_parser('new', help='Start an event')
+    new.add_argument('-p', '--entrants', type=int, default=16, help='# of entrants, the names by default')
+    new.add_argument('-b', '--boards', type=int, default=7, help='Boards a match')
+    new.add_argument('-t', '--teams', action='store_true', help='Teams, two tables a match')
+    new.add_argument('-n', '--names', type=str, help='Names file, "Players" the entrants')
+    pr = sub.add_parser('pair', help='Pair the next round and make its PDF')
+    pr.add_argument('-o', '--outdir', type=str, help='Output directory')
+    res = sub.add_parser('result', help='IMPs of the home entrant of the current round')
+    res.add_argument('results', nargs='+', help='table=IMPs')
+    sub.add_parser('standings', help='Entrants by their VPs')
+    sim = sub.add_parser('simulate', help='Time the pairings of a random field')
+    sim.add_argument('-p', '--entrants', type=int, default=200)
+    sim.add_argument('-r', '--rounds', type=int, default=10)
+    sim.add_argument('-b', '--boards', type=int, default=7)
+    sim.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    if args.command == 'simulate':
+        times = simulate(args.entrants, args.rounds, args.boards, args.seed)
+        print(f'Slowest pairing {max(times) * 1000:.1f} ms')
+    elif args.command == 'new':
+        n = SwissEvent.create(args.event, args.entrants, args.boards, args.teams, args.names)
+        print(f'{n} entrants in {args.event}')
+    else:
+        event = SwissEvent(log, args.event)
+        try:
+            if args.command == 'pair':
+                start = time.perf_counter()
+                matches = event.pairNext()
+                print(f'Round {len(event.rounds)}: {len(matches)} matches in {(time.perf_counter() - start) * 1000:.1f} ms')
+                event.save()
+                doc = SwissRound(log, event)
+                doc.build()
+                doc.save(args.outdir)
+            elif args.command == 'result':
+                event.enter({int(t): int(imps) for t, imps in (x.split('=') for x in args.results)})
+                event.save()
+                if event.pending():
+                    print(f'Waiting for tables {event.pending()}')
+            else:
+                vps, played = event.scores()
+                for i, e in enumerate(event.ranking(vps), 1):
+                    print(f'{i:>4} {e:>4} {event.name(e):<30} {vps[e]:8.2f} {played[e]:>3}')
+        except ValueError as e:
+            log.error(e)
+            raise SystemExit(1)
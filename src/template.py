@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# Cached workbook and PDF templates
+#
+# For a given (movement, pairs, boards) the documents are the same except for the
+# names, the tournament title, and the date.  We generate them once with placeholders,
+# keep the workbook and the (not yet finalized) PDF object in a cache directory,
+# then only patch the placeholders for each event.
+#
+# Workbook: the placeholders are strings of the Roster sheet, patched in the zip.
+# PDF: the placeholders are in the page content streams.  Texts are re-positioned
+#      by their width change, per the alignment recorded while generating (see PDF.anchors).
+import argparse
+import hashlib
+import io
+import logging
+import os
+import pickle
+import re
+import time
+import zipfile
+from xml.sax.saxutils import escape
+import fpdf
+import openpyxl
+from maininit import setlog
+from movements import newDocument, Movements
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Sources the documents are generated from, and the versions of the libraries writing them.
+# A change in any of them invalidates the cache.
+def sourceDigest(movement, jsonfile=None):
+    files = ['docset.py', 'pdf.py', 'movements.py']
+    if movement == 'howell':
+        files += ['howell.py', 'instructions.txt', jsonfile or 'setup.json']
+    elif movement == 'generic':
+        files += ['generic.py', 'generic.txt']
+    else:
+        files += ['mitchell.py', 'mitchellInstructions.txt']
+    digest = hashlib.sha256(f'openpyxl {openpyxl.__version__} fpdf {fpdf.FPDF_VERSION}'.encode())
+    for f in files:
+        with open(f'{here}/{f}', 'rb') as fd:
+            digest.update(fd.read())
+    return digest.hexdigest()
+
+class TemplateCache:
+    Title = '@@T@@'
+    Date = '@@D@@'
+
+    def __init__(self, log, cacheDir=None):
+        self.log = log
+        self.cacheDir = cacheDir or f'{here}/.templates'
+        os.makedirs(self.cacheDir, exist_ok=True)
+        # Loaded or built in this run, and the source digests checked, for a batch of events
+        self.entries = {}
+        self.digests = {}
+
+    def playerToken(self, i, half):
+        return f'@@P{i}{"ab"[half]}@@'
+
+    def entryName(self, movement, pairs, decks, named):
+        return f'{movement}{pairs}x{decks}{"N" if named else ""}'
+
+    # Generate the documents with placeholders and store them
+    def build(self, movement, pairs, decks, named, jsonfile=None):
+        self.log.info(f'Building template {self.entryName(movement, pairs, decks, named)}')
+        names = {'Tournament': self.Title, 'Date': self.Date, 'Players': []}
+        if named:
+            names['Players'] = [f'{self.playerToken(i, 0)} + {self.playerToken(i, 1)}' for i in range(pairs)]
+        doc = newDocument(self.log, movement, pairs, decks, names, jsonfile=jsonfile)
+        if doc is None:
+            return None
+        doc.pdf.anchors = {}
+        doc.build()
+        xlsx = io.BytesIO()
+        doc.wb.save(xlsx)
+        fileName = doc.nameObj['File']
+        entry = {'Digest': self.digest(movement, jsonfile),
+                'File': fileName, 'Suffix': doc.outputName()[len(fileName):],
+                'Anchors': doc.pdf.anchors, 'PDF': doc.pdf, 'Workbook': xlsx.getvalue()}
+        with open(f'{self.cacheDir}/{self.entryName(movement, pairs, decks, named)}.pkl', 'wb') as f:
+            pickle.dump(entry, f)
+        return entry
+
+    def digest(self, movement, jsonfile=None):
+        if (movement, jsonfile) not in self.digests:
+            self.digests[(movement, jsonfile)] = sourceDigest(movement, jsonfile)
+        return self.digests[(movement, jsonfile)]
+
+    def load(self, movement, pairs, decks, named, jsonfile=None):
+        key = (self.entryName(movement, pairs, decks, named), jsonfile)
+        if key not in self.entries:
+            self.entries[key] = self.loadEntry(movement, pairs, decks, named, jsonfile)
+        return self.entries[key]
+
+    def loadEntry(self, movement, pairs, decks, named, jsonfile=None):
+        fn = f'{self.cacheDir}/{self.entryName(movement, pairs, decks, named)}.pkl'
+        if os.path.exists(fn):
+            with open(fn, 'rb') as f:
+                entry = pickle.load(f)
+            if entry['Digest'] == self.digest(movement, jsonfile):
+                return entry
+            self.log.info(f'Template {fn} is stale')
+        return self.build(movement, pairs, decks, named, jsonfile)
+
+    # Placeholder to text
+    def replacements(self, nameObj, named):
+        subs = {self.Title: nameObj['Tournament'], self.Date: nameObj['Date']}
+        if named:
+            for i, p in enumerate(nameObj['Players']):
+                names = [x.strip() for x in p.split('+')] + ['']
+                subs[self.playerToken(i, 0)] = names[0]
+                subs[self.playerToken(i, 1)] = names[1]
+        return subs
+
+    # Produce the documents for an event from the cached template
+    # "nameObj" is as PairGames.loadNames
+    def render(self, movement, pairs, decks, nameObj, outDir=None, jsonfile=None):
+        named = len(nameObj.get('Players', [])) == pairs
+        entry = self.load(movement, pairs, decks, named, jsonfile)
+        if entry is None:
+            return None
+        nameObj = {'Tournament': nameObj.get('Tournament', ''), 'Date': nameObj['Date'],
+                    'Players': nameObj.get('Players', []), 'File': nameObj.get('File', entry['File'])}
+        subs = self.replacements(nameObj, named)
+        fn = f'{outDir or here + "/.."}/{nameObj["File"]}{entry["Suffix"]}'
+        with open(f'{fn}.xlsx', 'wb') as f:
+            f.write(patchWorkbook(entry['Workbook'], subs))
+        patchPDF(entry['PDF'], entry['Anchors'], subs).output(f'{fn}.pdf')
+        self.log.info(f'Saved {fn}.{{xlsx,pdf}}')
+        return fn
+
+def substitute(text, subs):
+    for k, v in subs.items():
+        text = text.replace(k, v)
+    return text
+
+# The workbook is a zip.  Names, title, and date are strings of the Roster,
+# inline or shared depending on the openpyxl version.
+def patchWorkbook(xlsx, subs):
+    xmlSubs = {k: escape(v) for k, v in subs.items()}
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(xlsx)) as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename.startswith('xl/') and b'@@' in data:
+                data = substitute(data.decode('utf-8'), xmlSubs).encode('utf-8')
+            zout.writestr(item, data)
+    return out.getvalue()
+
+# PDF string literal escapes, as FPDF writes them
+def pdfEscape(s):
+    return s.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').replace('\r', '\\r')
+
+def pdfUnescape(s):
+    return re.sub(r'\\(.)', lambda m: '\r' if m.group(1) == 'r' else m.group(1), s)
+
+# Font selections and text placements in a page content stream
+TextOps = re.compile(rb'/F(\d+) ([\d.]+) Tf|BT ([-\d.]+) ([-\d.]+) Td \(((?:[^\\)]|\\.)*)\) Tj ET')
+
+def patchPDF(template, anchors, subs):
+    doc = pickle.loads(pickle.dumps(template))
+    fonts = {f.i: f for f in doc.fonts.values()}
+
+    def width(font, size, text):
+        return sum(font.cw.get(c, 0) for c in text) * size / 1000
+
+    for page in doc.pages.values():
+        if b'@@' not in page.contents:
+            continue
+        font = [None, 0]
+        def patch(m):
+            if m.group(1) is not None:
+                font[0] = fonts[int(m.group(1))]
+                font[1] = float(m.group(2))
+                return m.group(0)
+            old = pdfUnescape(m.group(5).decode('latin-1'))
+            if '@@' not in old:
+                return m.group(0)
+            new = substitute(old, subs)
+            x = float(m.group(3))
+            align = anchors.get(old, 'L')
+            if align != 'L':
+                shift = width(font[0], font[1], old) - width(font[0], font[1], new)
+                x += shift / 2 if align == 'C' else shift
+            return f'BT {x:.2f} {m.group(4).decode()} Td ({pdfEscape(new)}) Tj ET'.encode('latin-1')
+        page.contents = bytearray(TextOps.sub(patch, bytes(page.contents)))
+    return doc
+
+
+if __name__ == '__main__':
+    log = setlog('template', None)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--movement', choices=Movements, default='howell')
+    parser.add_argument('-p', '--pair', type=int, default=8, help='# of pairs in the tournament')
+    parser.add_argument('-b', '--boards', type=int, choices=range(1,7), default=3, help='Boards per round')
+    parser.add_argument('-n', '--names', type=str, default="", help='Names in the tournament')
+    parser.add_argument('-o', '--outdir', type=str, help='Output directory')
+    parser.add_argument('-c', '--cachedir', type=str, help='Template cache directory')
+    parser.add_argument('-d', '--debug', type=str, default='INFO')
+    args = parser.parse_args()
+    for l in [['INFO', logging.INFO], ['DEBUG', logging.DEBUG], ['ERROR', logging.ERROR]]:
+        if args.debug.upper() == l[0]:
+            log.setLevel(l[1])
+            break
+
+    # Same defaults as the generators
+    doc = newDocument(log, args.movement, args.pair, args.boards, args.names or None)
+    if doc is not None:
+        start = time.perf_counter()
+        cache = TemplateCache(log, args.cachedir)
+        fn = cache.render(args.movement, args.pair, args.boards, doc.nameObj, args.outdir)
+        print(f'Saved {fn}.{{xlsx,pdf}} in {time.perf_counter() - start:.2f}s')